@@ -1,7 +1,9 @@
 # asignaciones/admin.py
 from django.contrib import admin
 from django.db import transaction
+from django.utils.text import smart_split, unescape_string_literal
 
+from .busqueda import buscar
 from .models import DireccionAsignada, HistorialAsignacion
 from usuarios.models import Usuario
 
@@ -38,6 +40,7 @@ class DireccionAsignadaAdmin(admin.ModelAdmin):
         ("fecha", admin.DateFieldListFilter),
         ("created_at", admin.DateFieldListFilter),
     )
+    # búsqueda por índice (trigram / FTS5), ver get_search_results
     search_fields = (
         "direccion",
         "comuna",
@@ -60,6 +63,15 @@ class DireccionAsignadaAdmin(admin.ModelAdmin):
         return "-"
     bloque_label.short_description = "Bloque"
 
+    # ---------- búsqueda ----------
+    def get_search_results(self, request, queryset, search_term):
+        """Misma búsqueda indexada que ?search= de la API; el orden lo pone el changelist."""
+        terminos = [
+            unescape_string_literal(t) if t[:1] in "\"'" and t[-1:] == t[:1] and len(t) > 1 else t
+            for t in smart_split(search_term or "")
+        ]
+        return buscar(queryset, terminos, rankear=False, campos=self.search_fields), False
+
     # ---------- permisos de edición SÓLO para /admin ----------
     def get_readonly_fields(self, request, obj=None):
         """
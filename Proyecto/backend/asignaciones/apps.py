@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AsignacionesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'asignaciones'
+
+    def ready(self):
+        # post_migrate: triggers FTS5 de la búsqueda en SQLite; post_delete: bajas de /changes/
+        from . import signals  # noqa
@@ -0,0 +1,166 @@
+# asignaciones/benchmark.py
+"""
+Benchmarks de la carga masiva (cargar_csv) y del listado de asignaciones.
+
+- generar_filas(): filas sintéticas con encabezados alias de _HEADER_ALIASES,
+  fechas en formatos mezclados, códigos de comuna de _COMUNA_ALIASES y
+  correos de técnicos.
+- escribir_csv() / escribir_xlsx(): vuelcan esas filas a un archivo.
+- medir_carga(): sube el archivo a cargar_csv y mide wall time, filas/seg,
+  queries por fila y memoria pico (tracemalloc).
+
+- medir_listado(): serializa una página del listado con DireccionAsignadaSerializer
+  y con ListadoRapido (.values_list()) y compara tiempos y bytes del JSON.
+
+Lo usan el comando `benchmark_importacion`, ImportBenchmarkTests y
+ListadoRapidoBenchmarkTests (tests.py).
+"""
+import csv
+import random
+import time
+import tracemalloc
+from datetime import date, timedelta
+from typing import Dict, Any, Iterator, List
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from openpyxl import Workbook
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .importacion import _HEADER_ALIASES
+from .normalizacion import _COMUNA_ALIASES
+
+BENCH_SIZES = (1_000, 10_000, 100_000, 500_000)
+BENCH_FORMATS = ("csv", "xlsx")
+
+_COMUNAS = list(_COMUNA_ALIASES)
+_ZONAS = ["Zona Metropolitana Norte", "SUR", "Oriente", "Centro", ""]
+_MARCAS = ["CLARO", "VTR", ""]
+_TECNOLOGIAS = ["HFC", "FTTH", "NFTT", ""]
+_ENCUESTAS = ["post_visita", "instalacion", "operaciones", ""]
+_BLOQUES = ["10 a 13", "14-18", "10:00 - 13:00", "", ""]
+# Formato dominante + algunos distintos (ejercita DateColumnParser y su fallback)
+_FECHA_FORMATOS = ["%d/%m/%Y"] * 8 + ["%Y-%m-%d", "%d-%m-%Y %H:%M:%S"]
+
+
+def _encabezados(rnd: random.Random) -> List[str]:
+    """Un alias al azar por columna canónica (como llegan los archivos reales)."""
+    return [rnd.choice(aliases) for aliases in _HEADER_ALIASES.values()]
+
+def generar_filas(n: int, tecnicos: List[str], seed: int = 0) -> Iterator[List[Any]]:
+    """Primera fila: encabezados. Luego n filas de datos (~2% sin dirección -> error)."""
+    rnd = random.Random(seed)
+    yield _encabezados(rnd)
+    hoy = date.today()
+    for i in range(n):
+        fecha = hoy + timedelta(days=rnd.randint(-5, 30))
+        row = {
+            "rut_cliente": f"{rnd.randint(5_000_000, 25_000_000)}-{rnd.choice('0123456789K')}",
+            "id_vivienda": f"BENCH{seed}-{i:07d}" if rnd.random() < 0.9 else "",
+            "direccion": "" if rnd.random() < 0.02 else f"Calle {rnd.randint(1, 9999)} #{i}",
+            "comuna": rnd.choice(_COMUNAS),
+            "zona": rnd.choice(_ZONAS),
+            "marca": rnd.choice(_MARCAS),
+            "tecnologia": rnd.choice(_TECNOLOGIAS),
+            "encuesta": rnd.choice(_ENCUESTAS),
+            "id_qualtrics": f"R_{rnd.getrandbits(48):012x}",
+            "fecha": fecha.strftime(rnd.choice(_FECHA_FORMATOS)),
+            "bloque": rnd.choice(_BLOQUES),
+            "asignado_email": rnd.choice(tecnicos).upper() if tecnicos and rnd.random() < 0.6 else "",
+        }
+        yield [row[k] for k in _HEADER_ALIASES]
+
+def escribir_csv(path: str, filas: Iterator[List[Any]]) -> str:
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        csv.writer(fh).writerows(filas)
+    return path
+
+def escribir_xlsx(path: str, filas: Iterator[List[Any]]) -> str:
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Asignaciones")
+    for fila in filas:
+        ws.append(fila)
+    wb.save(path)
+    return path
+
+
+def medir_carga(usuario, path: str, nombre: str, trace_memoria: bool = True, **params) -> Dict[str, Any]:
+    """
+    POST del archivo a cargar_csv (vía APIRequestFactory, sin pasar por el router)
+    y devuelve métricas + summary. Escribe en la BD: el llamador decide si revierte.
+    """
+    from .views import DireccionAsignadaViewSet
+
+    view = DireccionAsignadaViewSet.as_view({"post": "cargar_csv"})
+    with open(path, "rb") as fh:
+        upload = SimpleUploadedFile(nombre, fh.read())
+    qs = "&".join(f"{k}={v}" for k, v in params.items())
+    request = APIRequestFactory().post(
+        f"/api/asignaciones/cargar_csv/{'?' + qs if qs else ''}", {"file": upload}, format="multipart"
+    )
+    force_authenticate(request, user=usuario)
+
+    if trace_memoria:
+        tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as q:
+            t0 = time.perf_counter()
+            response = view(request)
+            wall = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1] if trace_memoria else None
+    finally:
+        if trace_memoria:
+            tracemalloc.stop()
+
+    if response.status_code != 200:
+        raise RuntimeError(f"cargar_csv respondió {response.status_code}: {response.data}")
+    rows = len(response.data["rows"])
+    return {
+        "archivo": nombre,
+        "filas": rows,
+        "wall_s": round(wall, 3),
+        "filas_por_s": round(rows / wall, 1) if wall else None,
+        "queries": len(q.captured_queries),
+        "queries_por_fila": round(len(q.captured_queries) / rows, 4) if rows else None,
+        "memoria_pico_mb": round(peak / 2**20, 1) if peak is not None else None,
+        "summary": response.data["summary"],
+    }
+
+
+def medir_listado(qs, page_size: int = 50, repeticiones: int = 200) -> Dict[str, Any]:
+    """
+    Tiempo por página (consulta + serialización + JSON) del listado de asignaciones:
+    instancias + DireccionAsignadaSerializer vs. ListadoRapido sobre el mismo qs
+    (ya ordenado). `identico` compara los bytes del JSON renderizado.
+    """
+    from rest_framework.renderers import JSONRenderer
+    from core.serializers import ListadoRapido
+    from .serializers import DireccionAsignadaSerializer
+
+    render = JSONRenderer().render
+    rapido = ListadoRapido.para(DireccionAsignadaSerializer)
+
+    proyectado = DireccionAsignadaSerializer.proyectar(qs, None)
+
+    def serializer():
+        return render(DireccionAsignadaSerializer(list(proyectado[:page_size]), many=True).data)
+
+    def valores():
+        return render(rapido.filas(list(rapido.consulta(qs)[:page_size])))
+
+    tiempos = {}
+    for nombre, fn in (("serializer", serializer), ("rapido", valores)):
+        fn()  # calentamiento
+        t0 = time.perf_counter()
+        for _ in range(repeticiones):
+            fn()
+        tiempos[nombre] = (time.perf_counter() - t0) / repeticiones
+    return {
+        "page_size": page_size,
+        "repeticiones": repeticiones,
+        "serializer_ms": round(tiempos["serializer"] * 1000, 3),
+        "rapido_ms": round(tiempos["rapido"] * 1000, 3),
+        "speedup": round(tiempos["serializer"] / tiempos["rapido"], 2),
+        "identico": serializer() == valores(),
+    }
@@ -0,0 +1,220 @@
+# asignaciones/busqueda.py
+"""
+Búsqueda de texto libre sobre DireccionAsignada (caja de búsqueda del front y /admin).
+
+Motores, según lo que creó la migración 0014 en la base:
+- "trgm" (PostgreSQL con pg_trgm): icontains por campo (UPPER(col) LIKE
+  UPPER('%término%')) servido por índices GIN gin_trgm_ops sobre UPPER(col);
+  ranking por word_similarity.
+- "tsvector" (PostgreSQL sin pg_trgm): índice GIN sobre la expresión
+  to_tsvector('simple', campos...); cada término busca por prefijo de palabra
+  ('provi' encuentra 'Providencia', no subcadenas internas); ranking ts_rank.
+- "fts5" (SQLite): tabla virtual FTS5 con tokenizer trigram sincronizada por
+  triggers; ranking bm25. Las reconstrucciones de tabla de SQLite (ALTER de
+  migraciones) borran los triggers: asegurar_fts() los repone en cada post_migrate.
+- None (sin índice): icontains de siempre, sin ranking.
+
+Salvo el prefijo de "tsvector", la semántica es la de SearchFilter de DRF:
+cada término debe aparecer (como subcadena, sin distinguir mayúsculas) en
+alguno de los campos que pide quien llama (search_fields de la API o del
+admin). Los índices cubren CAMPOS_BUSQUEDA; un campo fuera de ellos (encuesta
+en el admin) se compara aparte.
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest
+
+CAMPOS_BUSQUEDA = ("direccion", "comuna", "rut_cliente", "id_vivienda", "id_qualtrics")
+FTS_TABLA = "asignaciones_fts"
+# el tokenizer trigram no indexa términos de menos de 3 caracteres
+FTS_MIN_LARGO = 3
+
+TSV_INDICE = "asig_busqueda_tsv_idx"
+# misma expresión que el índice TSV_INDICE (el planner solo lo usa si coinciden)
+TSV_EXPR = "to_tsvector('simple', {})".format(
+    " || ' ' || ".join(f"coalesce({{t}}{c}, '')" for c in CAMPOS_BUSQUEDA)
+)
+
+# Sobre cuántas coincidencias como máximo se ordena por relevancia: rankear
+# cientos de miles de filas (un término muy común) cuesta segundos y no aporta;
+# en ese caso se deja el orden del listado, que sale directo del índice (fecha, id).
+RANKING_MAX = 500
+
+_motores = {}
+
+
+def motor(using="default"):
+    """Motor de búsqueda disponible en la base `using` (ver docstring del módulo). Cacheado por proceso."""
+    if using not in _motores:
+        conn = connections[using]
+        m = None
+        if conn.vendor == "postgresql":
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                if cur.fetchone():
+                    m = "trgm"
+                else:
+                    cur.execute("SELECT 1 FROM pg_indexes WHERE indexname = %s", [TSV_INDICE])
+                    m = "tsvector" if cur.fetchone() else None
+        elif conn.vendor == "sqlite":
+            m = "fts5" if FTS_TABLA in conn.introspection.table_names() else None
+        _motores[using] = m
+    return _motores[using]
+
+
+def _sin_indice(terminos, campos):
+    q = Q()
+    for t in terminos:
+        q &= Q(*[Q(**{f"{c}__icontains": t}) for c in campos], _connector=Q.OR)
+    return q
+
+
+def _fuera_de_indice(modelo, t, campo) -> Q:
+    """icontains de `t` en un campo sin índice de texto; con choices, como IN de los valores que calzan."""
+    f = modelo._meta.get_field(campo)
+    if f.choices:
+        return Q(**{f"{campo}__in": [v for v, _ in f.flatchoices if t.lower() in str(v).lower()]})
+    return Q(**{f"{campo}__icontains": t})
+
+
+def _por_indice(m, t, tabla) -> Q:
+    """Candidatos de `t` según el índice del motor `m` (sobre CAMPOS_BUSQUEDA); Q() si no sirve."""
+    if m == "tsvector" and (tsquery := _tsquery([t])):
+        tsv = TSV_EXPR.format(t='"asignaciones".')
+        return Q(RawSQL(f"{tsv} @@ to_tsquery('simple', %s)", [tsquery], output_field=BooleanField()))
+    if m == "fts5" and len(t) >= FTS_MIN_LARGO:
+        return Q(id__in=RawSQL(f"SELECT rowid FROM {tabla} WHERE {tabla} MATCH %s", [_match_fts([t])]))
+    return Q()
+
+
+def _coincidencias(qs, m, terminos, campos) -> Q:
+    """
+    Cada término en alguno de `campos` (semántica de SearchFilter). En los campos
+    indexados el índice trae los candidatos y el icontains los confirma, así que
+    un set de campos menor que CAMPOS_BUSQUEDA no agrega coincidencias.
+    """
+    indexados = [c for c in campos if c in CAMPOS_BUSQUEDA]
+    otros = [c for c in campos if c not in CAMPOS_BUSQUEDA]
+    tabla = connections[qs.db].ops.quote_name(FTS_TABLA)
+    q = Q()
+    for t in terminos:
+        alguno = [_fuera_de_indice(qs.model, t, c) for c in otros]
+        if indexados:
+            alguno.insert(0, _por_indice(m, t, tabla) & _sin_indice([t], indexados))
+        q &= Q(*alguno, _connector=Q.OR)
+    return q
+
+
+def _rank_trgm(qs, terminos, campos):
+    from django.contrib.postgres.search import TrigramWordSimilarity
+
+    campos = [c for c in campos if c in CAMPOS_BUSQUEDA] or CAMPOS_BUSQUEDA
+    rank = None
+    for t in terminos:
+        sim = Greatest(*[TrigramWordSimilarity(Value(t), c) for c in campos]) if len(campos) > 1 \
+            else TrigramWordSimilarity(Value(t), campos[0])
+        rank = sim if rank is None else rank + sim
+    return qs.annotate(rank_busqueda=rank).order_by(
+        F("rank_busqueda").desc(), F("fecha").asc(nulls_last=True), "id"
+    )
+
+
+def _tsquery(terminos) -> str:
+    # cada palabra de cada término como prefijo: 'provi':* & '1234':*
+    palabras = [w for t in terminos for w in re.split(r"\W+", t.lower()) if w]
+    return " & ".join(f"'{w}':*" for w in palabras)
+
+
+def _rank_tsvector(qs, terminos, campos):
+    tsquery = _tsquery(terminos)
+    if not tsquery:
+        return qs
+    tsv = TSV_EXPR.format(t='"asignaciones".')
+    rank = RawSQL(f"ts_rank({tsv}, to_tsquery('simple', %s))", [tsquery], output_field=FloatField())
+    return qs.annotate(rank_busqueda=rank).order_by(
+        F("rank_busqueda").desc(), F("fecha").asc(nulls_last=True), "id"
+    )
+
+
+def _match_fts(terminos) -> str:
+    # cada término como frase literal (comillas dobladas), unidos con AND
+    return " AND ".join('"' + t.replace('"', '""') + '"' for t in terminos)
+
+
+def _rank_fts(qs, terminos, campos):
+    largos = [t for t in terminos if len(t) >= FTS_MIN_LARGO]
+    if not largos:
+        return qs
+    tabla = connections[qs.db].ops.quote_name(FTS_TABLA)
+    # bm25: menor es mejor; sin fila en el MATCH (calzó solo fuera del índice) va al final
+    rank = RawSQL(
+        f"SELECT bm25({tabla}) FROM {tabla} WHERE {tabla} MATCH %s AND rowid = asignaciones.id",
+        [_match_fts(largos)], output_field=FloatField(),
+    )
+    return qs.annotate(rank_busqueda=rank).order_by(
+        F("rank_busqueda").asc(nulls_last=True), F("fecha").asc(nulls_last=True), "id"
+    )
+
+
+def buscar(qs, terminos, rankear=True, campos=CAMPOS_BUSQUEDA):
+    """
+    Filtra `qs` (DireccionAsignada) por los términos en `campos` (los search_fields
+    de quien llama). Sin términos devuelve qs tal cual.
+
+    Primero se leen a lo sumo RANKING_MAX + 1 ids coincidentes (vía el índice):
+    - si hay más, el término es muy común y se deja el orden del listado, que
+      sale directo del índice (fecha, id) filtrando al vuelo;
+    - si no, el listado se acota a esos ids (el planner ya no estima a ciegas
+      la selectividad del término) y, si rankear, se ordena por relevancia
+      (desempate fecha, id).
+    """
+    terminos = [t.strip() for t in terminos if t and t.strip()]
+    if not terminos:
+        return qs
+    m = motor(qs.db)
+    filtrado = qs.filter(_coincidencias(qs, m, terminos, campos))
+    if m is None:
+        return filtrado
+
+    ids = list(filtrado.order_by().values_list("pk", flat=True)[:RANKING_MAX + 1])
+    if len(ids) > RANKING_MAX:
+        return filtrado
+    acotado = qs.filter(pk__in=ids)
+    return _RANKING[m](acotado, terminos, campos) if rankear else acotado
+
+_RANKING = {"trgm": _rank_trgm, "tsvector": _rank_tsvector, "fts5": _rank_fts}
+
+
+# ---------- índices (creados por la migración 0014; triggers repuestos en post_migrate) ----------
+def _fts_valores(prefijo):
+    return ", ".join(f"{prefijo}.{c}" for c in CAMPOS_BUSQUEDA)
+
+
+def _fts_triggers():
+    cols = ", ".join(CAMPOS_BUSQUEDA)
+    borrar = f"INSERT INTO {FTS_TABLA}({FTS_TABLA}, rowid, {cols}) VALUES ('delete', old.id, {_fts_valores('old')});"
+    insertar = f"INSERT INTO {FTS_TABLA}(rowid, {cols}) VALUES (new.id, {_fts_valores('new')});"
+    return {
+        f"{FTS_TABLA}_ai": f"AFTER INSERT ON asignaciones BEGIN {insertar} END",
+        f"{FTS_TABLA}_ad": f"AFTER DELETE ON asignaciones BEGIN {borrar} END",
+        f"{FTS_TABLA}_au": f"AFTER UPDATE OF {cols} ON asignaciones BEGIN {borrar} {insertar} END",
+    }
+
+
+def asegurar_fts(using="default"):
+    """Repone los triggers FTS5 si una reconstrucción de tabla los borró (y reindexa)."""
+    conn = connections[using]
+    if conn.vendor != "sqlite" or FTS_TABLA not in conn.introspection.table_names():
+        return
+    with conn.cursor() as cur:
+        cur.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'asignaciones'")
+        existentes = {r[0] for r in cur.fetchall()}
+        faltantes = {n: c for n, c in _fts_triggers().items() if n not in existentes}
+        if not faltantes:
+            return
+        for nombre, cuerpo in faltantes.items():
+            cur.execute(f"CREATE TRIGGER {nombre} {cuerpo}")
+        cur.execute(f"INSERT INTO {FTS_TABLA}({FTS_TABLA}) VALUES ('rebuild')")
@@ -1,12 +1,5 @@
 # asignaciones/comunas.py
-import unicodedata
-
-def _norm(s: str) -> str:
-    if not s:
-        return ""
-    s = unicodedata.normalize("NFKD", s)
-    s = "".join(c for c in s if not unicodedata.combining(c))
-    return s.upper().strip()
+from .normalizacion import _norm_key as _norm
 
 # === Agrupación por zonas ===
 _Z_NORTE = {
@@ -1,7 +1,9 @@
 from django.utils import timezone
 import django_filters as filters
 from django.db.models import Q
+from rest_framework.filters import SearchFilter
 from asignaciones.models import HistorialAsignacion
+from asignaciones import busqueda
 
 def _parse_dateish(value):
     if not value:
@@ -67,3 +69,19 @@ class HistorialAsignacionFilter(filters.FilterSet):
     def filter_creado_hasta(self, qs, name, value):
         d = _parse_dateish(value)
         return qs.filter(created_at__date__lte=d) if d else qs
+
+
+class BusquedaAsignacionesFilter(SearchFilter):
+    """
+    ?search= sobre DireccionAsignada con índices (ver asignaciones/busqueda.py)
+    en vez de los ILIKE de SearchFilter, sobre los search_fields de la vista.
+    Ordena por relevancia salvo que la request pida otro orden (?ordering=,
+    ?order=) o pagine por cursor (?cursor=).
+    """
+    def filter_queryset(self, request, queryset, view):
+        terminos = self.get_search_terms(request)
+        if not terminos:
+            return queryset
+        p = request.query_params
+        rankear = not p.get("ordering") and not p.get("order") and "cursor" not in p
+        return busqueda.buscar(queryset, terminos, rankear=rankear, campos=self.get_search_fields(view, request))
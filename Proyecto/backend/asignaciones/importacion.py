@@ -0,0 +1,1146 @@
+# asignaciones/importacion.py
+"""
+Carga masiva de asignaciones desde CSV/XLSX:
+- lectura en streaming de los archivos y mapeo de encabezados
+  (CSV, XLSX de una o varias hojas, .zip de CSV/XLSX),
+- normalización de cada fila,
+- upsert por lotes de DireccionAsignada + HistorialAsignacion.
+"""
+from datetime import date, datetime, timedelta
+import codecs
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import zipfile
+import zlib
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
+from xml.etree import ElementTree
+
+import django
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from django.db import IntegrityError, transaction, connection
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+from core.models import LogSistema
+from usuarios.models import Usuario
+from . import importacion_pg
+from .models import BajaAsignacion, DireccionAsignada, HistorialAsignacion, ImportJob, ImportCheckpoint
+from .normalizacion import (
+    _s, _norm, _norm_zona, _norm_comuna, _normalize_bloque,
+    _norm_marca, _norm_tecnologia, _norm_encuesta,
+)
+
+
+# =================== Helpers de normalización / parsing ===================
+
+_HEADER_ALIASES = {
+    "rut_cliente": ["rut_cliente", "rut", "rut cliente"],
+    "id_vivienda": [
+        "id_vivienda_cliente", "id_vivienda", "pcs_cliente",
+        "customer_id", "customerid"
+    ],
+    "direccion": [
+        "direccion_cliente", "direccion", "direccion del cliente",
+        "dirección del cliente", "direccion_del_cliente",
+        "direccion_destinatario", "direccion_cliente_del_destinatario"
+    ],
+    "comuna": [
+        "comuna_cliente", "comuna", "comuna del cliente", "comuna_del_cliente"
+    ],
+    "zona": [
+        "zona_cliente", "customer_zone", "zona"
+    ],
+    "marca": ["marca", "brand"],
+    "tecnologia": ["tecnologia", "customer_network_type"],
+    "encuesta": ["encuesta", "encuesta de origen", "survey_type"],
+    "id_qualtrics": ["id_qualtrics", "id_de_respuesta", "record_id"],
+    "fecha": ["fecha", "fecha_programada", "fecha_registrada", "transactiondate"],
+    "bloque": ["bloque", "bloque_horario", "bloque horario reagendamiento"],
+    "asignado_email": ["asignado_email", "correo_tecnico", "tecnico_email", "email_tecnico"],
+}
+
+_DATE_FORMATS = (
+    "%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%Y/%m/%d",
+    "%Y-%m-%d %H:%M:%S", "%d-%m-%Y %H:%M:%S", "%d/%m/%Y %H:%M:%S", "%Y/%m/%d %H:%M:%S",
+)
+
+def _build_header_map(raw_headers: List[str]) -> Dict[str, str]:
+    norm_headers = { _norm(h): h for h in raw_headers }
+    mapping = {}
+    for canon, aliases in _HEADER_ALIASES.items():
+        for alias in aliases:
+            k = _norm(alias)
+            if k in norm_headers:
+                mapping[canon] = norm_headers[k]
+                break
+    return mapping
+
+def _parse_date(val):
+    if not val: return None
+    if hasattr(val, "year"):
+        try:
+            return val.date() if hasattr(val, "date") else val
+        except Exception:
+            pass
+    s = _s(val)
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(s, fmt).date()
+        except Exception:
+            pass
+    try:
+        only_date = s.split()[0]
+        for fmt in ("%Y-%m-%d","%d-%m-%Y","%d/%m/%Y","%Y/%m/%d"):
+            try:
+                return datetime.strptime(only_date, fmt).date()
+            except Exception:
+                pass
+    except Exception:
+        pass
+    return None
+
+# ---------- Fechas: formato detectado por columna ----------
+_DATE_TOKENS = {
+    "%Y": r"(?P<Y>\d{4})", "%m": r"(?P<m>\d{1,2})", "%d": r"(?P<d>\d{1,2})",
+    "%H": r"\d{1,2}", "%M": r"\d{1,2}", "%S": r"\d{1,2}",
+}
+
+def _compile_date_format(fmt: str):
+    pattern = "".join(
+        _DATE_TOKENS.get(tok, r"\s+" if tok == " " else re.escape(tok))
+        for tok in re.findall(r"%[A-Za-z]|.", fmt)
+    )
+    return re.compile(pattern)
+
+_DATE_REGEX = {fmt: _compile_date_format(fmt) for fmt in _DATE_FORMATS}
+
+# Cuántos valores de la columna fecha se miran para detectar el formato
+DATE_SAMPLE_SIZE = 200
+
+class DateColumnParser:
+    """
+    Parser de la columna fecha de un archivo: detecta una vez (sobre una muestra) cuál
+    de _DATE_FORMATS usa la columna y parsea el resto con su regex compilada.
+    Los valores que no calzan (outliers, celdas datetime de Excel) caen a _parse_date.
+    """
+
+    def __init__(self, sample):
+        self.fmt = None
+        self._regex = None
+        hits = dict.fromkeys(_DATE_FORMATS, 0)
+        for val in islice((v for v in sample if v and not hasattr(v, "year")), DATE_SAMPLE_SIZE):
+            s = _s(val)
+            for fmt, rx in _DATE_REGEX.items():
+                if self._match(rx, s):
+                    hits[fmt] += 1
+                    break
+        best = max(_DATE_FORMATS, key=lambda f: hits[f])  # empate: el primero de la lista
+        if hits[best]:
+            self.fmt, self._regex = best, _DATE_REGEX[best]
+
+    @staticmethod
+    def _match(rx, s):
+        m = rx.fullmatch(s)
+        if not m:
+            return None
+        try:
+            return date(int(m["Y"]), int(m["m"]), int(m["d"]))
+        except ValueError:
+            return None
+
+    def __call__(self, val):
+        if self._regex is not None and isinstance(val, str):
+            d = self._match(self._regex, val.strip())
+            if d:
+                return d
+        return _parse_date(val)
+
+def _header_score(names_norm: List[str]) -> int:
+    score, have = 0, set(names_norm)
+    def any_alias(key): return any(_norm(a) in have for a in _HEADER_ALIASES[key])
+    for key in ("direccion", "comuna", "id_vivienda", "rut_cliente", "fecha"):
+        if any_alias(key): score += 1
+    return score
+
+def _iter_csv_lines(f, encoding: str = "utf-8-sig") -> Iterator[str]:
+    """
+    Decodifica el archivo subido por chunks y entrega líneas completas (con '\n'),
+    sin cargar el archivo entero en memoria. Equivale a iterar un StringIO del texto completo.
+    utf-8-sig: el BOM de los CSV de Excel no queda pegado al primer encabezado.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="ignore")
+    pending = ""
+    for chunk in f.chunks():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+def _rows_from_csv(f) -> Iterator[Tuple[Dict[str, str], Dict[str, Any]]]:
+    # Los headers se leen (y mapean) una sola vez al inicio; las filas se entregan de forma perezosa.
+    reader = csv.DictReader(_iter_csv_lines(f))
+    headers = list(reader.fieldnames or [])
+    header_map = _build_header_map(headers)
+    return ((header_map, r) for r in reader)
+
+def _xlsx_path(f) -> Tuple[str, bool]:
+    """
+    Ruta en disco del .xlsx subido. Si Django lo dejó en memoria, se vuelca por chunks
+    a un archivo temporal (openpyxl en modo read-only necesita un archivo).
+    Devuelve (ruta, es_temporal_propio).
+    """
+    if hasattr(f, "temporary_file_path"):
+        return f.temporary_file_path(), False
+    tmp = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
+    try:
+        for chunk in f.chunks():
+            tmp.write(chunk)
+    finally:
+        tmp.close()
+    return tmp.name, True
+
+def _load_xlsx(path):
+    # read_only: openpyxl parsea la hoja en streaming, sin materializar las celdas
+    return load_workbook(filename=path, read_only=True, data_only=True)
+
+def _sniff_ws(ws):
+    """
+    Detecta la fila de encabezados de una hoja.
+    Devuelve (headers, header_map, encontrado, iterador de las filas siguientes).
+    """
+    ws.reset_dimensions()  # algunos exportadores declaran mal el rango; leemos hasta el final
+    it = ws.iter_rows(values_only=True)
+
+    # Solo las primeras 10 filas quedan en memoria para detectar la fila de encabezados
+    head = list(islice(it, 10))
+    header_idx, encontrado = 0, False
+    for i, raw in enumerate(head):
+        names = [ _s(x) for x in (raw or []) ]
+        if _header_score([_norm(n) for n in names]) >= 2:
+            header_idx, encontrado = i, True; break
+    headers = [ _s(x) for x in (head[header_idx] or []) ] if head else []
+    return headers, _build_header_map(headers), encontrado, chain(head[header_idx+1:], it)
+
+def _ws_rows(headers, resto) -> Iterator[Tuple]:
+    for raw in resto:
+        if not raw or not any(raw): continue
+        yield tuple(raw[i] if i < len(raw) else None for i in range(len(headers)))
+
+def _rows_from_xlsx(f) -> Iterator[Tuple[Dict[str, str], Dict[str, Any]]]:
+    def _gen():
+        # Todo (temporal, libro) se abre dentro del generador: su finally corre al
+        # agotarlo, al cerrarlo o cuando se descarta a medias (close() del GC)
+        path, own_tmp = _xlsx_path(f)
+        wb = None
+        try:
+            wb = _load_xlsx(path)
+            headers, header_map, _, resto = _sniff_ws(wb.worksheets[0])
+            yield None  # listo para leer
+            for raw in _ws_rows(headers, resto):
+                yield header_map, dict(zip(headers, raw))
+        finally:
+            if wb is not None:
+                wb.close()
+            if own_tmp:
+                os.unlink(path)
+
+    gen = _gen()
+    # Se ceba aquí: un archivo ilegible falla ya (400 en cargar_csv), no a mitad de la carga
+    next(gen)
+    return gen
+
+
+# Errores de un lector a mitad del archivo (el CSV/XLSX/zip está dañado, no es un bug):
+# CargaMasiva.procesar los convierte en ArchivoIlegible con el nº de fila
+_ERRORES_LECTURA = (
+    csv.Error, UnicodeDecodeError, ValueError, KeyError, EOFError,
+    zipfile.BadZipFile, zlib.error, ElementTree.ParseError, InvalidFileException,
+)
+
+class ArchivoIlegible(Exception):
+    """El archivo no se pudo seguir leyendo en la fila `rownum` (400 en cargar_csv)."""
+
+    def __init__(self, rownum: int, error: Exception, fuente: str | None = None):
+        self.rownum, self.error, self.fuente = rownum, error, fuente
+        donde = f"{fuente}, fila {rownum}" if fuente else f"fila {rownum}"
+        super().__init__(f"{donde}: {error or error.__class__.__name__}")
+
+
+# ---------- Varias fuentes: XLSX con varias hojas / .zip de CSV/XLSX ----------
+
+class FilasMultiples:
+    """
+    Filas de varias fuentes (hojas o archivos) encadenadas en un solo stream, cada
+    una con su propio header_map. `fuentes` se va completando a medida que se leen
+    las filas, para atribuir cada resultado a su fuente (fuente_de).
+    """
+
+    def __init__(self, fuentes: Iterable[Tuple[str, Iterable]]):
+        self.fuentes: List[str] = []
+        self._inicios: List[int] = []
+        self._it = self._gen(fuentes)
+
+    def __iter__(self):
+        return self._it
+
+    def _gen(self, fuentes):
+        n = 0
+        for nombre, filas in fuentes:
+            self.fuentes.append(nombre)
+            self._inicios.append(n)
+            for fila in filas:
+                yield fila
+                n += 1
+
+    def fuente_de(self, idx: int) -> Tuple[str, int]:
+        """(fuente, nº de fila dentro de la fuente) para la fila idx (0-based) del stream."""
+        i = bisect_right(self._inicios, idx) - 1
+        return self.fuentes[i], idx - self._inicios[i] + 2
+
+def _volcar_hoja(path: str, titulo: str) -> str | None:
+    """
+    Corre en el pool: lee una hoja y la vuelca a un CSV temporal (encabezados + filas).
+    Devuelve la ruta, o None si la hoja no tiene encabezados reconocibles.
+    """
+    wb = _load_xlsx(path)
+    try:
+        headers, _, encontrado, resto = _sniff_ws(wb[titulo])
+        if not encontrado:
+            return None
+        fd, out = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as fh:
+            w = csv.writer(fh)
+            w.writerow(headers)
+            for raw in _ws_rows(headers, resto):
+                w.writerow(["" if v is None else v for v in raw])
+        return out
+    finally:
+        wb.close()
+
+def _abrir_fuente(nombre: str, abrir):
+    """abrir() de una fuente: si ya falla al abrirla (aún no tiene filas), el error lleva su nombre."""
+    try:
+        return abrir()
+    except _ERRORES_LECTURA as e:
+        raise ArchivoIlegible(1, e, nombre) from e
+
+def _fuentes_serial(specs):
+    """specs: [(nombre, abrir_csv) | (nombre, (ruta_xlsx, hoja))], leídas una tras otra."""
+    libros = {}
+    try:
+        for nombre, spec in specs:
+            if callable(spec):
+                yield nombre, _abrir_fuente(nombre, lambda: _rows_from_csv(spec()))
+                continue
+            path, titulo = spec
+            if path not in libros:
+                libros[path] = _abrir_fuente(nombre, lambda: _load_xlsx(path))
+            headers, header_map, encontrado, resto = _abrir_fuente(nombre, lambda: _sniff_ws(libros[path][titulo]))
+            if encontrado:
+                yield nombre, ((header_map, dict(zip(headers, raw))) for raw in _ws_rows(headers, resto))
+    finally:
+        for wb in libros.values():
+            wb.close()
+
+def _fuentes_paralelo(specs):
+    """
+    Igual que _fuentes_serial, pero las hojas XLSX (lo caro: parsear el XML) se leen
+    en paralelo en un pool de procesos, volcadas a CSV temporales que aquí se
+    consumen en orden.
+    """
+    hojas = [spec for _, spec in specs if not callable(spec)]
+    workers = max(1, min(import_workers(), len(hojas)))
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+        futuros = {spec: pool.submit(_volcar_hoja, *spec) for spec in hojas}
+        try:
+            for nombre, spec in specs:
+                if callable(spec):
+                    yield nombre, _abrir_fuente(nombre, lambda: _rows_from_csv(spec()))
+                    continue
+                out = _abrir_fuente(nombre, futuros.pop(spec).result)
+                if out is None:
+                    continue
+                try:
+                    with open(out, "rb") as fh:
+                        yield nombre, _rows_from_csv(File(fh))
+                finally:
+                    os.unlink(out)
+        finally:
+            # Corte anticipado: cancela lo pendiente y borra los volcados no consumidos
+            for fut in futuros.values():
+                fut.cancel()
+            for fut in futuros.values():
+                if not fut.cancelled() and fut.exception() is None and fut.result():
+                    os.unlink(fut.result())
+
+def _specs_xlsx(path: str, prefijo: str = "") -> List[Tuple[str, Tuple[str, str]]]:
+    wb = _load_xlsx(path)
+    try:
+        return [(f"{prefijo}{t}", (path, t)) for t in wb.sheetnames]
+    finally:
+        wb.close()
+
+def _fuentes_upload(f, name: str, parallel: bool):
+    """
+    Fuentes de un .zip (cada .csv/.xlsx, y cada hoja de los .xlsx) o de un .xlsx
+    con varias hojas. Borra los temporales al terminar.
+    """
+    tmps = []
+    try:
+        if name.endswith(".zip"):
+            with zipfile.ZipFile(f) as zf:
+                specs = []
+                for info in sorted(zf.infolist(), key=lambda i: i.filename):
+                    base = os.path.basename(info.filename)
+                    ext = os.path.splitext(base)[1].lower()
+                    if info.is_dir() or base.startswith(".") or "__MACOSX" in info.filename:
+                        continue
+                    if ext == ".csv":
+                        specs.append((info.filename, lambda info=info: File(zf.open(info))))
+                    elif ext == ".xlsx":
+                        path, _ = _xlsx_path(File(zf.open(info)))
+                        tmps.append(path)
+                        specs.extend(_specs_xlsx(path, f"{info.filename}:"))
+                yield from (_fuentes_paralelo if parallel else _fuentes_serial)(specs)
+        else:
+            path, own_tmp = _xlsx_path(f)
+            if own_tmp:
+                tmps.append(path)
+            specs = _specs_xlsx(path)
+            yield from (_fuentes_paralelo if parallel else _fuentes_serial)(specs)
+    finally:
+        for path in tmps:
+            os.unlink(path)
+
+def _xlsx_hojas(f) -> int:
+    path, own_tmp = _xlsx_path(f)
+    try:
+        wb = _load_xlsx(path)
+        try:
+            return len(wb.sheetnames)
+        finally:
+            wb.close()
+    finally:
+        if own_tmp:
+            os.unlink(path)
+
+def _canon_get(row: Dict[str, Any], header_map: Dict[str, str], key: str) -> Any:
+    src = header_map.get(key)
+    return row.get(src) if src else None
+
+# ========================= Upsert por lotes =========================
+
+# Filas por lote: cada lote se resuelve con ~4 queries (técnicos, id_vivienda,
+# direccion/comuna y escrituras bulk) en vez de 3-4 queries por fila.
+# Cada lote se confirma en su propia transacción (ver ImportCheckpoint).
+IMPORT_CHUNK_SIZE = 500
+
+def import_chunk_size() -> int:
+    return int(getattr(settings, "IMPORT_CHUNK_SIZE", 0) or IMPORT_CHUNK_SIZE)
+
+# Plazo (segundos) de una carga sobre su checkpoint; se renueva con cada lote. Si el
+# proceso muere, al vencer el mismo archivo se puede volver a subir y reanudar.
+IMPORT_CHECKPOINT_LEASE = 300
+
+def checkpoint_lease() -> timedelta:
+    return timedelta(seconds=int(getattr(settings, "IMPORT_CHECKPOINT_LEASE", 0) or IMPORT_CHECKPOINT_LEASE))
+
+
+class CargaEnCurso(Exception):
+    """Otra carga del mismo archivo (mismo hash) está escribiendo su checkpoint."""
+
+# Campos que la carga puede modificar en una asignación existente
+_UPDATE_FIELDS = [
+    "rut_cliente", "direccion", "comuna", "marca", "tecnologia", "encuesta",
+    "id_qualtrics", "fecha", "zona", "reagendado_bloque", "asignado_a", "estado",
+    "prioridad", "import_fingerprint", "updated_at",
+]
+
+# Orden fijo de los campos canónicos que entran en la huella de una fila
+_FINGERPRINT_FIELDS = (
+    "rut_cliente", "direccion", "comuna", "marca", "tecnologia", "encuesta",
+    "id_qualtrics", "fecha", "zona",
+)
+
+def _chunked(it: Iterable, size: int) -> Iterator[list]:
+    it = iter(it)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _parse_row(header_map: Dict[str, str], row: Dict[str, Any], today, parse_date=_parse_date) -> Dict[str, Any]:
+    """
+    Normaliza una fila del archivo (sin tocar la BD).
+    Devuelve los valores canónicos y los errores de validación propios de la fila.
+    """
+    rut_cliente   = _s(_canon_get(row, header_map, "rut_cliente"))
+    id_vivienda   = _s(_canon_get(row, header_map, "id_vivienda"))
+    direccion     = _s(_canon_get(row, header_map, "direccion"))
+    comuna_raw    = _s(_canon_get(row, header_map, "comuna"))
+    comuna        = _norm_comuna(comuna_raw)
+    zona          = _norm_zona(_canon_get(row, header_map, "zona"))
+
+    marca      = _norm_marca(_canon_get(row, header_map, "marca"))
+    tecnologia = _norm_tecnologia(_canon_get(row, header_map, "tecnologia"))
+    encuesta   = _norm_encuesta(_canon_get(row, header_map, "encuesta"))
+    id_qual    = _s(_canon_get(row, header_map, "id_qualtrics"))
+
+    fecha_val  = parse_date(_canon_get(row, header_map, "fecha"))
+    bloque     = _normalize_bloque(_canon_get(row, header_map, "bloque"))
+    asignado_email = _s(_canon_get(row, header_map, "asignado_email"))
+
+    if fecha_val and fecha_val < today:
+        fecha_val = None
+
+    errors = []
+    if not direccion or not comuna:
+        errors.append("Faltan campos obligatorios: direccion/comuna.")
+
+    defaults = {
+        "rut_cliente": rut_cliente,
+        "direccion": direccion,
+        "comuna": comuna,
+        "marca": marca or "CLARO",
+        "tecnologia": tecnologia or "HFC",
+        "encuesta": encuesta or "post_visita",
+        "id_qualtrics": id_qual,
+    }
+    if fecha_val:
+        defaults["fecha"] = fecha_val
+    if zona:
+        defaults["zona"] = zona
+
+    return {
+        "id_vivienda": id_vivienda,
+        "defaults": defaults,
+        "fecha": fecha_val,
+        "bloque": bloque,
+        "asignado_email": asignado_email,
+        "errors": errors,
+    }
+
+
+def _parse_chunk(chunk, today, parse_date) -> List[Dict[str, Any]]:
+    """Normaliza un lote [(rownum, (header_map, row)), ...]. Corre en el proceso padre o en el pool."""
+    parsed = []
+    for rownum, (header_map, row) in chunk:
+        p = _parse_row(header_map, row, today, parse_date)
+        p["rownum"] = rownum
+        parsed.append(p)
+    return parsed
+
+def import_workers() -> int:
+    return getattr(settings, "IMPORT_WORKERS", None) or os.cpu_count() or 1
+
+def _fingerprint(p: Dict[str, Any]) -> str:
+    """
+    Huella de una fila ya normalizada: defaults + id_vivienda + bloque + técnico asignado.
+    Dos cargas con la misma huella dejarían la asignación igual.
+    """
+    d = p["defaults"]
+    asignado = p.get("asignado")
+    parts = [str(d.get(k) or "") for k in _FINGERPRINT_FIELDS]
+    parts += [p["id_vivienda"], p["bloque"] or "", str(asignado.pk) if asignado else ""]
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class CargaMasiva:
+    """
+    Upsert por lotes de asignaciones a partir de las filas (header_map, row)
+    que entregan _rows_from_csv/_rows_from_xlsx.
+
+    Por cada lote: precarga técnicos y asignaciones existentes (una query por
+    tipo de clave), separa altas/ediciones y escribe con bulk_create/bulk_update
+    más un bulk_create del historial. El resultado por fila mantiene el contrato
+    {"rownum", "created", "updated"[, "errors"]}; las filas cuya huella coincide con
+    la guardada en la asignación se omiten y se informan con "unchanged": True.
+
+    En PostgreSQL la escritura de cada lote usa COPY a una tabla temporal más un
+    INSERT ... ON CONFLICT (ver importacion_pg); en otros motores, bulk_create/bulk_update.
+
+    Con checkpoint (ImportCheckpoint), cada lote confirma también el avance en la
+    misma transacción y se omiten las filas ya confirmadas en una corrida anterior.
+
+    dry_run=True clasifica cada fila (alta/edición/sin cambios/error) con las mismas
+    precargas por lote, sin escribir nada.
+
+    parallel=True reparte el parseo/normalización de los lotes en un ProcessPoolExecutor
+    (import_workers() procesos); las escrituras siguen en este proceso y en orden, así que
+    los resultados son idénticos al modo serial.
+    """
+
+    def __init__(self, usuario, chunk_size: int = None, parallel: bool = None,
+                 checkpoint: ImportCheckpoint = None, dry_run: bool = False,
+                 guardar_errores: bool = False):
+        self.usuario = usuario
+        self.dry_run = dry_run
+        # guardar_errores: conserva (rownum, fila original, errores) para el reporte CSV
+        self.filas_error: List[Tuple[int, Dict[str, Any], List[str]]] | None = [] if guardar_errores else None
+        # Simulación: nada se escribe, así que las altas/ediciones de los lotes anteriores
+        # viven solo en memoria: identity map por pk, índice por id_vivienda y, por
+        # (direccion, comuna), todas las asignaciones tocadas (un par puede tener varias)
+        self._sim_pk: Dict[int, DireccionAsignada] = {}
+        self._sim_viv: Dict[str, DireccionAsignada] = {}
+        self._sim_pares: Dict[Tuple[str, str], List[DireccionAsignada]] = {}
+        self._sim_par_de: Dict[int, Tuple[str, str]] = {}  # id(obj) -> par actual
+        self._sim_orden: Dict[int, int] = {}              # id(obj) -> orden de alta
+        self.chunk_size = chunk_size or import_chunk_size()
+        self.checkpoint = checkpoint
+        # Fila (rownum) desde la que se reanuda; 0 = carga desde el inicio
+        self.reanudado_desde = checkpoint.ultima_fila if checkpoint else 0
+        self.parallel = getattr(settings, "IMPORT_PARALLEL", False) if parallel is None else parallel
+        # En PostgreSQL las escrituras van por COPY + merge (importacion_pg); en SQLite, ORM bulk
+        self.pg_copy = getattr(settings, "IMPORT_PG_COPY", False) and importacion_pg.disponible()
+        self.today = timezone.localdate()
+        self._multiples: FilasMultiples | None = None  # si la carga trae varias hojas/archivos
+        self._tecnicos: Dict[str, Any] = {}  # email en minúsculas -> Usuario | None
+        self._fechas: DateColumnParser | None = None  # se detecta con el primer lote
+
+    @property
+    def fecha_formato(self) -> str | None:
+        return self._fechas.fmt if self._fechas else None
+
+    @property
+    def fuentes(self) -> List[str] | None:
+        return self._multiples.fuentes if self._multiples is not None else None
+
+    def fuente_de(self, rownum: int) -> Tuple[str, int]:
+        return self._multiples.fuente_de(rownum - 2)
+
+    def procesar(self, rows: Iterable[Tuple[Dict[str, str], Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+        """Entrega el resultado de cada fila, en orden, a medida que se escribe cada lote."""
+        if isinstance(rows, FilasMultiples):
+            self._multiples = rows
+        numeradas = enumerate(self._leer(rows), start=2)
+        if self.reanudado_desde:
+            numeradas = ((n, r) for n, r in numeradas if n > self.reanudado_desde)
+        chunks = _chunked(numeradas, self.chunk_size)
+        parsear = self._parsear_paralelo if self.parallel else self._parsear_serial
+        try:
+            for parsed in parsear(chunks):
+                results = self._procesar_lote(parsed)
+                if self._multiples is not None:
+                    for r in results:
+                        r["fuente"], r["fuente_rownum"] = self.fuente_de(r["rownum"])
+                yield from results
+            if self.checkpoint is not None:
+                self.checkpoint.completado = True
+                self.checkpoint.en_curso_hasta = None
+                self.checkpoint.save(update_fields=["completado", "en_curso_hasta", "updated_at"])
+        finally:
+            # cortada (error, cliente que se desconecta): se libera para reanudar de inmediato
+            if self.checkpoint is not None and not self.checkpoint.completado:
+                ImportCheckpoint.objects.filter(pk=self.checkpoint.pk).update(en_curso_hasta=None)
+
+    # ---------- parseo ----------
+    def _leer(self, rows):
+        """Filas del lector; si se daña a mitad de camino, ArchivoIlegible con la fila en que iba."""
+        it = iter(rows)
+        rownum = 2
+        while True:
+            try:
+                fila = next(it)
+            except StopIteration:
+                return
+            except _ERRORES_LECTURA as e:
+                if self._multiples is not None and self._multiples.fuentes:
+                    fuente, n = self._multiples.fuente_de(rownum - 2)
+                    raise ArchivoIlegible(n, e, fuente) from e
+                raise ArchivoIlegible(rownum, e) from e
+            yield fila
+            rownum += 1
+
+    def _detectar_fechas(self, chunk):
+        if self._fechas is None:
+            self._fechas = DateColumnParser(_canon_get(row, header_map, "fecha") for _, (header_map, row) in chunk)
+
+    def _con_filas(self, chunk, parsed):
+        # La fila original queda en este proceso (no viaja al pool): solo se usa si hay error
+        if self.filas_error is not None:
+            for p, (_, (_, row)) in zip(parsed, chunk):
+                p["fila"] = row
+        return parsed
+
+    def _parsear_serial(self, chunks):
+        for chunk in chunks:
+            self._detectar_fechas(chunk)
+            yield self._con_filas(chunk, _parse_chunk(chunk, self.today, self._fechas))
+
+    def _parsear_paralelo(self, chunks):
+        workers = import_workers()
+        # initializer=django.setup: con 'spawn' el hijo necesita las apps cargadas para importar este módulo
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+            pending = deque()
+            for chunk in chunks:
+                self._detectar_fechas(chunk)
+                pending.append((chunk, pool.submit(_parse_chunk, chunk, self.today, self._fechas)))
+                # Ventana acotada: no leemos el archivo más rápido de lo que se escribe
+                if len(pending) >= workers * 2:
+                    chunk, fut = pending.popleft()
+                    yield self._con_filas(chunk, fut.result())
+            while pending:
+                chunk, fut = pending.popleft()
+                yield self._con_filas(chunk, fut.result())
+
+    # ---------- precargas ----------
+    def _resolver_tecnicos(self, emails):
+        faltan = {e.lower() for e in emails if e and e.lower() not in self._tecnicos}
+        if not faltan:
+            return
+        qs = (Usuario.objects.filter(rol="tecnico")
+              .annotate(_email_l=Lower("email"))
+              .filter(_email_l__in=faltan)
+              .order_by("id"))
+        for u in qs:
+            self._tecnicos.setdefault(u._email_l, u)
+        for e in faltan:
+            self._tecnicos.setdefault(e, None)
+
+    def _existentes(self, parsed):
+        viviendas = {p["id_vivienda"] for p in parsed if p["id_vivienda"]}
+        pares = {(p["defaults"]["direccion"], p["defaults"]["comuna"]) for p in parsed if not p["id_vivienda"]}
+
+        by_pk, by_viv = (self._sim_pk, self._sim_viv) if self.dry_run else ({}, {})
+        by_par = {}
+        viviendas -= by_viv.keys()
+        if viviendas:
+            for o in DireccionAsignada.objects.filter(id_vivienda__in=viviendas):
+                o = by_pk.setdefault(o.pk, o)
+                by_viv[o.id_vivienda] = o
+        if pares:
+            qs = (DireccionAsignada.objects
+                  .filter(direccion__in={d for d, _ in pares}, comuna__in={c for _, c in pares})
+                  .order_by("id"))
+            for o in qs:
+                # by_pk primero: en simulación la versión en memoria puede haber cambiado de par
+                o = by_pk.setdefault(o.pk, o)
+                if (o.direccion, o.comuna) not in pares:
+                    continue
+                by_par.setdefault((o.direccion, o.comuna), o)
+            if self.dry_run:
+                self._superponer_pares(by_par, pares)
+        return by_viv, by_par
+
+    # ---------- simulación (dry_run) ----------
+    def _orden_sim(self, o):
+        # Igual que order_by("id") en BD: existentes por pk, luego altas en orden de creación
+        return (o.pk is None, o.pk or 0, self._sim_orden.get(id(o), 0))
+
+    def _superponer_pares(self, by_par, pares):
+        for par in pares:
+            candidatos = list(self._sim_pares.get(par, ()))
+            if par in by_par:
+                candidatos.append(by_par[par])
+            if candidatos:
+                by_par[par] = min(candidatos, key=self._orden_sim)
+
+    def _registrar_simulados(self, nuevos, editados):
+        for obj in nuevos:
+            self._sim_orden[id(obj)] = len(self._sim_orden)
+        for obj in chain(nuevos, editados):
+            par = (obj.direccion, obj.comuna)
+            anterior = self._sim_par_de.get(id(obj))
+            if anterior == par:
+                continue
+            if anterior is not None:
+                self._sim_pares[anterior].remove(obj)
+            self._sim_pares.setdefault(par, []).append(obj)
+            self._sim_par_de[id(obj)] = par
+
+    # ---------- lote ----------
+    def _procesar_lote(self, parsed):
+        self._resolver_tecnicos(p["asignado_email"] for p in parsed if not p["errors"])
+        for p in parsed:
+            if p["asignado_email"] and not p["errors"]:
+                p["asignado"] = self._tecnicos.get(p["asignado_email"].lower())
+                if not p["asignado"]:
+                    p["errors"].append("asignado_email no existe o no es técnico.")
+
+        validas = [p for p in parsed if not p["errors"]]
+        by_viv, by_par = self._existentes(validas)
+
+        nuevos, editados, historial = [], {}, []
+        results = []
+        for p in parsed:
+            if p["errors"]:
+                results.append({"rownum": p["rownum"], "created": False, "updated": False, "errors": p["errors"]})
+                if self.filas_error is not None:
+                    self.filas_error.append((p["rownum"], p["fila"], p["errors"]))
+                continue
+
+            defaults = p["defaults"]
+            asignado = p.get("asignado")
+            par = (defaults["direccion"], defaults["comuna"])
+            obj = by_viv.get(p["id_vivienda"]) if p["id_vivienda"] else by_par.get(par)
+
+            fingerprint = _fingerprint(p)
+            if obj is not None and obj.import_fingerprint == fingerprint:
+                results.append({"rownum": p["rownum"], "created": False, "updated": False, "unchanged": True})
+                continue
+
+            was_created = obj is None
+            if was_created:
+                obj = DireccionAsignada(id_vivienda=p["id_vivienda"], estado="PENDIENTE", **defaults)
+                nuevos.append(obj)
+                old_par = None
+            else:
+                old_par = (obj.direccion, obj.comuna)
+                if obj.pk is not None:
+                    editados[obj.pk] = obj
+                elif self.dry_run:
+                    editados[id(obj)] = obj  # alta simulada en un lote anterior
+
+            for k, v in defaults.items():
+                setattr(obj, k, v)
+
+            # Si viene bloque en archivo, guárdalo como reagendado_bloque (mantiene contrato de UI)
+            if p["bloque"]:
+                obj.reagendado_bloque = p["bloque"]
+
+            if asignado:
+                obj.asignado_a = asignado
+                if not obj.fecha and p["fecha"]:
+                    obj.fecha = p["fecha"]
+                obj.estado = "ASIGNADA"
+            else:
+                obj.asignado_a = None
+                obj.estado = "PENDIENTE"
+            # bulk_create/bulk_update/COPY no pasan por save()
+            obj.prioridad = obj.calcular_prioridad()
+            obj.import_fingerprint = fingerprint
+
+            # Índices del lote: las filas siguientes deben ver este objeto tal como quedó
+            if old_par and old_par != par and by_par.get(old_par) is obj:
+                del by_par[old_par]
+            by_par.setdefault(par, obj)
+            if obj.id_vivienda:
+                by_viv[obj.id_vivienda] = obj
+
+            if self.dry_run:
+                pass  # sin historial: no se escribe nada
+            elif was_created:
+                historial.append(HistorialAsignacion(
+                    asignacion=obj,
+                    accion=getattr(HistorialAsignacion.Accion, "CREADA", "CREADA"),
+                    detalles=f"Creada por carga XLS/CSV. {'Asignada a ' + asignado.email if asignado else 'Sin técnico'}",
+                    usuario=self.usuario,
+                ))
+            else:
+                historial.append(HistorialAsignacion(
+                    asignacion=obj,
+                    accion=getattr(HistorialAsignacion.Accion, "EDITADA", "EDITADA"),
+                    detalles="Actualizada por carga XLS/CSV.",
+                    usuario=self.usuario,
+                ))
+            results.append({"rownum": p["rownum"], "created": was_created, "updated": not was_created})
+
+        if self.dry_run:
+            self._registrar_simulados(nuevos, editados.values())
+            return results
+
+        # Un lote = una transacción: escrituras + avance del checkpoint
+        editados = list(editados.values())
+        with transaction.atomic():
+            if self.pg_copy:
+                importacion_pg.escribir_lote(nuevos, editados, historial)
+            else:
+                self._escribir(nuevos, editados, historial)
+            # reasignadas/desasignadas por la carga: tombstones de /changes/ (bulk_update no pasa por save())
+            BajaAsignacion.objects.bulk_create(BajaAsignacion.por_cambio_de_tecnico(editados))
+            self._avanzar_checkpoint(results)
+        for obj in editados:
+            obj._asignado_a_db = obj.asignado_a_id
+        return results
+
+    def _escribir(self, nuevos, editados, historial):
+        if nuevos:
+            if connection.features.can_return_rows_from_bulk_insert:
+                DireccionAsignada.objects.bulk_create(nuevos, batch_size=self.chunk_size)
+            else:
+                # Sin RETURNING no obtenemos los ids que necesita el historial
+                for obj in nuevos:
+                    obj.save()
+        if editados:
+            now = timezone.now()  # bulk_update no aplica auto_now
+            for obj in editados:
+                obj.updated_at = now
+            DireccionAsignada.objects.bulk_update(editados, _UPDATE_FIELDS, batch_size=self.chunk_size)
+        if historial:
+            HistorialAsignacion.objects.bulk_create(historial, batch_size=self.chunk_size)
+
+    def _avanzar_checkpoint(self, results):
+        cp = self.checkpoint
+        if cp is None or not results:
+            return
+        cp.ultima_fila = results[-1]["rownum"]
+        for r in results:
+            if r.get("errors"):
+                cp.error_count += 1
+            elif r["created"]:
+                cp.created_count += 1
+            elif r["updated"]:
+                cp.updated_count += 1
+            elif r.get("unchanged"):
+                cp.unchanged_count += 1
+        cp.en_curso_hasta = timezone.now() + checkpoint_lease()
+        cp.save(update_fields=[
+            "ultima_fila", "created_count", "updated_count", "unchanged_count", "error_count",
+            "en_curso_hasta", "updated_at",
+        ])
+
+
+# ========================= Resumen / log de la carga =========================
+
+def hash_archivo(f) -> str:
+    """SHA-256 del archivo subido, leído por chunks."""
+    h = hashlib.sha256()
+    for chunk in f.chunks():
+        h.update(chunk)
+    return h.hexdigest()
+
+def carga_previa(archivo_hash: str) -> ImportCheckpoint | None:
+    """Última carga completada de un archivo idéntico (mismo hash), si existe."""
+    return (ImportCheckpoint.objects
+            .filter(archivo_hash=archivo_hash, completado=True)
+            .order_by("-updated_at", "-id")
+            .first())
+
+def resumen_previo(cp: ImportCheckpoint) -> Dict[str, Any]:
+    """Resumen de una carga ya registrada (contadores acumulados del checkpoint)."""
+    return {
+        "created": cp.created_count,
+        "updated": cp.updated_count,
+        "unchanged": cp.unchanged_count,
+        "errors": cp.error_count,
+    }
+
+def checkpoint_para(archivo_hash: str, usuario, nombre: str = "", reanudar: bool = True) -> ImportCheckpoint:
+    """
+    Checkpoint de la carga del archivo `archivo_hash`, tomado en exclusiva: el incompleto
+    del mismo archivo si reanudar=True; si no, lo descarta y empieza uno nuevo.
+    CargaEnCurso si otra carga del mismo archivo lo tiene tomado (en_curso_hasta vigente).
+    """
+    ahora = timezone.now()
+    hasta = ahora + checkpoint_lease()
+    cp = ImportCheckpoint.objects.filter(archivo_hash=archivo_hash, completado=False).first()
+    if cp is not None:
+        # UPDATE condicionado: de dos subidas simultáneas, solo una lo toma
+        tomado = (ImportCheckpoint.objects
+                  .filter(Q(en_curso_hasta__isnull=True) | Q(en_curso_hasta__lt=ahora), pk=cp.pk, completado=False)
+                  .update(en_curso_hasta=hasta))
+        if not tomado:
+            raise CargaEnCurso("otra carga del mismo archivo está en curso")
+        if reanudar:
+            cp.en_curso_hasta = hasta
+            return cp
+        cp.delete()
+    try:
+        with transaction.atomic():
+            return ImportCheckpoint.objects.create(
+                archivo_hash=archivo_hash,
+                nombre=_s(nombre)[:255],
+                usuario=usuario if getattr(usuario, "is_authenticated", False) else None,
+                en_curso_hasta=hasta,
+            )
+    except IntegrityError:
+        # otra subida creó el checkpoint pendiente entre medio (uniq_checkpoint_pendiente_por_hash)
+        raise CargaEnCurso("otra carga del mismo archivo está en curso")
+
+def carga_en_curso(archivo_hash: str) -> bool:
+    """¿Hay una carga de este archivo escribiendo ahora mismo?"""
+    return ImportCheckpoint.objects.filter(
+        archivo_hash=archivo_hash, completado=False, en_curso_hasta__gte=timezone.now(),
+    ).exists()
+
+def rows_from_upload(f, nombre: str = None, parallel: bool = None):
+    """
+    Elige el lector según la extensión del archivo: CSV, .xlsx (una hoja) o, como
+    FilasMultiples, .xlsx con varias hojas y .zip de CSV/XLSX. parallel (por defecto
+    settings.IMPORT_PARALLEL) lee las hojas XLSX en un pool de procesos.
+    """
+    name = _s(nombre or getattr(f, "name", "")).lower()
+    if parallel is None:
+        parallel = getattr(settings, "IMPORT_PARALLEL", False)
+    if name.endswith(".zip"):
+        if not zipfile.is_zipfile(f):
+            raise ValueError("el archivo .zip no es válido")
+        return FilasMultiples(_fuentes_upload(f, name, parallel))
+    if name.endswith(".xlsx"):
+        if _xlsx_hojas(f) > 1:
+            return FilasMultiples(_fuentes_upload(f, name, parallel))
+        return _rows_from_xlsx(f)
+    return _rows_from_csv(f)
+
+# Filas con error que devuelve la respuesta compacta (?respuesta=compacta)
+ERRORES_COMPACTO = 100
+
+def resumen_vacio() -> Dict[str, Any]:
+    return {"created": 0, "updated": 0, "unchanged": 0, "errors": 0}
+
+def _sumar(summary: Dict[str, Any], r: Dict[str, Any]):
+    summary["created"] += bool(r["created"])
+    summary["updated"] += bool(r["updated"])
+    summary["unchanged"] += bool(r.get("unchanged"))
+    summary["errors"] += bool(r.get("errors"))
+
+def sumar_resultado(summary: Dict[str, Any], r: Dict[str, Any]):
+    """Acumula un resultado de fila (para respuestas que no guardan todas las filas)."""
+    _sumar(summary, r)
+    if "fuente" in r:
+        por_fuente = summary.setdefault("fuentes", {})
+        if r["fuente"] not in por_fuente:
+            por_fuente[r["fuente"]] = resumen_vacio()
+        _sumar(por_fuente[r["fuente"]], r)
+
+def completar_resumen(summary: Dict[str, Any], carga: CargaMasiva = None) -> Dict[str, Any]:
+    if carga is not None:
+        summary["fecha_formato"] = carga.fecha_formato
+        if carga.fuentes is not None:
+            # Desglose por hoja/archivo, en orden de lectura (incluye las que no trajeron filas)
+            por_fuente = summary.get("fuentes", {})
+            summary["fuentes"] = {n: por_fuente.get(n) or resumen_vacio() for n in carga.fuentes}
+        if carga.reanudado_desde:
+            # Carga reanudada: las filas <= reanudado_desde se confirmaron en una corrida anterior
+            summary["reanudado_desde"] = carga.reanudado_desde
+    return summary
+
+def resumen_carga(results: Iterable[Dict[str, Any]], carga: CargaMasiva = None) -> Dict[str, Any]:
+    summary = resumen_vacio()
+    for r in results:
+        sumar_resultado(summary, r)
+    return completar_resumen(summary, carga)
+
+def reporte_errores_csv(filas_error, fuente_de=None) -> str:
+    """
+    CSV con las filas rechazadas: nº de fila, motivos y el contenido original de la fila.
+    fuente_de (CargaMasiva.fuente_de) agrega la hoja/archivo de origen en cargas múltiples.
+    """
+    columnas = []
+    for _, fila, _ in filas_error:
+        for k in fila:
+            if k not in columnas:
+                columnas.append(k)
+    out = io.StringIO()
+    w = csv.writer(out)
+    origen = ["fuente", "fila_fuente"] if fuente_de else []
+    w.writerow(["fila", "errores"] + origen + [_s(c) for c in columnas])
+    for rownum, fila, errores in filas_error:
+        origen = list(fuente_de(rownum)) if fuente_de else []
+        w.writerow([rownum, " | ".join(errores)] + origen + [_s(fila.get(c)) for c in columnas])
+    return out.getvalue()
+
+def registrar_log_carga(usuario, nombre: str, summary: Dict[str, int]):
+    try:
+        LogSistema.objects.create(
+            usuario=usuario if getattr(usuario, "is_authenticated", False) else None,
+            accion=getattr(LogSistema.Accion, "ASSIGN_BULK_LOAD", "ASSIGN_BULK_LOAD"),
+            detalle=f"Carga {('XLSX' if nombre.lower().endswith('.xlsx') else 'CSV')} '{nombre or 'desconocido'}': "
+                    f"creados={summary['created']}, "
+                    f"actualizados={summary['updated']}, "
+                    f"sin_cambios={summary['unchanged']}, "
+                    f"errores={summary['errors']}",
+        )
+    except Exception:
+        pass
+
+
+# ========================= Trabajos en background =========================
+
+def tomar_siguiente_job():
+    """
+    Reclama el ImportJob en cola más antiguo (queued -> running).
+    El UPDATE condicionado evita que dos workers tomen el mismo job.
+    """
+    for job in ImportJob.objects.filter(estado=ImportJob.Estado.QUEUED).order_by("created_at", "id")[:10]:
+        claimed = (ImportJob.objects
+                   .filter(pk=job.pk, estado=ImportJob.Estado.QUEUED)
+                   .update(estado=ImportJob.Estado.RUNNING, started_at=timezone.now()))
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+def ejecutar_job(job: ImportJob):
+    """
+    Corre el pipeline de carga para un job ya reclamado, guardando el progreso
+    al cierre de cada lote y, al terminar, el detalle por fila en job.resultados.
+    """
+    progress_fields = ["rows_processed", "created_count", "updated_count", "unchanged_count", "error_count"]
+    results = []
+    try:
+        if not job.archivo or not job.archivo.storage.exists(job.archivo.name):
+            # el worker no ve lo que guardó el proceso web
+            raise FileNotFoundError(f"{job.archivo.name or 'archivo'} no está en IMPORT_STORAGE_ROOT "
+                                    f"({settings.IMPORT_STORAGE_ROOT}); web y worker deben compartir ese directorio")
+        with job.archivo.open("rb") as f:
+            checkpoint = checkpoint_para(hash_archivo(f), job.usuario, job.nombre)
+            carga = CargaMasiva(job.usuario, checkpoint=checkpoint)
+            for r in carga.procesar(rows_from_upload(f, job.nombre or job.archivo.name)):
+                results.append(r)
+                job.rows_processed += 1
+                if r.get("errors"):
+                    job.error_count += 1
+                elif r["created"]:
+                    job.created_count += 1
+                elif r["updated"]:
+                    job.updated_count += 1
+                elif r.get("unchanged"):
+                    job.unchanged_count += 1
+                if job.rows_processed % carga.chunk_size == 0:
+                    job.save(update_fields=progress_fields)
+    except Exception as e:
+        job.estado = ImportJob.Estado.FAILED
+        job.error = (str(e) or e.__class__.__name__)[:2000]
+        job.finished_at = timezone.now()
+        job.archivo.delete(save=False)
+        job.save(update_fields=progress_fields + ["archivo", "estado", "error", "finished_at"])
+        return job
+
+    summary = resumen_carga(results, carga)
+    payload = json.dumps({"ok": True, "rows": results, "summary": summary}, ensure_ascii=False)
+    job.resultados.save(f"import_{job.pk}.json", ContentFile(payload.encode("utf-8")), save=False)
+    job.estado = ImportJob.Estado.DONE
+    job.finished_at = timezone.now()
+    # El archivo subido (datos de clientes) no se guarda más allá de la carga
+    job.archivo.delete(save=False)
+    job.save(update_fields=progress_fields + ["archivo", "resultados", "estado", "finished_at"])
+
+    registrar_log_carga(job.usuario, job.nombre, summary)
+    return job
+
+def purgar_jobs_vencidos() -> int:
+    """
+    Borra los archivos de los jobs terminados hace más de IMPORT_RESULTADOS_DIAS días
+    (resultados y, si quedó, el archivo subido). El registro del job se conserva.
+    """
+    dias = int(getattr(settings, "IMPORT_RESULTADOS_DIAS", 7) or 7)
+    vencidos = (ImportJob.objects
+                .filter(estado__in=[ImportJob.Estado.DONE, ImportJob.Estado.FAILED],
+                        finished_at__lt=timezone.now() - timedelta(days=dias))
+                .exclude(resultados="", archivo=""))
+    n = 0
+    for job in vencidos.iterator():
+        job.archivo.delete(save=False)
+        job.resultados.delete(save=False)
+        job.save(update_fields=["archivo", "resultados"])
+        n += 1
+    return n
@@ -0,0 +1,119 @@
+# asignaciones/importacion_pg.py
+"""
+Escritura de un lote de la carga masiva vía COPY (solo PostgreSQL / psycopg 3).
+
+En vez de bulk_create/bulk_update (INSERT con miles de parámetros y UPDATE con un
+CASE por columna), el lote ya resuelto por CargaMasiva se vuelca con COPY a una
+tabla temporal y se mezcla con asignaciones usando sentencias set-based:
+
+  1. ids nuevos pre-reservados desde la secuencia (el historial los necesita),
+  2. COPY de los estados finales a _stg_asignaciones (ON COMMIT DROP),
+  3. UPDATE ... FROM para asignaciones existentes sin id_vivienda,
+  4. INSERT ... ON CONFLICT (id_vivienda) DO UPDATE para el resto,
+  5. COPY directo del historial a historial_asignaciones.
+
+Debe llamarse dentro de transaction.atomic().
+"""
+from django.db import connection
+from django.utils import timezone
+
+from .models import DireccionAsignada, HistorialAsignacion
+
+_STAGING = "_stg_asignaciones"
+
+# Columnas que se copian/mezclan (además de id)
+_FIELDS = [
+    "fecha", "tecnologia", "marca", "rut_cliente", "id_vivienda", "direccion", "comuna",
+    "zona", "encuesta", "id_qualtrics", "asignado_a", "estado", "reagendado_fecha",
+    "reagendado_bloque", "prioridad", "import_fingerprint", "created_at", "updated_at",
+]
+# created_at no se pisa al actualizar
+_MERGE_FIELDS = [f for f in _FIELDS if f != "created_at"]
+
+_HIST_FIELDS = ["asignacion", "accion", "detalles", "usuario", "created_at"]
+
+
+def _col(model, name):
+    return model._meta.get_field(name).column
+
+def _qn(name):
+    return connection.ops.quote_name(name)
+
+
+def disponible() -> bool:
+    return connection.vendor == "postgresql"
+
+
+def _reservar_ids(cur, n):
+    table = DireccionAsignada._meta.db_table
+    cur.execute(
+        "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+        [table, n],
+    )
+    return [r[0] for r in cur.fetchall()]
+
+
+def escribir_lote(nuevos, editados, historial):
+    table = _qn(DireccionAsignada._meta.db_table)
+    cols = [_col(DireccionAsignada, f) for f in _FIELDS]
+    col_list = ", ".join(_qn(c) for c in cols)
+    viv = _qn(_col(DireccionAsignada, "id_vivienda"))
+    now = timezone.now()
+
+    with connection.cursor() as cur:
+        if nuevos:
+            for obj, pk in zip(nuevos, _reservar_ids(cur, len(nuevos))):
+                obj.id = pk
+                obj.created_at = now
+        for obj in list(nuevos) + list(editados):
+            obj.updated_at = now
+
+        # DROP previo: si el lote corre dentro de una transacción externa (savepoint),
+        # la tabla del lote anterior sigue viva hasta el commit
+        cur.execute(f"DROP TABLE IF EXISTS {_STAGING}")
+        cur.execute(
+            f"CREATE TEMP TABLE {_STAGING} (LIKE {table} INCLUDING DEFAULTS, _existe boolean NOT NULL) "
+            f"ON COMMIT DROP"
+        )
+        with cur.copy(f"COPY {_STAGING} (id, {col_list}, _existe) FROM STDIN") as copy:
+            for existe, objs in ((False, nuevos), (True, editados)):
+                for obj in objs:
+                    copy.write_row(
+                        [obj.id]
+                        + [getattr(obj, DireccionAsignada._meta.get_field(f).attname) for f in _FIELDS]
+                        + [existe]
+                    )
+
+        # Existentes sin id_vivienda (se encontraron por direccion/comuna): UPDATE directo por id
+        set_cols = ", ".join(
+            f"{_qn(c)} = s.{_qn(c)}" for c in (_col(DireccionAsignada, f) for f in _MERGE_FIELDS)
+        )
+        cur.execute(
+            f"UPDATE {table} AS a SET {set_cols} FROM {_STAGING} AS s "
+            f"WHERE a.id = s.id AND s._existe AND s.{viv} = ''"
+        )
+
+        # Nuevas + existentes con id_vivienda: un solo upsert contra el índice único parcial
+        excluded = ", ".join(
+            f"{_qn(c)} = EXCLUDED.{_qn(c)}" for c in (_col(DireccionAsignada, f) for f in _MERGE_FIELDS)
+        )
+        cur.execute(
+            f"INSERT INTO {table} (id, {col_list}) "
+            f"SELECT id, {col_list} FROM {_STAGING} WHERE NOT (_existe AND {viv} = '') ORDER BY id "
+            f"ON CONFLICT ({viv}) WHERE ({viv} IS NOT NULL AND NOT ({viv} = '')) "
+            f"DO UPDATE SET {excluded} "
+            f"RETURNING id, {viv}"
+        )
+        # Si otra carga insertó el mismo id_vivienda entre la precarga y este INSERT,
+        # el upsert actualiza esa fila: el historial debe apuntar a su id real
+        reales = {v: pk for pk, v in cur.fetchall() if v}
+        for obj in nuevos:
+            if obj.id_vivienda and reales.get(obj.id_vivienda, obj.id) != obj.id:
+                obj.id = reales[obj.id_vivienda]
+
+        if historial:
+            h_table = _qn(HistorialAsignacion._meta.db_table)
+            h_cols = ", ".join(_qn(_col(HistorialAsignacion, f)) for f in _HIST_FIELDS)
+            with cur.copy(f"COPY {h_table} ({h_cols}) FROM STDIN") as copy:
+                for h in historial:
+                    copy.write_row([h.asignacion.pk, h.accion, h.detalles, h.usuario_id, now])
@@ -0,0 +1,83 @@
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from usuarios.models import Usuario
+from asignaciones.benchmark import (
+    BENCH_SIZES, BENCH_FORMATS, generar_filas, escribir_csv, escribir_xlsx, medir_carga,
+)
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("Benchmark de cargar_csv con archivos sintéticos CSV/XLSX: filas/seg, queries por fila, "
+            "memoria pico y wall time. Por defecto revierte todo lo escrito.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default=",".join(str(n) for n in BENCH_SIZES),
+                            help="Tamaños separados por coma (por defecto 1000,10000,100000,500000).")
+        parser.add_argument("--formats", default=",".join(BENCH_FORMATS), help="csv,xlsx")
+        parser.add_argument("--tecnicos", type=int, default=20, help="Nº de técnicos sintéticos.")
+        parser.add_argument("--parallel", choices=["0", "1"], help="Fuerza ?parallel= en cargar_csv.")
+        parser.add_argument("--no-tracemalloc", action="store_true",
+                            help="No mide memoria (tracemalloc ralentiza la carga).")
+        parser.add_argument("--keep", action="store_true", help="Deja en la BD lo cargado (no revierte).")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **opts):
+        try:
+            sizes = [int(s) for s in opts["sizes"].split(",") if s.strip()]
+        except ValueError:
+            raise CommandError("--sizes debe ser una lista de enteros separada por comas")
+        formats = [f.strip().lower() for f in opts["formats"].split(",") if f.strip()]
+        if set(formats) - set(BENCH_FORMATS):
+            raise CommandError(f"--formats admite: {', '.join(BENCH_FORMATS)}")
+        params = {"parallel": opts["parallel"]} if opts["parallel"] else {}
+
+        self.stdout.write(f"{'archivo':<22}{'filas':>9}{'wall s':>10}{'filas/s':>11}"
+                          f"{'queries':>9}{'q/fila':>9}{'mem MB':>9}")
+        with tempfile.TemporaryDirectory(prefix="bench_import_") as tmp:
+            for n in sizes:
+                for fmt in formats:
+                    try:
+                        r = self._run(tmp, n, fmt, params, opts)
+                    except _Rollback as e:
+                        r = e.args[0]
+                    self.stdout.write(
+                        f"{r['archivo']:<22}{r['filas']:>9}{r['wall_s']:>10}{r['filas_por_s']:>11}"
+                        f"{r['queries']:>9}{r['queries_por_fila']:>9}{str(r['memoria_pico_mb']):>9}"
+                    )
+                    self.stdout.write(f"  summary={r['summary']}")
+
+    def _run(self, tmp, n, fmt, params, opts):
+        with transaction.atomic():
+            admin, tecnicos = self._usuarios(opts["tecnicos"], opts["seed"])
+            nombre = f"bench_{n}.{fmt}"
+            path = os.path.join(tmp, nombre)
+            filas = generar_filas(n, tecnicos, seed=opts["seed"])
+            (escribir_xlsx if fmt == "xlsx" else escribir_csv)(path, filas)
+            r = medir_carga(admin, path, nombre, trace_memoria=not opts["no_tracemalloc"], **params)
+            os.unlink(path)
+            if not opts["keep"]:
+                raise _Rollback(r)
+            return r
+
+    def _usuarios(self, n_tecnicos, seed):
+        pre = f"bench{seed}"
+        admin, _ = Usuario.objects.get_or_create(
+            email=f"{pre}-admin@benchmark.local",
+            defaults={"rol": "administrador", "first_name": "Bench", "last_name": "Admin"},
+        )
+        tecnicos = []
+        for i in range(n_tecnicos):
+            email = f"{pre}-tec{i}@benchmark.local"
+            Usuario.objects.get_or_create(
+                email=email, defaults={"rol": "tecnico", "first_name": "Bench", "last_name": f"Tec {i}"},
+            )
+            tecnicos.append(email)
+        return admin, tecnicos
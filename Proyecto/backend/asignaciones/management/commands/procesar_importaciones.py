@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from asignaciones.importacion import tomar_siguiente_job, ejecutar_job, purgar_jobs_vencidos
+
+
+class Command(BaseCommand):
+    help = ("Worker de cargas CSV/XLSX en background: procesa los ImportJob en cola (cargar_csv?background=1). "
+            "Lee los archivos de settings.IMPORT_STORAGE_ROOT: debe ser el mismo directorio que usa el proceso web.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Procesa los jobs en cola y termina.")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Segundos de espera cuando no hay jobs.")
+
+    def handle(self, *args, **opts):
+        self.stdout.write(self.style.SUCCESS("[IMPORT] Worker iniciado"))
+        while True:
+            close_old_connections()
+            job = tomar_siguiente_job()
+            if job is None:
+                purgados = purgar_jobs_vencidos()
+                if purgados:
+                    self.stdout.write(f"[IMPORT] Resultados vencidos borrados: {purgados} job(s)")
+                if opts["once"]:
+                    return
+                time.sleep(opts["sleep"])
+                continue
+
+            self.stdout.write(f"[IMPORT] Job #{job.id} '{job.nombre}' en proceso")
+            job = ejecutar_job(job)
+            if job.estado == job.Estado.DONE:
+                self.stdout.write(self.style.SUCCESS(
+                    f"[IMPORT] Job #{job.id} OK: filas={job.rows_processed} creadas={job.created_count} "
+                    f"actualizadas={job.updated_count} errores={job.error_count}"
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(f"[IMPORT] Job #{job.id} FALLÓ: {job.error}"))
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asignaciones', '0008_alter_direccionasignada_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archivo', models.FileField(upload_to='imports/', verbose_name='Archivo')),
+                ('nombre', models.CharField(blank=True, max_length=255, verbose_name='Nombre original')),
+                ('estado', models.CharField(choices=[('queued', 'En cola'), ('running', 'Procesando'), ('done', 'Completado'), ('failed', 'Falló')], default='queued', max_length=10, verbose_name='Estado')),
+                ('rows_processed', models.PositiveIntegerField(default=0, verbose_name='Filas procesadas')),
+                ('created_count', models.PositiveIntegerField(default=0, verbose_name='Creadas')),
+                ('updated_count', models.PositiveIntegerField(default=0, verbose_name='Actualizadas')),
+                ('error_count', models.PositiveIntegerField(default=0, verbose_name='Con error')),
+                ('resultados', models.FileField(blank=True, upload_to='imports/resultados/', verbose_name='Resultados por fila')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Creado')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Inicio')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Término')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de importación',
+                'verbose_name_plural': 'Trabajos de importación',
+                'db_table': 'import_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['estado', 'created_at'], name='import_jobs_estado_ee3dd4_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asignaciones', '0009_import_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='direccionasignada',
+            name='import_fingerprint',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40, verbose_name='Huella de carga'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='unchanged_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Sin cambios'),
+        ),
+    ]
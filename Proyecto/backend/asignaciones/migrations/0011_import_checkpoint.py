@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asignaciones', '0010_import_fingerprint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archivo_hash', models.CharField(max_length=64, verbose_name='SHA-256 del archivo')),
+                ('nombre', models.CharField(blank=True, max_length=255, verbose_name='Nombre original')),
+                ('ultima_fila', models.PositiveIntegerField(default=0, verbose_name='Última fila confirmada')),
+                ('completado', models.BooleanField(default=False, verbose_name='Completado')),
+                ('created_count', models.PositiveIntegerField(default=0, verbose_name='Creadas')),
+                ('updated_count', models.PositiveIntegerField(default=0, verbose_name='Actualizadas')),
+                ('unchanged_count', models.PositiveIntegerField(default=0, verbose_name='Sin cambios')),
+                ('error_count', models.PositiveIntegerField(default=0, verbose_name='Con error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Creado')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Actualizado')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Checkpoint de importación',
+                'verbose_name_plural': 'Checkpoints de importación',
+                'db_table': 'import_checkpoints',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['archivo_hash', 'completado'], name='import_chec_archivo_7ed205_idx')],
+            },
+        ),
+    ]
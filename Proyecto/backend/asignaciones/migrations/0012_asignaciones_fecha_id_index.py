@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asignaciones', '0011_import_checkpoint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='direccionasignada',
+            name='asignacione_fecha_89be0e_idx',
+        ),
+        migrations.AddIndex(
+            model_name='direccionasignada',
+            index=models.Index(fields=['fecha', 'id'], name='asignacione_fecha_3c43e3_idx'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asignaciones', '0012_asignaciones_fecha_id_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='direccionasignada',
+            name='asignacione_marca_f5bbb2_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='direccionasignada',
+            name='asignacione_comuna_3d37ad_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='direccionasignada',
+            name='asignacione_zona_146298_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='direccionasignada',
+            name='asignacione_estado_4add16_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='direccionasignada',
+            name='asignacione_asignad_0af72d_idx',
+        ),
+        migrations.AddIndex(
+            model_name='direccionasignada',
+            index=models.Index(fields=['estado', 'fecha', 'id'], name='asignacione_estado_af974c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='direccionasignada',
+            index=models.Index(fields=['asignado_a', 'fecha', 'id'], name='asignacione_asignad_844443_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='direccionasignada',
+            index=models.Index(fields=['zona', 'fecha'], name='asignacione_zona_7d2d98_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='direccionasignada',
+            index=models.Index(fields=['comuna', 'fecha'], name='asignacione_comuna_7082ce_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='direccionasignada',
+            index=models.Index(fields=['marca', 'tecnologia', 'fecha'], name='asignacione_marca_3f442a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='direccionasignada',
+            index=models.Index(condition=models.Q(('estado__in', ['PENDIENTE', 'ASIGNADA', 'REAGENDADA'])), fields=['asignado_a', 'fecha', 'id'], name='asig_activas_tecnico_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='direccionasignada',
+            index=models.Index(condition=models.Q(('reagendado_fecha__isnull', False)), fields=['fecha'], name='asig_reagendadas_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historialasignacion',
+            index=models.Index(fields=['created_at', 'id'], name='historial_a_created_652bbd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historialasignacion',
+            index=models.Index(fields=['asignacion', 'created_at', 'id'], name='historial_a_asignac_5fc639_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historialasignacion',
+            index=models.Index(fields=['usuario', 'created_at', 'id'], name='historial_a_usuario_e219a0_idx'),
+        ),
+    ]
@@ -0,0 +1,78 @@
+from django.db import DatabaseError, migrations, transaction
+
+# Copia fija de lo que definía asignaciones/busqueda.py al escribir esta migración:
+# cambios posteriores a ese módulo no deben alterar lo que hace una migración ya aplicada.
+CAMPOS = ("direccion", "comuna", "rut_cliente", "id_vivienda", "id_qualtrics")
+FTS_TABLA = "asignaciones_fts"
+TSV_INDICE = "asig_busqueda_tsv_idx"
+TSV_EXPR = "to_tsvector('simple', {})".format(" || ' ' || ".join(f"coalesce({c}, '')" for c in CAMPOS))
+
+
+def _fts_triggers():
+    cols = ", ".join(CAMPOS)
+    viejos = ", ".join(f"old.{c}" for c in CAMPOS)
+    nuevos = ", ".join(f"new.{c}" for c in CAMPOS)
+    borrar = f"INSERT INTO {FTS_TABLA}({FTS_TABLA}, rowid, {cols}) VALUES ('delete', old.id, {viejos});"
+    insertar = f"INSERT INTO {FTS_TABLA}(rowid, {cols}) VALUES (new.id, {nuevos});"
+    return {
+        f"{FTS_TABLA}_ai": f"AFTER INSERT ON asignaciones BEGIN {insertar} END",
+        f"{FTS_TABLA}_ad": f"AFTER DELETE ON asignaciones BEGIN {borrar} END",
+        f"{FTS_TABLA}_au": f"AFTER UPDATE OF {cols} ON asignaciones BEGIN {borrar} {insertar} END",
+    }
+
+
+def crear(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor == "postgresql":
+        try:
+            with transaction.atomic(using=conn.alias):
+                schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except DatabaseError:
+            # pg_trgm no instalado (contrib) o sin permisos: índice tsvector, sin extensiones
+            schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {TSV_INDICE} ON asignaciones USING gin ({TSV_EXPR})")
+            return
+        # sobre UPPER(col::text): es lo que genera icontains en PostgreSQL
+        for c in CAMPOS:
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS asig_{c}_trgm_idx ON asignaciones "
+                f"USING gin ((UPPER({c}::text)) gin_trgm_ops)"
+            )
+    elif conn.vendor == "sqlite":
+        try:
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLA} USING fts5({', '.join(CAMPOS)}, "
+                f"content='asignaciones', content_rowid='id', tokenize='trigram')"
+            )
+        except Exception:
+            # SQLite sin FTS5 o sin tokenizer trigram (< 3.34): queda icontains
+            return
+        for nombre, cuerpo in _fts_triggers().items():
+            schema_editor.execute(f"CREATE TRIGGER {nombre} {cuerpo}")
+        schema_editor.execute(f"INSERT INTO {FTS_TABLA}({FTS_TABLA}) VALUES ('rebuild')")
+
+
+def borrar(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor == "postgresql":
+        for c in CAMPOS:
+            schema_editor.execute(f"DROP INDEX IF EXISTS asig_{c}_trgm_idx")
+        schema_editor.execute(f"DROP INDEX IF EXISTS {TSV_INDICE}")
+    elif conn.vendor == "sqlite":
+        for nombre in _fts_triggers():
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLA}")
+
+
+class Migration(migrations.Migration):
+    """
+    Índices de búsqueda de texto (ver asignaciones/busqueda.py):
+    GIN pg_trgm en PostgreSQL, tabla FTS5 trigram + triggers en SQLite.
+    """
+
+    dependencies = [
+        ('asignaciones', '0013_query_shape_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear, borrar),
+    ]
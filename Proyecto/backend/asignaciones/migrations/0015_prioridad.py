@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:04
+
+import asignaciones.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+def calcular_prioridad(apps, schema_editor):
+    DireccionAsignada = apps.get_model("asignaciones", "DireccionAsignada")
+    # el default (3, sin asignar) ya quedó puesto por AddField: solo se reescriben las demás
+    DireccionAsignada.objects.filter(reagendado_fecha__isnull=False).update(prioridad=1)
+    DireccionAsignada.objects.filter(reagendado_fecha__isnull=True, asignado_a__isnull=False).update(prioridad=2)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asignaciones', '0014_busqueda_indices'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='direccionasignada',
+            name='prioridad',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Reagendada'), (2, 'Asignada a técnico'), (3, 'Sin asignar')], default=3, editable=False, verbose_name='Prioridad'),
+        ),
+        migrations.RunPython(calcular_prioridad, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='direccionasignada',
+            name='asignado_a',
+            field=models.ForeignKey(blank=True, limit_choices_to={'rol': 'tecnico'}, null=True, on_delete=asignaciones.models.SET_NULL_TECNICO, to=settings.AUTH_USER_MODEL, verbose_name='Técnico asignado'),
+        ),
+        migrations.AddIndex(
+            model_name='direccionasignada',
+            index=models.Index(fields=['prioridad', 'fecha', 'id'], name='asignacione_priorid_271de8_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asignaciones', '0015_prioridad'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='direccionasignada',
+            index=models.Index(fields=['updated_at', 'id'], name='asignacione_updated_1aff44_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asignaciones', '0016_updated_at_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BajaAsignacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('asignacion_id', models.BigIntegerField(verbose_name='ID asignación')),
+                ('motivo', models.CharField(choices=[('DESASIGNADA', 'Desasignada'), ('REASIGNADA', 'Reasignada a otro técnico'), ('ELIMINADA', 'Eliminada')], max_length=12, verbose_name='Motivo')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Creado')),
+            ],
+            options={
+                'verbose_name': 'Baja de asignación',
+                'verbose_name_plural': 'Bajas de asignaciones',
+                'db_table': 'bajas_asignaciones',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='direccionasignada',
+            index=models.Index(fields=['asignado_a', 'updated_at', 'id'], name='asignacione_asignad_28ed9c_idx'),
+        ),
+        migrations.AddField(
+            model_name='bajaasignacion',
+            name='tecnico',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Técnico'),
+        ),
+        migrations.AddIndex(
+            model_name='bajaasignacion',
+            index=models.Index(fields=['tecnico', 'created_at', 'id'], name='bajas_asign_tecnico_9f5083_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bajaasignacion',
+            index=models.Index(fields=['motivo', 'created_at', 'id'], name='bajas_asign_motivo_99a539_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:52
+
+import asignaciones.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asignaciones', '0017_bajas_asignaciones'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='importjob',
+            name='archivo',
+            field=models.FileField(blank=True, storage=asignaciones.models.almacenamiento_importaciones, upload_to='archivos/', verbose_name='Archivo'),
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='resultados',
+            field=models.FileField(blank=True, storage=asignaciones.models.almacenamiento_importaciones, upload_to='resultados/', verbose_name='Resultados por fila'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def un_pendiente_por_hash(apps, schema_editor):
+    # deja solo el checkpoint incompleto más reciente de cada archivo
+    ImportCheckpoint = apps.get_model("asignaciones", "ImportCheckpoint")
+    vistos = set()
+    for cp in ImportCheckpoint.objects.filter(completado=False).order_by("-updated_at", "-id"):
+        if cp.archivo_hash in vistos:
+            cp.delete()
+        vistos.add(cp.archivo_hash)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asignaciones', '0018_import_job_storage_privado'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importcheckpoint',
+            name='en_curso_hasta',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='En curso hasta'),
+        ),
+        migrations.RunPython(un_pendiente_por_hash, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='importcheckpoint',
+            constraint=models.UniqueConstraint(condition=models.Q(('completado', False)), fields=('archivo_hash',), name='uniq_checkpoint_pendiente_por_hash'),
+        ),
+    ]
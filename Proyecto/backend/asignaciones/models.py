@@ -1,7 +1,10 @@
 # asignaciones/models.py
 
-from django.db import models
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import models, transaction
 from django.db.models import Q
+from django.utils.functional import cached_property
 from usuarios.models import Usuario
 
 class Marca(models.TextChoices):
@@ -29,6 +32,41 @@ class BloqueHorario(models.TextChoices):
     DIEZ_TRECE        = "10-13", "10:00 a 13:00"
     CATORCE_DIECIOCHO = "14-18", "14:00 a 18:00"
 
+class PrioridadAsignacion(models.IntegerChoices):
+    REAGENDADA  = 1, "Reagendada"
+    ASIGNADA    = 2, "Asignada a técnico"
+    SIN_ASIGNAR = 3, "Sin asignar"
+
+# Campos de los que depende DireccionAsignada.prioridad
+_CAMPOS_PRIORIDAD = {"reagendado_fecha", "asignado_a", "asignado_a_id"}
+_CAMPOS_TECNICO = {"asignado_a", "asignado_a_id"}
+# asignado_a_id no cargado (.only()/.defer()): el técnico en la BD se lee al guardar
+_SIN_LEER = object()
+# Lo que escribe la carga CSV/XLSX (attnames): si save() cambia alguno, la huella de carga
+# deja de describir la fila y se borra, para que volver a cargar el archivo la reescriba
+_CAMPOS_CARGA = frozenset({
+    "rut_cliente", "direccion", "comuna", "marca", "tecnologia", "encuesta", "id_qualtrics",
+    "fecha", "zona", "id_vivienda", "reagendado_bloque", "asignado_a_id", "estado",
+})
+
+
+def SET_NULL_TECNICO(collector, field, sub_objs, using):
+    """
+    on_delete de asignado_a: SET_NULL y, como no pasa por save(), también la
+    prioridad de las que no están reagendadas (quedan sin asignar).
+    """
+    models.SET_NULL(collector, field, sub_objs, using)
+    # se resuelven ya: un queryset perezoso filtrado por asignado_a se evaluaría
+    # después del SET NULL y no encontraría filas
+    sin_reagendar = list(
+        field.model._base_manager.using(using)
+        .filter(pk__in=[o.pk for o in sub_objs], reagendado_fecha__isnull=True)
+        .only("pk")
+    )
+    prioridad = field.model._meta.get_field("prioridad")
+    collector.add_field_update(prioridad, PrioridadAsignacion.SIN_ASIGNAR, sin_reagendar)
+    collector.add_field_update(field.model._meta.get_field("import_fingerprint"), "", sub_objs)
+
 # ⚠️ Eliminamos ZonaSantiago con choices para que la zona sea “escalable”.
 
 class DireccionAsignada(models.Model):
@@ -47,7 +85,7 @@ class DireccionAsignada(models.Model):
 
     asignado_a = models.ForeignKey(
         Usuario, verbose_name="Técnico asignado",
-        null=True, blank=True, on_delete=models.SET_NULL,
+        null=True, blank=True, on_delete=SET_NULL_TECNICO,
         limit_choices_to={"rol": "tecnico"}
     )
 
@@ -62,6 +100,18 @@ class DireccionAsignada(models.Model):
                                          choices=BloqueHorario.choices, null=True, blank=True,
                                          help_text="Solo se completa cuando el cliente reagenda.")
 
+    # ?order=prioridad: columna guardada (no un CASE por consulta) para que el índice
+    # (prioridad, fecha, id) sirva el orden. La mantiene save() / calcular_prioridad();
+    # las escrituras masivas (carga CSV, COPY) la calculan antes de escribir.
+    prioridad = models.PositiveSmallIntegerField(
+        "Prioridad", choices=PrioridadAsignacion.choices, default=PrioridadAsignacion.SIN_ASIGNAR,
+        editable=False,
+    )
+
+    # huella (sha1) de los campos que trajo la última carga CSV/XLSX; si una nueva carga
+    # trae la misma huella la fila se omite (ni save ni historial)
+    import_fingerprint = models.CharField("Huella de carga", max_length=40, blank=True, default="", editable=False)
+
     created_at = models.DateTimeField("Creado", auto_now_add=True)
     updated_at = models.DateTimeField("Actualizado", auto_now=True)
 
@@ -69,15 +119,39 @@ class DireccionAsignada(models.Model):
         db_table = "asignaciones"
         verbose_name = "Dirección asignada"
         verbose_name_plural = "Direcciones asignadas"
+        # Índices según las consultas de views.py (listado, métricas, historial) y auditoria/views.py
         indexes = [
             models.Index(fields=["rut_cliente", "id_vivienda"]),
-            models.Index(fields=["marca", "tecnologia"]),
             models.Index(fields=["encuesta"]),
-            models.Index(fields=["comuna"]),
-            models.Index(fields=["zona"]),
-            models.Index(fields=["estado"]),
-            models.Index(fields=["fecha"]),
-            models.Index(fields=["asignado_a"]),
+            # (fecha, id): orden del listado y cursor de ?cursor= (también cubre filtros por fecha)
+            models.Index(fields=["fecha", "id"]),
+            # ?order=prioridad (y su cursor)
+            models.Index(fields=["prioridad", "fecha", "id"]),
+            # versión de los listados (ETag: MAX(updated_at), core/condicional.py) desde el extremo del índice
+            # y /changes/ del administrador
+            models.Index(fields=["updated_at", "id"]),
+            # /changes/ del técnico: sus cambios desde el cursor (updated_at, id)
+            models.Index(fields=["asignado_a", "updated_at", "id"]),
+            # ?estado= del listado (orden fecha, id) y conteos por estado de las métricas
+            models.Index(fields=["estado", "fecha", "id"]),
+            # ?asignado_a= / ?mine=1 del listado y métricas por técnico
+            models.Index(fields=["asignado_a", "fecha", "id"]),
+            # Métricas: rango de fechas + zona / comuna / marca(+tecnología)
+            models.Index(fields=["zona", "fecha"]),
+            models.Index(fields=["comuna", "fecha"]),
+            models.Index(fields=["marca", "tecnologia", "fecha"]),
+            # Parcial: visitas activas (no finales) por técnico, la lista de trabajo de la app
+            models.Index(
+                fields=["asignado_a", "fecha", "id"],
+                condition=Q(estado__in=["PENDIENTE", "ASIGNADA", "REAGENDADA"]),
+                name="asig_activas_tecnico_idx",
+            ),
+            # Parcial: reagendadas (conteos/series de reagendamientos en métricas)
+            models.Index(
+                fields=["fecha"],
+                condition=Q(reagendado_fecha__isnull=False),
+                name="asig_reagendadas_fecha_idx",
+            ),
         ]
         constraints = [
             # clave única por id_vivienda cuando está presente
@@ -91,6 +165,82 @@ class DireccionAsignada(models.Model):
     def __str__(self):
         return f"{self.direccion} ({self.comuna})"
 
+    def calcular_prioridad(self) -> int:
+        """1 reagendada, 2 asignada a técnico, 3 el resto (orden de ?order=prioridad)."""
+        if self.reagendado_fecha is not None:
+            return PrioridadAsignacion.REAGENDADA
+        if self.asignado_a_id is not None:
+            return PrioridadAsignacion.ASIGNADA
+        return PrioridadAsignacion.SIN_ASIGNAR
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        obj = super().from_db(db, field_names, values)
+        # técnico según la BD: si save() lo cambia se registra la baja (BajaAsignacion)
+        obj._asignado_a_db = obj.__dict__.get("asignado_a_id", _SIN_LEER)
+        # fila leída, tal cual: los valores de carga se arman solo si save() los compara (_carga_antes)
+        obj._fila_db = (field_names, values)
+        return obj
+
+    def refresh_from_db(self, using=None, fields=None, *args, **kwargs):
+        super().refresh_from_db(using, fields, *args, **kwargs)
+        # al leer un campo diferido (fields=[...]) el resto puede tener cambios sin guardar:
+        # solo se actualiza lo que se leyó
+        leidos = None if fields is None else {getattr(self._meta.get_field(f), "attname", f) for f in fields}
+        if leidos is None or "asignado_a_id" in leidos:
+            self._asignado_a_db = self.__dict__.get("asignado_a_id", _SIN_LEER)
+        self._carga_db = {**self._carga_antes(), **self._valores_carga(leidos)}
+
+    def _carga_antes(self) -> dict:
+        """Valores de carga según la BD; se arman desde la fila de from_db la primera vez."""
+        fila = self.__dict__.pop("_fila_db", None)
+        if fila is not None:
+            self._carga_db = {k: v for k, v in zip(*fila) if k in _CAMPOS_CARGA}
+        return self.__dict__.get("_carga_db", {})
+
+    def _valores_carga(self, campos=None) -> dict:
+        campos = _CAMPOS_CARGA if campos is None else _CAMPOS_CARGA & campos
+        return {k: self.__dict__[k] for k in campos if k in self.__dict__}
+
+    def _cambio_fuera_de_carga(self, update_fields) -> bool:
+        """¿save() va a cambiar algo que escribe la carga? (la carga misma no usa save() al editar)"""
+        if self._state.adding or not self.import_fingerprint:
+            return False
+        campos = _CAMPOS_CARGA
+        if update_fields is not None:
+            campos = campos & {self._meta.get_field(f).attname for f in update_fields}
+        antes = self._carga_antes()
+        # sin valor leído de la BD no se puede comparar: se asume cambio
+        return any(k in self.__dict__ and (k not in antes or antes[k] != self.__dict__[k]) for k in campos)
+
+    def save(self, *args, **kwargs):
+        self.prioridad = self.calcular_prioridad()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and _CAMPOS_PRIORIDAD & set(update_fields):
+            kwargs["update_fields"] = [*update_fields, "prioridad"]
+        if self._cambio_fuera_de_carga(update_fields):
+            self.import_fingerprint = ""
+            if update_fields is not None:
+                kwargs["update_fields"] = [*kwargs["update_fields"], "import_fingerprint"]
+
+        bajas = []
+        if (not self._state.adding and "asignado_a_id" in self.__dict__
+                and (update_fields is None or _CAMPOS_TECNICO & set(update_fields))):
+            if getattr(self, "_asignado_a_db", None) is _SIN_LEER:
+                self._asignado_a_db = (type(self)._base_manager.filter(pk=self.pk)
+                                       .values_list("asignado_a_id", flat=True).first())
+            bajas = BajaAsignacion.por_cambio_de_tecnico([self])
+        if bajas:
+            # sale del alcance del técnico anterior: tombstone de /changes/ en la misma transacción
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                BajaAsignacion.objects.bulk_create(bajas)
+        else:
+            super().save(*args, **kwargs)
+        self._asignado_a_db = self.__dict__.get("asignado_a_id", _SIN_LEER)
+        self.__dict__.pop("_fila_db", None)
+        self._carga_db = self._valores_carga()
+
 class Reagendamiento(models.Model):
     asignacion = models.ForeignKey(
         DireccionAsignada, on_delete=models.CASCADE, related_name="reagendamientos",
@@ -137,9 +287,181 @@ class HistorialAsignacion(models.Model):
         verbose_name = "Historial de asignación"
         verbose_name_plural = "Historial de asignaciones"
         ordering = ["-created_at"]
+        indexes = [
+            # /historial/: orden -created_at, -id
+            models.Index(fields=["created_at", "id"]),
+            # /historial/export/: orden asignacion, created_at, id
+            models.Index(fields=["asignacion", "created_at", "id"]),
+            # alcance del técnico: usuario_id = X OR asignacion.asignado_a_id = X
+            models.Index(fields=["usuario", "created_at", "id"]),
+        ]
 
     def __str__(self):
         return f"H{self.id} {self.accion} @A{self.asignacion_id}"
 
+
+class BajaAsignacion(models.Model):
+    """
+    Tombstone de /api/asignaciones/changes/: la asignación salió del alcance de
+    `tecnico` (desasignada o reasignada a otro) o se eliminó (tecnico = el que
+    tenía, o NULL). Solo guarda el id: la fila puede ya no existir.
+    """
+    class Motivo(models.TextChoices):
+        DESASIGNADA = "DESASIGNADA", "Desasignada"
+        REASIGNADA  = "REASIGNADA",  "Reasignada a otro técnico"
+        ELIMINADA   = "ELIMINADA",   "Eliminada"
+
+    asignacion_id = models.BigIntegerField("ID asignación")
+    tecnico    = models.ForeignKey(Usuario, on_delete=models.CASCADE, null=True, blank=True,
+                                   related_name="+", verbose_name="Técnico")
+    motivo     = models.CharField("Motivo", max_length=12, choices=Motivo.choices)
+    created_at = models.DateTimeField("Creado", auto_now_add=True)
+
+    class Meta:
+        db_table = "bajas_asignaciones"
+        verbose_name = "Baja de asignación"
+        verbose_name_plural = "Bajas de asignaciones"
+        indexes = [
+            # /changes/ del técnico (tecnico = X) y del administrador (eliminadas), desde el cursor
+            models.Index(fields=["tecnico", "created_at", "id"]),
+            models.Index(fields=["motivo", "created_at", "id"]),
+        ]
+
+    def __str__(self):
+        return f"Baja {self.motivo} A{self.asignacion_id} (tec {self.tecnico_id})"
+
+    @classmethod
+    def por_cambio_de_tecnico(cls, asignaciones):
+        """Bajas (sin guardar) de las asignaciones cuyo técnico en la BD ya no es el actual."""
+        bajas = []
+        for a in asignaciones:
+            anterior = getattr(a, "_asignado_a_db", None)
+            if anterior is None or anterior is _SIN_LEER or anterior == a.asignado_a_id:
+                continue
+            motivo = cls.Motivo.DESASIGNADA if a.asignado_a_id is None else cls.Motivo.REASIGNADA
+            bajas.append(cls(asignacion_id=a.pk, tecnico_id=anterior, motivo=motivo))
+        return bajas
+
+    @classmethod
+    def ultima(cls):
+        """La última baja, por pk (no hay índice que empiece por created_at): fuente de VersionHTTP.de_tablas."""
+        return cls.objects.order_by("-id")[:1]
+
 # Alias para otras apps
 Asignacion = DireccionAsignada
+
+
+class AlmacenamientoImportaciones(FileSystemStorage):
+    """
+    Storage privado de las cargas: settings.IMPORT_STORAGE_ROOT (fuera de MEDIA_ROOT)
+    y sin URL pública; los archivos solo se leen desde el worker y las vistas.
+    """
+
+    @cached_property
+    def base_location(self):
+        return self._value_or_setting(self._location, settings.IMPORT_STORAGE_ROOT)
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        super()._clear_cached_properties(setting, **kwargs)
+        if setting == "IMPORT_STORAGE_ROOT":
+            self.__dict__.pop("base_location", None)
+            self.__dict__.pop("location", None)
+
+    def url(self, name):
+        raise ValueError("Los archivos de importación no tienen URL pública.")
+
+
+def almacenamiento_importaciones():
+    return AlmacenamientoImportaciones()
+
+
+class ImportJob(models.Model):
+    """
+    Carga CSV/XLSX encolada: el archivo se guarda y un proceso worker
+    (manage.py procesar_importaciones) ejecuta el parseo/upsert fuera del request.
+    Archivo y resultados van al storage privado, nunca a MEDIA_ROOT; el archivo se
+    borra al terminar el job y los resultados al vencer (IMPORT_RESULTADOS_DIAS).
+    """
+    class Estado(models.TextChoices):
+        QUEUED  = "queued",  "En cola"
+        RUNNING = "running", "Procesando"
+        DONE    = "done",    "Completado"
+        FAILED  = "failed",  "Falló"
+
+    archivo    = models.FileField("Archivo", upload_to="archivos/", storage=almacenamiento_importaciones, blank=True)
+    nombre     = models.CharField("Nombre original", max_length=255, blank=True)
+    usuario    = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Usuario")
+    estado     = models.CharField("Estado", max_length=10, choices=Estado.choices, default=Estado.QUEUED)
+
+    rows_processed = models.PositiveIntegerField("Filas procesadas", default=0)
+    created_count  = models.PositiveIntegerField("Creadas", default=0)
+    updated_count  = models.PositiveIntegerField("Actualizadas", default=0)
+    unchanged_count = models.PositiveIntegerField("Sin cambios", default=0)
+    error_count    = models.PositiveIntegerField("Con error", default=0)
+
+    resultados = models.FileField("Resultados por fila", upload_to="resultados/", storage=almacenamiento_importaciones,
+                                  blank=True)
+    error      = models.TextField("Error", blank=True, default="")
+
+    created_at  = models.DateTimeField("Creado", auto_now_add=True)
+    started_at  = models.DateTimeField("Inicio", null=True, blank=True)
+    finished_at = models.DateTimeField("Término", null=True, blank=True)
+
+    class Meta:
+        db_table = "import_jobs"
+        verbose_name = "Trabajo de importación"
+        verbose_name_plural = "Trabajos de importación"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["estado", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"Import #{self.id} [{self.estado}] {self.nombre}"
+
+
+class ImportCheckpoint(models.Model):
+    """
+    Avance de una carga CSV/XLSX, identificada por el hash del archivo.
+    Se actualiza en la misma transacción que escribe cada lote, así que
+    ultima_fila siempre es la última fila efectivamente confirmada; si la carga
+    se corta, al volver a subir el mismo archivo se reanuda desde ahí.
+
+    A lo más un checkpoint incompleto por archivo, y solo una carga a la vez lo usa:
+    en_curso_hasta es el plazo de esa carga, renovado con cada lote. Mientras no
+    venza, otra subida del mismo archivo recibe 409 en vez de escribir los mismos lotes.
+    """
+    archivo_hash = models.CharField("SHA-256 del archivo", max_length=64)
+    nombre       = models.CharField("Nombre original", max_length=255, blank=True)
+    usuario      = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Usuario")
+
+    ultima_fila  = models.PositiveIntegerField("Última fila confirmada", default=0)
+    completado   = models.BooleanField("Completado", default=False)
+    en_curso_hasta = models.DateTimeField("En curso hasta", null=True, blank=True)
+
+    created_count   = models.PositiveIntegerField("Creadas", default=0)
+    updated_count   = models.PositiveIntegerField("Actualizadas", default=0)
+    unchanged_count = models.PositiveIntegerField("Sin cambios", default=0)
+    error_count     = models.PositiveIntegerField("Con error", default=0)
+
+    created_at = models.DateTimeField("Creado", auto_now_add=True)
+    updated_at = models.DateTimeField("Actualizado", auto_now=True)
+
+    class Meta:
+        db_table = "import_checkpoints"
+        verbose_name = "Checkpoint de importación"
+        verbose_name_plural = "Checkpoints de importación"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["archivo_hash", "completado"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["archivo_hash"],
+                condition=Q(completado=False),
+                name="uniq_checkpoint_pendiente_por_hash",
+            )
+        ]
+
+    def __str__(self):
+        return f"Checkpoint {self.archivo_hash[:12]} fila {self.ultima_fila}{' (completo)' if self.completado else ''}"
@@ -0,0 +1,154 @@
+# asignaciones/normalizacion.py
+"""
+Normalizadores compartidos por la carga masiva (importacion.py) y comunas.py.
+
+Las columnas categóricas (comuna, zona, bloque, marca, tecnología, encuesta,
+encabezados) tienen pocas decenas de valores distintos por archivo, así que el
+valor canónico se memoiza por valor crudo con un LRU acotado por columna.
+`cache_stats()` expone hits/misses de cada una.
+"""
+import unicodedata
+from functools import lru_cache
+from typing import Dict
+
+# Tamaño máximo del LRU de cada columna
+NORM_CACHE_SIZE = 1024
+
+_CACHES = {}
+
+def _memo(columna: str):
+    """Memoiza un normalizador (typed: 1 y "1" no comparten entrada)."""
+    def deco(fn):
+        cached = lru_cache(maxsize=NORM_CACHE_SIZE, typed=True)(fn)
+        _CACHES[columna] = cached
+        return cached
+    return deco
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    stats = {}
+    for columna, fn in _CACHES.items():
+        info = fn.cache_info()
+        stats[columna] = {"hits": info.hits, "misses": info.misses, "size": info.currsize}
+    return stats
+
+def cache_clear():
+    for fn in _CACHES.values():
+        fn.cache_clear()
+
+
+# ---------- Texto ----------
+# Tabla precompilada (en vez de una cadena de .replace) para quitar tildes de encabezados
+_ACCENTS = str.maketrans("áéíóúñ", "aeioun")
+
+def _s(val) -> str:
+    if val is None: return ""
+    try:
+        return str(val).strip()
+    except Exception:
+        return ""
+
+@_memo("header")
+def _norm(s: str) -> str:
+    if s is None: return ""
+    s = str(s).strip().lower().translate(_ACCENTS)
+    return "_".join(s.split())
+
+@_memo("comuna_key")
+def _norm_key(s: str) -> str:
+    """Clave sin tildes y en mayúsculas (comparación de nombres de comuna)."""
+    if not s:
+        return ""
+    s = unicodedata.normalize("NFKD", s)
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    return s.upper().strip()
+
+
+# ---------- Columnas categóricas ----------
+@_memo("marca")
+def _norm_marca(v) -> str:
+    return (_s(v) or "CLARO").upper()
+
+@_memo("tecnologia")
+def _norm_tecnologia(v) -> str:
+    return (_s(v) or "HFC").upper()
+
+@_memo("encuesta")
+def _norm_encuesta(v) -> str:
+    return (_s(v) or "post_visita").lower()
+
+@_memo("bloque")
+def _normalize_bloque(val: str) -> str | None:
+    v = _s(val).lower()
+    if not v: return None
+    if "10" in v and "13" in v: return "10-13"
+    if "14" in v and "18" in v: return "14-18"
+    if v in {"10-13", "14-18"}: return v
+    return None
+
+
+# ---------- Normalizadores de zona / comuna ----------
+@_memo("zona")
+def _norm_zona(v: str) -> str | None:
+    v = _s(v).upper()
+    if not v: return None
+    v = v.replace("ZONA METROPOLITANA", "").replace("ZONA", "").strip()
+    if v.startswith("NORTE"):   return "NORTE"
+    if v.startswith("SUR"):     return "SUR"
+    if v.startswith("ORIENTE") or v.startswith("CENTRO"):
+        return "ORIENTE"
+    return None
+
+_COMUNA_ALIASES = {
+    "MACU": "Macul",
+    "QNOR": "Quinta Normal",
+    "MAIP": "Maipú",
+    "PROV": "Providencia",
+    "LREI": "La Reina",
+    "PENA": "Peñalolén",
+    "LFLO": "La Florida",
+    "PALT": "Puente Alto",
+    "RECO": "Recoleta",
+    "CERR": "Cerrillos",
+    "SBER": "San Bernardo",
+    "NUNO": "Ñuñoa",
+    "LCON": "Las Condes",
+    "RENC": "Renca",
+    "ECEN": "Estación Central",
+    "LACI": "La Cisterna",
+    "INDE": "Independencia",
+    "PACE": "Pedro Aguirre Cerda",
+    "LGRA": "La Granja",
+    "CNAV": "Cerro Navia",
+    "LBAR": "Lo Barnechea",
+    "HUEC": "Huechuraba",
+    "PUDA": "Pudahuel",
+    "LAMP": "Lampa",
+    "SJOA": "San Joaquín",
+    "SJOS": "San José de Maipo",
+    "PHUR": "Padre Hurtado",
+    "IMAI": "Isla de Maipo",
+    "CTAN": "Calera de Tango",
+}
+
+_COMUNA_CANON = {
+    "NUNOA": "Ñuñoa",
+    "PENALOLEN": "Peñalolén",
+    "LAS CONDES": "Las Condes",
+    "ESTACION CENTRAL": "Estación Central",
+    "SAN MIGUEL": "San Miguel",
+}
+
+@_memo("comuna")
+def _norm_comuna(v: str) -> str:
+    raw = _s(v)
+    if not raw:
+        return ""
+    u = raw.strip().upper()
+    if u in _COMUNA_ALIASES:
+        return _COMUNA_ALIASES[u]
+    if u in _COMUNA_CANON:
+        return _COMUNA_CANON[u]
+    try:
+        return raw.strip().title()
+    except Exception:
+        return raw.strip()
@@ -0,0 +1,151 @@
+# asignaciones/paquete.py
+"""
+Paquete offline del técnico: GET /api/asignaciones/bundle/.
+
+Un solo documento JSON, guardado ya comprimido con gzip, con lo que la app
+necesita para trabajar sin conexión durante el día:
+- visitas: sus asignaciones de hoy (fecha o reagendado_fecha = hoy);
+- historial: sus movimientos de los últimos BUNDLE_HISTORIAL_DIAS días (a lo
+  más BUNDLE_HISTORIAL_MAX);
+- referencia: estados, bloques, comunas y opciones Q5.
+
+Consultas fijas, sin importar cuántas visitas tenga:
+- versión: MAX(updated_at) de sus asignaciones (índice (asignado_a,
+  updated_at, id)) y su última BajaAsignacion. Si coincide con la del caché,
+  no se hace nada más;
+- armado (solo si cambió): visitas e historial, una consulta cada una.
+
+El caché (settings.BUNDLE_CACHE, compartido entre procesos) guarda una entrada
+por técnico: la última versión armada. Cualquier cambio en una de sus
+asignaciones, o que le asignen una, mueve el MAX; que se la quiten o la borren
+deja una baja. En ambos casos el paquete se rearma en la próxima descarga. El
+inicio del día entra en la versión: a medianoche cambian las visitas de "hoy".
+
+Se entrega comprimido solo si Accept-Encoding acepta gzip (acepta_gzip); si no,
+se descomprime al responder.
+"""
+import gzip
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Max, Q
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from core.condicional import VersionHTTP
+
+from .comunas import COMUNAS_SANTIAGO
+from .models import BajaAsignacion, BloqueHorario, DireccionAsignada, EstadoAsignacion, HistorialAsignacion
+from .serializers import (
+    DireccionAsignadaSerializer,
+    EstadoClienteActionSerializer,
+    HistorialAsignacionSerializer,
+)
+
+BUNDLE_HISTORIAL_DIAS = 7
+BUNDLE_HISTORIAL_MAX = 200
+BUNDLE_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def _ajuste(nombre, defecto):
+    return int(getattr(settings, nombre, 0) or defecto)
+
+
+def _cache():
+    # sin BUNDLE_CACHE, el caché por defecto (LocMem: uno por proceso)
+    return caches[getattr(settings, "BUNDLE_CACHE", "default")]
+
+
+def _clave(tecnico_id) -> str:
+    return f"asignaciones:bundle:{tecnico_id}"
+
+
+def _estado(tecnico_id):
+    """(max updated_at, (id, fecha) de la última baja, hoy) de sus asignaciones: dos lecturas de índice."""
+    ultima = DireccionAsignada.objects.filter(asignado_a_id=tecnico_id).aggregate(m=Max("updated_at"))["m"]
+    baja = (BajaAsignacion.objects.filter(tecnico_id=tecnico_id)
+            .order_by("-created_at", "-id").values_list("id", "created_at").first())
+    return ultima, baja, timezone.localdate()
+
+
+def acepta_gzip(accept_encoding: str) -> bool:
+    """
+    Accept-Encoding (RFC 9110 §12.5.3) admite gzip: "gzip" (o su alias "x-gzip")
+    con q > 0; si no aparece, lo decide "*". Sin el encabezado, solo identity.
+    """
+    calidades = {}
+    for parte in accept_encoding.split(","):
+        codificacion, *params = parte.split(";")
+        codificacion = codificacion.strip().lower()
+        if not codificacion:
+            continue
+        q = 1.0
+        for param in params:
+            nombre, _, valor = param.partition("=")
+            if nombre.strip().lower() == "q":
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+        calidades[codificacion] = q
+    for codificacion in ("gzip", "x-gzip"):
+        if codificacion in calidades:
+            return calidades[codificacion] > 0
+    return calidades.get("*", 0) > 0
+
+
+def referencia() -> dict:
+    return {
+        "estados": [{"value": v, "label": l} for v, l in EstadoAsignacion.choices],
+        "bloques": [{"value": v, "label": l} for v, l in BloqueHorario.choices],
+        "comunas": list(COMUNAS_SANTIAGO),
+        "estados_q5": [{"value": v, "label": l} for v, l in EstadoClienteActionSerializer.ESTADOS_Q5],
+    }
+
+
+def armar(tecnico_id) -> dict:
+    """
+    Contenido del paquete (2 consultas). Sin request en el contexto: el paquete
+    es el mismo para quien lo pida (no aplica ?fields=/?omit=).
+    """
+    hoy = timezone.localdate()
+    visitas = (
+        DireccionAsignada.objects
+        .filter(Q(fecha=hoy) | Q(reagendado_fecha=hoy), asignado_a_id=tecnico_id)
+        .order_by("reagendado_bloque", "id")
+    )
+    desde = timezone.now() - timedelta(days=_ajuste("BUNDLE_HISTORIAL_DIAS", BUNDLE_HISTORIAL_DIAS))
+    historial = (
+        HistorialAsignacion.objects.select_related("asignacion", "usuario")
+        .filter(Q(usuario_id=tecnico_id) | Q(asignacion__asignado_a_id=tecnico_id), created_at__gte=desde)
+        .order_by("-created_at", "-id")[:_ajuste("BUNDLE_HISTORIAL_MAX", BUNDLE_HISTORIAL_MAX)]
+    )
+    return {
+        "tecnico_id": tecnico_id,
+        "fecha": hoy.isoformat(),
+        "generado": timezone.now().isoformat(),
+        "visitas": DireccionAsignadaSerializer(visitas, many=True).data,
+        "historial": HistorialAsignacionSerializer(historial, many=True).data,
+        "referencia": referencia(),
+    }
+
+
+def version(request, tecnico_id):
+    """(VersionHTTP de la respuesta, estado con el que se valida el caché)."""
+    estado = _estado(tecnico_id)
+    ultima, baja, hoy = estado
+    baja_id, baja_fecha = baja or (None, None)
+    # el inicio del día como una fecha más: cambia la ETag y Last-Modified a medianoche
+    inicio_dia = timezone.make_aware(datetime.combine(hoy, time.min))
+    return VersionHTTP(request, [baja_id], [ultima, baja_fecha, inicio_dia]), estado
+
+
+def cuerpo(tecnico_id, estado) -> bytes:
+    """JSON gzip del paquete: del caché si sigue en `estado`; si no, se arma y reemplaza la entrada."""
+    guardado = _cache().get(_clave(tecnico_id))
+    if guardado and guardado[0] == estado:
+        return guardado[1]
+    datos = gzip.compress(JSONRenderer().render(armar(tecnico_id)), mtime=0)
+    _cache().set(_clave(tecnico_id), (estado, datos), _ajuste("BUNDLE_CACHE_TIMEOUT", BUNDLE_CACHE_TIMEOUT))
+    return datos
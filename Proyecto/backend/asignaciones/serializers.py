@@ -1,13 +1,16 @@
 from rest_framework import serializers
-from .models import DireccionAsignada, HistorialAsignacion
+from .models import DireccionAsignada, HistorialAsignacion, ImportJob
 from django.utils import timezone
 
+from core.serializers import CamposParcialesMixin
+
 
 # === Serializadores base ===
 
-class DireccionAsignadaSerializer(serializers.ModelSerializer):
+class DireccionAsignadaSerializer(CamposParcialesMixin, serializers.ModelSerializer):
     """
     Serializa una asignación tal como se muestra en tus respuestas actuales.
+    Admite ?fields= / ?omit= (ver CamposParcialesMixin).
     """
     asignado_a = serializers.PrimaryKeyRelatedField(read_only=True)
 
@@ -37,9 +40,10 @@ class DireccionAsignadaSerializer(serializers.ModelSerializer):
         ]
 
 
-class HistorialAsignacionSerializer(serializers.ModelSerializer):
+class HistorialAsignacionSerializer(CamposParcialesMixin, serializers.ModelSerializer):
     """
     Historial con campos de apoyo para el listado/exports.
+    Admite ?fields= / ?omit= (ver CamposParcialesMixin).
     """
     usuario_id = serializers.IntegerField(source="usuario.id", read_only=True)
     usuario_email = serializers.EmailField(source="usuario.email", read_only=True)
@@ -53,6 +57,13 @@ class HistorialAsignacionSerializer(serializers.ModelSerializer):
     fecha = serializers.DateField(source="asignacion.fecha", read_only=True)
     bloque = serializers.CharField(source="asignacion.reagendado_bloque", read_only=True)
 
+    fuentes_metodo = {
+        "asignacion_info": [
+            "asignacion.id", "asignacion.direccion", "asignacion.comuna",
+            "asignacion.fecha", "asignacion.estado", "asignacion.asignado_a",
+        ],
+    }
+
     def get_asignacion_info(self, obj):
         a = obj.asignacion
         if not a:
@@ -92,6 +103,7 @@ class CsvRowResult(serializers.Serializer):
     rownum = serializers.IntegerField()
     created = serializers.BooleanField()
     updated = serializers.BooleanField()
+    unchanged = serializers.BooleanField(required=False)
     errors = serializers.ListField(child=serializers.CharField(), required=False)
 
 
@@ -99,6 +111,46 @@ class CargaCSVSerializer(serializers.Serializer):
     file = serializers.FileField(help_text="Archivo .csv o .xlsx")
 
 
+class ImportJobSerializer(serializers.ModelSerializer):
+    """
+    Estado/progreso de una carga en background.
+    throughput = filas procesadas por segundo desde que el worker tomó el job.
+    """
+    throughput = serializers.SerializerMethodField()
+    resultados_url = serializers.SerializerMethodField()
+
+    def get_throughput(self, obj):
+        if not obj.started_at:
+            return None
+        end = obj.finished_at or timezone.now()
+        secs = (end - obj.started_at).total_seconds()
+        return round(obj.rows_processed / secs, 1) if secs > 0 else None
+
+    def get_resultados_url(self, obj):
+        if obj.estado != ImportJob.Estado.DONE or not obj.resultados:
+            return None
+        return f"/api/asignaciones/import_jobs/{obj.id}/resultados/"
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            "id",
+            "nombre",
+            "estado",
+            "rows_processed",
+            "created_count",
+            "updated_count",
+            "unchanged_count",
+            "error_count",
+            "throughput",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+            "resultados_url",
+        ]
+
+
 # === Acciones (formularios simples para el navegador de DRF) ===
 
 class AsignarmeActionSerializer(serializers.Serializer):
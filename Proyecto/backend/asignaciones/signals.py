@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_migrate
+from django.dispatch import receiver
+
+from .busqueda import asegurar_fts
+from .models import BajaAsignacion, DireccionAsignada
+
+
+@receiver(post_migrate)
+def reponer_triggers_fts(sender, using="default", **kwargs):
+    # Solo una vez por migrate (post_migrate se emite por cada app)
+    if getattr(sender, "name", None) != "asignaciones":
+        return
+    asegurar_fts(using)
+
+
+@receiver(post_delete, sender=DireccionAsignada)
+def registrar_baja_eliminada(sender, instance, using="default", **kwargs):
+    # tombstone de /changes/ (también para queryset.delete(): el collector emite por fila)
+    BajaAsignacion.objects.using(using).create(
+        asignacion_id=instance.pk, tecnico_id=instance.asignado_a_id,
+        motivo=BajaAsignacion.Motivo.ELIMINADA,
+    )
@@ -0,0 +1,130 @@
+# asignaciones/sincronizacion.py
+"""
+Sincronización incremental de la app del técnico: GET /api/asignaciones/changes/?since=<cursor>.
+
+- Cambios: asignaciones del alcance (técnico: asignado_a = él; administrador:
+  todas) con (updated_at, id) posterior al cursor, en ese orden. Salen de los
+  índices (asignado_a, updated_at, id) / (updated_at, id).
+- Bajas (tombstones, BajaAsignacion): ids que salieron del alcance después del
+  cursor (técnico: desasignadas, reasignadas o eliminadas; administrador:
+  eliminadas). Se omiten las que ya volvieron al alcance: su versión vigente
+  viene (o ya vino) en los cambios.
+- Sin ?since= es la carga inicial: todo el alcance, sin bajas.
+
+A lo más LIMITE filas de cada lista por llamada; con has_more el cliente
+vuelve a pedir con el cursor nuevo.
+
+El cursor no avanza más allá de ahora - MARGEN: una transacción que aún no hace
+commit puede traer un updated_at anterior a lo ya entregado. Lo que cae en ese
+margen se vuelve a entregar en la llamada siguiente (upserts idempotentes).
+"""
+import base64
+import json
+from datetime import timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .models import BajaAsignacion, DireccionAsignada
+
+LIMITE = 500
+MARGEN = timedelta(seconds=5)
+
+
+# ---------- cursor ----------
+def _codificar(posiciones) -> str:
+    payload = [[p[0].isoformat(), p[1]] if p is not None else None for p in posiciones]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def _decodificar(raw: str):
+    """[(updated_at, id) | None de los cambios, (created_at, id) | None de las bajas]."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(raw + "=" * (-len(raw) % 4)))
+        if not isinstance(payload, list) or len(payload) != 2:
+            raise ValueError
+        posiciones = []
+        for p in payload:
+            if p is None:
+                posiciones.append(None)
+                continue
+            ts = parse_datetime(p[0])
+            if ts is None or not isinstance(p[1], int):
+                raise ValueError
+            posiciones.append((ts, p[1]))
+    except (ValueError, TypeError, IndexError):
+        raise ValidationError({"since": "Cursor inválido."})
+    return posiciones
+
+
+def _despues(qs, campo, posicion):
+    # (campo, id) > posicion como rango sobre el índice: campo >= ts y no (campo = ts e id <= pk)
+    if posicion is None:
+        return qs
+    ts, pk = posicion
+    return qs.filter(**{f"{campo}__gte": ts}).exclude(**{campo: ts, "id__lte": pk})
+
+
+def _avanzar(anterior, ultima, tope):
+    """Nueva posición del cursor: la última entregada, sin pasar de `tope`."""
+    if ultima is None:
+        return anterior
+    return min(ultima, tope)
+
+
+# ---------- consulta ----------
+def alcance(usuario):
+    """(asignaciones visibles para /changes/, sus bajas)."""
+    if getattr(usuario, "rol", None) == "administrador":
+        return (DireccionAsignada.objects.all(),
+                BajaAsignacion.objects.filter(motivo=BajaAsignacion.Motivo.ELIMINADA))
+    return (DireccionAsignada.objects.filter(asignado_a_id=usuario.pk),
+            BajaAsignacion.objects.filter(tecnico_id=usuario.pk))
+
+
+def cambios_desde(usuario, since, consulta_filas):
+    """
+    Página de /changes/. `consulta_filas(qs)` arma la consulta de las filas a
+    serializar (debe incluir updated_at e id); devuelve (filas, bajas, cursor, has_more).
+    """
+    asignaciones, bajas = alcance(usuario)
+    tope = (timezone.now() - MARGEN, 0)
+
+    if since:
+        pos_cambios, pos_bajas = _decodificar(since)
+    else:
+        # carga inicial: las bajas anteriores ya están reflejadas en la foto
+        pos_cambios, pos_bajas = None, tope
+
+    qs = _despues(asignaciones, "updated_at", pos_cambios).order_by("updated_at", "id")
+    filas = list(consulta_filas(qs)[:LIMITE + 1])
+    mas_cambios = len(filas) > LIMITE
+    filas = filas[:LIMITE]
+
+    lista_bajas = []
+    mas_bajas = False
+    ultima_baja = None
+    if since:
+        lista_bajas = list(
+            _despues(bajas, "created_at", pos_bajas).order_by("created_at", "id")
+            .values_list("id", "asignacion_id", "motivo", "created_at")[:LIMITE + 1]
+        )
+        mas_bajas = len(lista_bajas) > LIMITE
+        lista_bajas = lista_bajas[:LIMITE]
+        if lista_bajas:
+            ultima_baja = (lista_bajas[-1][3], lista_bajas[-1][0])
+            # las que volvieron al alcance no se informan (y una sola por asignación: la última)
+            vigentes = set(asignaciones.filter(id__in={b[1] for b in lista_bajas}).values_list("id", flat=True))
+            por_id = {b[1]: b for b in lista_bajas if b[1] not in vigentes}
+            lista_bajas = [{"id": aid, "motivo": b[2]} for aid, b in por_id.items()]
+
+    ultima_fila = (filas[-1].updated_at, filas[-1].id) if filas else None
+    cursor = _codificar([
+        _avanzar(pos_cambios, ultima_fila, tope),
+        _avanzar(pos_bajas, ultima_baja, tope),
+    ])
+    # si el tope frenó el cursor, lo que falta llega en la próxima consulta periódica
+    # (pedir de inmediato devolvería lo mismo)
+    has_more = (mas_cambios and ultima_fila <= tope) or (mas_bajas and ultima_baja <= tope)
+    return filas, lista_bajas, cursor, has_more
@@ -1,3 +1,1564 @@
-from django.test import TestCase
+import base64
+import csv
+import gc
+import gzip
+import hashlib
+import importlib
+import io
+import json
+import os
+import random
+import re
+import tempfile
+import zipfile
+from datetime import date, timedelta
+from unittest import mock, skipUnless
+from urllib.parse import quote
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from openpyxl import Workbook
+from rest_framework.test import APIClient
+
+from auditoria.models import AuditoriaVisita
+from core.pagination import CursorOptInPagination
+from core.models import LogSistema
+from usuarios.models import Usuario
+from . import importacion, normalizacion, paquete
+from .benchmark import generar_filas, escribir_csv, escribir_xlsx, medir_carga, medir_listado
+from .comunas import COMUNAS_SANTIAGO
+from .models import (
+    BajaAsignacion, DireccionAsignada, EstadoAsignacion, HistorialAsignacion, ImportCheckpoint, ImportJob,
+    PrioridadAsignacion,
+)
+
+
+class CargaBase(TestCase):
+    """Admin + técnico y helpers para subir archivos a cargar_csv."""
+
+    def setUp(self):
+        self.admin = Usuario.objects.create_user(
+            email="carga-admin@test.local", password="x", rol="administrador",
+            first_name="Carga", last_name="Admin",
+        )
+        self.tec = Usuario.objects.create_user(
+            email="carga-tec@test.local", password="x", rol="tecnico",
+            first_name="Carga", last_name="Tec",
+        )
+        self.client = APIClient()
+        self.client.force_login(self.admin)
+
+    @staticmethod
+    def csv(filas, encabezados=("id_vivienda", "direccion", "comuna", "asignado_email")):
+        return "\n".join([",".join(encabezados)] + [",".join(f) for f in filas]) + "\n"
+
+    @staticmethod
+    def xlsx(hojas):
+        """{titulo: [fila, ...]} -> bytes de un .xlsx (la primera fila de cada hoja, encabezados)."""
+        wb = Workbook()
+        wb.remove(wb.active)
+        for titulo, filas in hojas.items():
+            ws = wb.create_sheet(titulo)
+            for fila in filas:
+                ws.append(list(fila))
+        out = io.BytesIO()
+        wb.save(out)
+        return out.getvalue()
+
+    def subir(self, contenido, nombre="carga.csv", qs=""):
+        if isinstance(contenido, str):
+            contenido = contenido.encode("utf-8")
+        f = SimpleUploadedFile(nombre, contenido)
+        return self.client.post(f"/api/asignaciones/cargar_csv/{qs}", {"file": f}, format="multipart")
+
+
+class NormalizacionTests(TestCase):
+    """asignaciones/normalizacion.py: misma salida que los normalizadores de antes y estadísticas del memo."""
+
+    # implementaciones previas a normalizacion.py, como referencia
+    @staticmethod
+    def _norm_antes(s):
+        if s is None: return ""
+        s = str(s).strip().lower()
+        for a, b in {"á": "a", "é": "e", "í": "i", "ó": "o", "ú": "u", "ñ": "n"}.items():
+            s = s.replace(a, b)
+        return re.sub(r"\s+", " ", s).replace(" ", "_")
+
+    @staticmethod
+    def _norm_zona_antes(v):
+        v = normalizacion._s(v).upper()
+        if not v: return None
+        v = v.replace("ZONA METROPOLITANA", "").replace("ZONA", "").strip()
+        if v.startswith("NORTE"): return "NORTE"
+        if v.startswith("SUR"): return "SUR"
+        if v.startswith("ORIENTE") or v.startswith("CENTRO"): return "ORIENTE"
+        return None
+
+    @staticmethod
+    def _norm_comuna_antes(v):
+        raw = normalizacion._s(v)
+        if not raw: return ""
+        u = raw.strip().upper()
+        return normalizacion._COMUNA_ALIASES.get(u) or normalizacion._COMUNA_CANON.get(u) or raw.strip().title()
+
+    ENTRADAS = [
+        None, "", "   ", 7, "Dirección", "  ID  Vivienda ", "RUT\tCliente", "fecha\n programada",
+        "ÁÉÍÓÚÑ áéíóúñ", "Comuna\u00a0Ñuñoa", "a\u2003b", "macu", " PENALOLEN ", "ñuñoa", "las condes",
+        "Zona Metropolitana Sur", "zona norte", "centro", "ORIENTE 2", "x", "Estación  Central",
+    ]
+
+    def _entradas(self):
+        rnd = random.Random(7)
+        alfabeto = "aAáÁeéÉiíoóuúÑñ zZ\t\n\u00a0_-1"
+        return self.ENTRADAS + ["".join(rnd.choice(alfabeto) for _ in range(rnd.randint(0, 12))) for _ in range(500)]
+
+    def test_misma_salida_que_antes(self):
+        for v in self._entradas():
+            with self.subTest(v=v):
+                self.assertEqual(normalizacion._norm(v), self._norm_antes(v))
+                self.assertEqual(normalizacion._norm_zona(v), self._norm_zona_antes(v))
+                if v is None or isinstance(v, str):
+                    self.assertEqual(normalizacion._norm_comuna(v), self._norm_comuna_antes(v))
+
+    def test_cache_stats(self):
+        normalizacion.cache_clear()
+        for v in ("Macu", "Macu", "NUNOA", "Macu"):
+            normalizacion._norm_comuna(v)
+        self.assertEqual(normalizacion.cache_stats()["comuna"], {"hits": 2, "misses": 2, "size": 2})
+        # typed: 1 y "1" no comparten entrada
+        normalizacion._norm_marca(1)
+        normalizacion._norm_marca("1")
+        self.assertEqual(normalizacion.cache_stats()["marca"]["misses"], 2)
+        normalizacion.cache_clear()
+        self.assertEqual(normalizacion.cache_stats()["comuna"], {"hits": 0, "misses": 0, "size": 0})
+
+    def test_alias_de_comunas(self):
+        from .comunas import _norm, zona_para_comuna
+        self.assertIs(_norm, normalizacion._norm_key)
+        self.assertEqual(_norm(" Peñalolén "), "PENALOLEN")
+        self.assertEqual(_norm(""), "")
+        self.assertEqual(zona_para_comuna("ñuñoa"), "ORIENTE")
+        self.assertEqual(zona_para_comuna("ESTACION CENTRAL"), "ORIENTE")
+        with self.assertRaises(ValueError):
+            zona_para_comuna("Valparaíso")
+
+
+class LectoresCargaTests(CargaBase):
+    """Lectores de archivos de rows_from_upload."""
+
+    def test_xlsx_descartado_libera_temporal(self):
+        contenido = self.xlsx({"Hoja": [("id_vivienda", "direccion", "comuna"), ("V1", "Calle 1", "MACUL")]})
+        creados = []
+        original = importacion._xlsx_path
+
+        def _xlsx_path(f):
+            path, propio = original(f)
+            creados.append(path)
+            return path, propio
+
+        with mock.patch.object(importacion, "_xlsx_path", _xlsx_path):
+            for leer in (0, 1):
+                rows = importacion.rows_from_upload(SimpleUploadedFile("a.xlsx", contenido))
+                for _ in range(leer):
+                    next(rows)
+                del rows
+                gc.collect()
+        self.assertTrue(creados)
+        for path in creados:
+            self.assertFalse(os.path.exists(path), path)
+
+
+    def test_csv_por_chunks_igual_que_entero(self):
+        class Trozos:
+            # archivo subido que entrega chunks de `n` bytes
+            def __init__(self, datos, n):
+                self.datos, self.n = datos, n
+
+            def chunks(self):
+                for i in range(0, len(self.datos), self.n):
+                    yield self.datos[i:i + self.n]
+
+        datos = (
+            "\ufeffid_vivienda,direccion,comuna\n"
+            "V1,\"Pasaje Ñuñoa 12\nDepto 4\",Ñuñoa\n"
+            "V2,Avenida Irarrázaval 3000,Peñalolén\r\n"
+            "V3,\"Calle \"\"Ésta\"\", 7\",Maipú"
+        ).encode("utf-8")
+        entero = list(csv.DictReader(io.StringIO(datos.decode("utf-8-sig"))))
+        self.assertEqual(len(entero), 3)
+        # chunks de 1..7 bytes: cortes dentro del BOM, de 'Ñ'/'á'/'é' y del campo con salto de línea
+        for n in range(1, 8):
+            with self.subTest(n=n):
+                filas = list(importacion._rows_from_csv(Trozos(datos, n)))
+                self.assertEqual([r for _, r in filas], entero)
+                self.assertEqual(filas[0][0]["id_vivienda"], "id_vivienda")
+
+
+class RespuestasCargaTests(CargaBase):
+    """?respuesta=compacta | ndjson | errores_csv y archivos que se dañan a mitad de la lectura."""
+
+    def setUp(self):
+        super().setUp()
+        self.archivo = self.csv([
+            ("P1", "Calle 1", "Macul", ""),
+            ("P2", "", "Macul", ""),
+            ("P3", "Calle 3", "Macul", "nadie@test.local"),
+            ("P4", "Calle 4", "Macul", self.tec.email),
+        ])
+
+    @staticmethod
+    def xlsx_truncado(filas):
+        """xlsx cuya hoja se corta a la mitad del XML: se abre bien y falla al leer."""
+        contenido = CargaBase.xlsx({"Hoja": [("id_vivienda", "direccion", "comuna")] + filas})
+        out = io.BytesIO()
+        with zipfile.ZipFile(io.BytesIO(contenido)) as zin, zipfile.ZipFile(out, "w") as zout:
+            for info in zin.infolist():
+                data = zin.read(info)
+                if info.filename.startswith("xl/worksheets/"):
+                    data = data[:len(data) // 2]
+                zout.writestr(info, data)
+        return out.getvalue()
+
+    def test_compacta(self):
+        r = self.subir(self.archivo, qs="?respuesta=compacta&max_errores=1").json()
+        self.assertNotIn("rows", r)
+        self.assertEqual((r["summary"]["created"], r["summary"]["errors"]), (2, 2))
+        self.assertEqual([e["rownum"] for e in r["errors"]], [3])
+        self.assertTrue(r["errors_truncated"])
+
+    def test_ndjson_una_linea_por_fila(self):
+        r = self.subir(self.archivo, qs="?respuesta=ndjson")
+        self.assertEqual(r["Content-Type"], "application/x-ndjson")
+        lineas = [json.loads(x) for x in b"".join(r.streaming_content).decode().splitlines()]
+        self.assertEqual([x["rownum"] for x in lineas[:-1]], [2, 3, 4, 5])
+        self.assertEqual(lineas[-1]["summary"]["created"], 2)
+        self.assertEqual(DireccionAsignada.objects.count(), 2)
+
+    def test_errores_csv(self):
+        r = self.subir(self.archivo, qs="?respuesta=errores_csv")
+        self.assertEqual(r["Content-Disposition"], 'attachment; filename="errores_carga.csv"')
+        self.assertEqual(json.loads(r["X-Import-Summary"])["errors"], 2)
+        filas = list(csv.reader(io.StringIO(r.content.decode("utf-8-sig"))))
+        self.assertEqual(filas[0], ["fila", "errores", "id_vivienda", "direccion", "comuna", "asignado_email"])
+        self.assertEqual([f[0] for f in filas[1:]], ["3", "4"])
+        self.assertEqual(filas[2][5], "nadie@test.local")
+
+    def test_xlsx_danado_a_mitad_400_con_fila(self):
+        contenido = self.xlsx_truncado([(f"T{i}", f"Calle {i}", "Macul") for i in range(300)])
+        r = self.subir(contenido, nombre="danado.xlsx")
+        self.assertEqual(r.status_code, 400)
+        self.assertIn("No se pudo leer el archivo", r.json()["detail"])
+        self.assertGreater(r.json()["rownum"], 2)
+
+        r = self.subir(contenido, nombre="danado.xlsx", qs="?respuesta=ndjson&resume=0")
+        self.assertEqual(r.status_code, 200)  # streaming: el error va en la última línea
+        ultima = json.loads(b"".join(r.streaming_content).decode().splitlines()[-1])
+        self.assertFalse(ultima["ok"])
+        self.assertGreater(ultima["rownum"], 2)
+
+
+class FuentesMultiplesTests(CargaBase):
+    """XLSX con varias hojas y .zip de CSV/XLSX: un solo stream, cada fila atribuida a su fuente."""
+
+    def setUp(self):
+        super().setUp()
+        enc = ("id_vivienda", "direccion", "comuna")
+        self.libro = self.xlsx({
+            "Norte": [enc, ("M1", "Calle 1", "Macul"), ("M2", "", "Macul")],
+            "Notas": [("sin", "encabezados")],
+            "Sur": [enc, ("M3", "Calle 3", "Providencia")],
+        })
+        out = io.BytesIO()
+        with zipfile.ZipFile(out, "w") as zf:
+            zf.writestr("a.csv", self.csv([("Z1", "Calle 10", "Macul")], enc))
+            zf.writestr("b.xlsx", self.libro)
+            zf.writestr("__MACOSX/._a.csv", b"basura")
+        self.zip = out.getvalue()
+
+    def test_xlsx_varias_hojas(self):
+        for parallel in ("0", "1"):
+            with self.subTest(parallel=parallel):
+                DireccionAsignada.objects.all().delete()
+                r = self.subir(self.libro, nombre="libro.xlsx", qs=f"?parallel={parallel}&force=1").json()
+                self.assertEqual([(x["fuente"], x["fuente_rownum"]) for x in r["rows"]],
+                                 [("Norte", 2), ("Norte", 3), ("Sur", 2)])
+                self.assertEqual(list(r["summary"]["fuentes"]), ["Norte", "Sur"])
+                self.assertEqual(r["summary"]["fuentes"]["Norte"]["errors"], 1)
+                self.assertEqual(DireccionAsignada.objects.count(), 2)
+
+    def test_zip_de_csv_y_xlsx(self):
+        r = self.subir(self.zip, nombre="lote.zip").json()
+        self.assertEqual([x["fuente"] for x in r["rows"]], ["a.csv", "b.xlsx:Norte", "b.xlsx:Norte", "b.xlsx:Sur"])
+        self.assertEqual(r["summary"]["created"], 3)
+        self.assertEqual(sorted(DireccionAsignada.objects.values_list("id_vivienda", flat=True)), ["M1", "M3", "Z1"])
+
+    def test_miembro_danado_400_con_fuente(self):
+        contenido = bytearray(self.zip)
+        # cambia un byte de datos de a.csv (almacenado sin comprimir): falla el CRC al terminar de leerlo
+        i = bytes(contenido).index(b"Calle 10")
+        contenido[i] = ord("K")
+        r = self.subir(bytes(contenido), nombre="lote.zip")
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.json()["fuente"], "a.csv", r.json())
+        self.assertEqual(DireccionAsignada.objects.count(), 0)
+
+    def test_zip_invalido_400(self):
+        self.assertEqual(self.subir(b"no es un zip", nombre="lote.zip").status_code, 400)
+
+
+class CargaPorLotesTests(CargaBase):
+    """Upsert por lotes: altas, ediciones (por id_vivienda o direccion+comuna), errores e historial."""
+
+    def test_altas_ediciones_y_errores(self):
+        r = self.subir(self.csv([
+            ("V1", "Calle 1", "Macul", self.tec.email),
+            ("", "Calle 2", "Providencia", ""),
+            ("", "", "Macul", ""),                      # sin dirección
+            ("V3", "Calle 3", "Macul", "nadie@test.local"),  # técnico inexistente
+        ])).json()
+        self.assertEqual(r["summary"], {"created": 2, "updated": 0, "unchanged": 0, "errors": 2, "fecha_formato": None})
+        self.assertEqual([x["rownum"] for x in r["rows"] if x.get("errors")], [4, 5])
+        v1 = DireccionAsignada.objects.get(id_vivienda="V1")
+        self.assertEqual((v1.asignado_a_id, v1.estado), (self.tec.id, "ASIGNADA"))
+
+        r = self.subir(self.csv([
+            ("V1", "Calle 1 B", "Macul", ""),          # por id_vivienda
+            ("", "Calle 2", "Providencia", self.tec.email),  # por direccion+comuna
+            ("V4", "Calle 4", "Ñuñoa", ""),
+        ])).json()
+        self.assertEqual(r["summary"]["created"], 1)
+        self.assertEqual(r["summary"]["updated"], 2)
+        self.assertEqual(DireccionAsignada.objects.count(), 3)
+        v1.refresh_from_db()
+        self.assertEqual((v1.direccion, v1.asignado_a_id, v1.estado), ("Calle 1 B", None, "PENDIENTE"))
+        c2 = DireccionAsignada.objects.get(direccion="Calle 2")
+        self.assertEqual(c2.asignado_a_id, self.tec.id)
+        self.assertEqual(
+            sorted(HistorialAsignacion.objects.values_list("accion", flat=True)),
+            ["CREADA", "CREADA", "CREADA", "EDITADA", "EDITADA"],
+        )
+
+    @override_settings(IMPORT_CHUNK_SIZE=100, IMPORT_WORKERS=2)
+    def test_paralelo_igual_a_serial(self):
+        rnd = random.Random(3)
+        filas = [
+            (
+                f"V{rnd.randint(0, 300)}" if rnd.random() < .7 else "",
+                f"Calle {rnd.randint(0, 150)}",
+                rnd.choice(["MACU", "PROV", "nunoa", ""]),
+                rnd.choice(["01/02/2031", "2031-02-03 10:00:00", "x"]),
+                rnd.choice(["", self.tec.email, "nadie@test.local"]),
+            )
+            for _ in range(600)
+        ]
+        archivo = self.csv(filas, ("id_vivienda", "direccion", "comuna", "fecha", "asignado_email"))
+        campos = ("id_vivienda", "direccion", "comuna", "fecha", "asignado_a", "estado", "import_fingerprint")
+
+        respuestas, tablas = [], []
+        for parallel in ("0", "1"):
+            DireccionAsignada.objects.all().delete()
+            respuestas.append(self.subir(archivo, qs=f"?parallel={parallel}&force=1").json())
+            tablas.append(list(DireccionAsignada.objects.order_by("id").values_list(*campos)))
+        self.assertEqual(respuestas[0], respuestas[1])
+        self.assertEqual(tablas[0], tablas[1])
+        self.assertGreater(respuestas[0]["summary"]["updated"], 0)
+
+    def test_consultas_por_lote_no_por_fila(self):
+        def consultas(n, desde):
+            filas = [(f"Q{i}", f"Calle {i}", "Macul", self.tec.email) for i in range(desde, desde + n)]
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.subir(self.csv(filas)).json()["summary"]["created"], n)
+            return len(ctx.captured_queries)
+
+        # 20x filas, mismas consultas (salvo algún INSERT partido por el límite de parámetros de SQLite)
+        self.assertLessEqual(consultas(60, 100) - consultas(3, 0), 2)
+
+
+class FechasCargaTests(CargaBase):
+    """Formato de la columna fecha detectado una vez por archivo (DateColumnParser)."""
+
+    def test_detecta_formato_y_admite_outliers(self):
+        parser = importacion.DateColumnParser(["03/02/2025", "", "15/02/2025 ", "basura"])
+        self.assertEqual(parser.fmt, "%d/%m/%Y")
+        self.assertEqual(parser("03/02/2025"), date(2025, 2, 3))
+        # lo que no calza con el formato detectado cae al parseo de siempre
+        self.assertEqual(parser("2025-02-04"), date(2025, 2, 4))
+        self.assertEqual(parser(timezone.datetime(2025, 2, 5, 10, 30)), date(2025, 2, 5))
+        self.assertIsNone(parser("31/02/2025"))
+        self.assertIsNone(importacion.DateColumnParser(["basura", None]).fmt)
+
+    def test_carga_informa_formato(self):
+        anio = timezone.localdate().year + 1  # fechas pasadas se descartan al cargar
+        filas = [(f"F{i}", f"Calle {i}", "Macul", f"{i:02d}-03-{anio}") for i in range(1, 4)]
+        r = self.subir(self.csv(filas, ("id_vivienda", "direccion", "comuna", "fecha"))).json()
+        self.assertEqual(r["summary"]["fecha_formato"], "%d-%m-%Y")
+        self.assertEqual(
+            list(DireccionAsignada.objects.order_by("id_vivienda").values_list("fecha", flat=True)),
+            [date(anio, 3, 1), date(anio, 3, 2), date(anio, 3, 3)],
+        )
+
+
+@override_settings(IMPORT_CHUNK_SIZE=2)
+class SimulacionCargaTests(CargaBase):
+    """?dry_run=1: misma clasificación que la carga real, sin escribir nada."""
+
+    def test_dry_run_no_escribe(self):
+        existente = DireccionAsignada.objects.create(
+            id_vivienda="S1", direccion="Calle 1", comuna="Macul", rut_cliente="1-9",
+            tecnologia="HFC", marca="CLARO", encuesta="post_visita",
+        )
+        filas = [
+            ("S1", "Calle 1 B", "Macul", self.tec.email),  # edición
+            ("S2", "Calle 2", "Macul", ""),                # alta
+            ("", "Calle 3", "Macul", ""),                  # alta por direccion+comuna
+            ("S2", "Calle 2 B", "Macul", ""),              # otro lote: edita la alta simulada
+            ("", "Calle 3", "Macul", self.tec.email),      # edita la alta simulada por par
+            ("S4", "", "Macul", ""),                       # error
+        ]
+        antes = (DireccionAsignada.objects.count(), HistorialAsignacion.objects.count(),
+                 ImportCheckpoint.objects.count(), LogSistema.objects.count())
+        r = self.subir(self.csv(filas), qs="?dry_run=1").json()
+        self.assertTrue(r["dry_run"])
+        self.assertEqual([(x["created"], x["updated"]) for x in r["rows"]],
+                         [(False, True), (True, False), (True, False), (False, True), (False, True), (False, False)])
+        self.assertEqual(
+            {k: r["summary"][k] for k in ("created", "updated", "errors")},
+            {"created": 2, "updated": 3, "errors": 1},
+        )
+        self.assertEqual(antes, (DireccionAsignada.objects.count(), HistorialAsignacion.objects.count(),
+                                 ImportCheckpoint.objects.count(), LogSistema.objects.count()))
+        existente.refresh_from_db()
+        self.assertEqual((existente.direccion, existente.asignado_a_id), ("Calle 1", None))
+
+        # la carga real clasifica igual
+        real = self.subir(self.csv(filas)).json()
+        self.assertEqual([(x["created"], x["updated"]) for x in real["rows"]],
+                         [(x["created"], x["updated"]) for x in r["rows"]])
+
+
+@override_settings(IMPORT_CHUNK_SIZE=100)
+class CheckpointCargaTests(CargaBase):
+    """Checkpoint por archivo: reanudación tras un corte, archivo repetido y cargas simultáneas."""
+
+    def setUp(self):
+        super().setUp()
+        self.archivo = self.csv([(f"R{i}", f"Calle {i}", "Macul", "") for i in range(500)])
+        self.hash = hashlib.sha256(self.archivo.encode("utf-8")).hexdigest()
+
+    def test_corte_reanuda_desde_el_checkpoint(self):
+        original = importacion.CargaMasiva._procesar_lote
+        lotes = []
+
+        def _procesar_lote(carga, parsed):
+            lotes.append(parsed[0]["rownum"])
+            if len(lotes) == 3:
+                raise RuntimeError("corte")
+            return original(carga, parsed)
+
+        with mock.patch.object(importacion.CargaMasiva, "_procesar_lote", _procesar_lote):
+            with self.assertRaises(RuntimeError):
+                self.subir(self.archivo)
+        self.assertEqual(DireccionAsignada.objects.count(), 200)
+        cp = ImportCheckpoint.objects.get(archivo_hash=self.hash)
+        self.assertEqual((cp.ultima_fila, cp.completado, cp.en_curso_hasta), (201, False, None))
+
+        with mock.patch.object(importacion.CargaMasiva, "_procesar_lote", _procesar_lote):
+            r = self.subir(self.archivo).json()
+        # reanuda en la fila 202: los dos primeros lotes no se vuelven a leer ni escribir
+        self.assertEqual(lotes, [2, 102, 202, 202, 302, 402])
+        self.assertEqual(r["summary"]["created"], 300)
+        self.assertEqual(DireccionAsignada.objects.count(), 500)
+        self.assertEqual(HistorialAsignacion.objects.count(), 500)
+        cp.refresh_from_db()
+        self.assertEqual((cp.ultima_fila, cp.completado), (501, True))
+
+    def test_archivo_repetido_y_force(self):
+        self.assertEqual(self.subir(self.archivo).json()["summary"]["created"], 500)
+        r = self.subir(self.archivo).json()
+        self.assertTrue(r["duplicado"])
+        self.assertEqual((r["rows"], r["summary"]["created"]), ([], 500))
+        self.assertEqual(HistorialAsignacion.objects.count(), 500)
+
+        r = self.subir(self.archivo, qs="?force=1").json()
+        self.assertNotIn("duplicado", r)
+        self.assertEqual(r["summary"]["unchanged"], 500)
+
+    def test_misma_carga_en_curso_409(self):
+        cp = ImportCheckpoint.objects.create(archivo_hash=self.hash, ultima_fila=101,
+                                             en_curso_hasta=timezone.now() + timedelta(minutes=5))
+        for qs in ("", "?resume=0", "?force=1", "?background=1"):
+            with self.subTest(qs=qs):
+                self.assertEqual(self.subir(self.archivo, qs=qs).status_code, 409)
+        with self.assertRaises(importacion.CargaEnCurso):
+            importacion.checkpoint_para(self.hash, self.admin)
+        self.assertEqual(DireccionAsignada.objects.count(), 0)
+
+        # el plazo vence (proceso muerto): la siguiente subida lo toma y reanuda
+        ImportCheckpoint.objects.filter(pk=cp.pk).update(en_curso_hasta=timezone.now() - timedelta(seconds=1))
+        r = self.subir(self.archivo)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json()["summary"]["created"], 400)
+        self.assertEqual(ImportCheckpoint.objects.get().completado, True)
+
+
+class HuellaCargaTests(CargaBase):
+    """import_fingerprint: filas idénticas se omiten, salvo que la fila cambiara fuera de la carga."""
+
+    def setUp(self):
+        super().setUp()
+        self.archivo = self.csv([("H1", "Calle 1", "Macul", self.tec.email)])
+        self.assertEqual(self.subir(self.archivo).json()["summary"]["created"], 1)
+        self.obj = DireccionAsignada.objects.get(id_vivienda="H1")
+
+    def recargar(self):
+        return self.subir(self.archivo, qs="?force=1").json()["summary"]
+
+    def test_recarga_identica_sin_cambios(self):
+        self.assertEqual(self.recargar()["unchanged"], 1)
+        self.assertEqual(HistorialAsignacion.objects.filter(asignacion=self.obj).count(), 1)
+
+    def test_desasignada_despues_de_la_carga_se_reasigna(self):
+        r = self.client.patch(f"/api/asignaciones/{self.obj.id}/desasignar/")
+        self.assertEqual(r.status_code, 200)
+        self.obj.refresh_from_db()
+        self.assertEqual((self.obj.asignado_a_id, self.obj.import_fingerprint), (None, ""))
+
+        self.assertEqual(self.recargar()["updated"], 1)
+        self.obj.refresh_from_db()
+        self.assertEqual((self.obj.asignado_a_id, self.obj.estado), (self.tec.id, "ASIGNADA"))
+        self.assertEqual(self.recargar()["unchanged"], 1)
+
+    def test_edicion_con_update_fields(self):
+        obj = DireccionAsignada.objects.only("id", "direccion", "import_fingerprint").get(pk=self.obj.pk)
+        obj.direccion = "Otra 9"
+        obj.save(update_fields=["direccion"])
+        self.obj.refresh_from_db()
+        self.assertEqual((self.obj.direccion, self.obj.import_fingerprint), ("Otra 9", ""))
+        self.assertEqual(self.recargar()["updated"], 1)
+        self.obj.refresh_from_db()
+        self.assertEqual(self.obj.direccion, "Calle 1")
+
+    def test_guardar_sin_cambios_conserva_la_huella(self):
+        huella = self.obj.import_fingerprint
+        self.obj.reagendado_fecha = None
+        self.obj.save()
+        self.obj.refresh_from_db()
+        self.assertEqual(self.obj.import_fingerprint, huella)
+
+    def test_lectura_no_arma_valores_de_carga(self):
+        # from_db solo guarda la fila; el dict se arma cuando save() compara
+        obj = DireccionAsignada.objects.get(pk=self.obj.pk)
+        self.assertNotIn("_carga_db", obj.__dict__)
+        obj.save()
+        self.assertIn("_carga_db", obj.__dict__)
+        obj.refresh_from_db()
+        self.assertEqual(obj.import_fingerprint, self.obj.import_fingerprint)
+
+
+class PrioridadTests(TestCase):
+    """DireccionAsignada.prioridad guardada en sincronía por cada camino que cambia técnico o reagendamiento."""
+
+    def setUp(self):
+        self.admin = Usuario.objects.create_user(
+            email="prio-admin@test.local", password="x", rol="administrador", first_name="P", last_name="A",
+        )
+        self.tec = Usuario.objects.create_user(
+            email="prio-tec@test.local", password="x", rol="tecnico", first_name="P", last_name="T",
+        )
+        base = dict(comuna=COMUNAS_SANTIAGO[0], marca="VTR", tecnologia="HFC", encuesta="post_visita")
+        self.libre, self.asignada, self.reagendada = (
+            DireccionAsignada.objects.create(direccion=f"Calle {i}", rut_cliente=f"{i}-9", **base)
+            for i in range(3)
+        )
+        self.asignada.asignado_a = self.tec
+        self.asignada.save()
+        self.reagendada.asignado_a = self.tec
+        self.reagendada.reagendado_fecha = date.today() + timedelta(days=2)
+        self.reagendada.save()
+
+    def prioridades(self):
+        return dict(DireccionAsignada.objects.values_list("id", "prioridad"))
+
+    def esperado(self):
+        return {a.id: a.calcular_prioridad() for a in DireccionAsignada.objects.all()}
+
+    def test_save_con_update_fields(self):
+        obj = DireccionAsignada.objects.get(pk=self.libre.pk)
+        obj.asignado_a = self.tec
+        obj.save(update_fields=["asignado_a"])
+        self.assertEqual(self.prioridades()[obj.pk], PrioridadAsignacion.ASIGNADA)
+        obj.asignado_a = None
+        obj.save(update_fields=["asignado_a"])
+        self.assertEqual(self.prioridades()[obj.pk], PrioridadAsignacion.SIN_ASIGNAR)
+
+    def test_registrar_reagendamiento(self):
+        from .views import _registrar_reagendamiento
+        for a in (self.libre, self.asignada):
+            _registrar_reagendamiento(a, date.today() + timedelta(days=3), "10-13", self.admin)
+            self.assertEqual(self.prioridades()[a.pk], PrioridadAsignacion.REAGENDADA)
+        self.assertEqual(self.prioridades(), self.esperado())
+
+    def test_borrar_tecnico(self):
+        self.tec.delete()
+        self.assertEqual(self.prioridades(), {
+            self.libre.pk: PrioridadAsignacion.SIN_ASIGNAR,
+            self.asignada.pk: PrioridadAsignacion.SIN_ASIGNAR,
+            self.reagendada.pk: PrioridadAsignacion.REAGENDADA,
+        })
+        self.assertEqual(self.prioridades(), self.esperado())
+
+    def test_migracion_0015(self):
+        from django.apps import apps
+        migracion = importlib.import_module("asignaciones.migrations.0015_prioridad")
+        # como recién agregada la columna: todas con el default
+        DireccionAsignada.objects.update(prioridad=PrioridadAsignacion.SIN_ASIGNAR)
+        migracion.calcular_prioridad(apps, None)
+        self.assertEqual(self.prioridades(), {
+            self.libre.pk: PrioridadAsignacion.SIN_ASIGNAR,
+            self.asignada.pk: PrioridadAsignacion.ASIGNADA,
+            self.reagendada.pk: PrioridadAsignacion.REAGENDADA,
+        })
+
+
+class ImportJobTests(CargaBase):
+    """Cargas en background: storage privado y limpieza de archivos."""
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.privado = os.path.join(tmp.name, "privado")
+        self.media = os.path.join(tmp.name, "media")
+        ajustes = override_settings(IMPORT_STORAGE_ROOT=self.privado, MEDIA_ROOT=self.media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def archivos(self, raiz):
+        return sorted(os.path.relpath(os.path.join(d, n), raiz) for d, _, ns in os.walk(raiz) for n in ns)
+
+    def test_archivos_privados_y_borrados(self):
+        r = self.subir(self.csv([("J1", "Calle 1", "Macul", "")]), qs="?background=1")
+        self.assertEqual(r.status_code, 202)
+        job_id = r.json()["job_id"]
+        self.assertEqual(len(self.archivos(self.privado)), 1)
+        self.assertEqual(self.archivos(self.media), [])
+
+        job = importacion.ejecutar_job(importacion.tomar_siguiente_job())
+        self.assertEqual(job.estado, "done")
+        self.assertTrue(DireccionAsignada.objects.filter(id_vivienda="J1").exists())
+        # el archivo subido se borra al terminar; quedan solo los resultados
+        self.assertEqual(self.archivos(self.privado), [f"resultados/import_{job_id}.json"])
+
+        r = self.client.get(f"/api/asignaciones/import_jobs/{job_id}/resultados/")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(json.loads(b"".join(r.streaming_content))["summary"]["created"], 1)
+        self.client.force_login(self.tec)
+        self.assertEqual(self.client.get(f"/api/asignaciones/import_jobs/{job_id}/resultados/").status_code, 403)
+        self.client.force_login(self.admin)
+
+        self.assertEqual(importacion.purgar_jobs_vencidos(), 0)
+        ImportJob.objects.filter(pk=job_id).update(finished_at=timezone.now() - timedelta(days=8))
+        self.assertEqual(importacion.purgar_jobs_vencidos(), 1)
+        self.assertEqual(self.archivos(self.privado), [])
+        self.assertEqual(self.client.get(f"/api/asignaciones/import_jobs/{job_id}/resultados/").status_code, 410)
+
+    def test_worker_sin_archivo_falla_con_detalle(self):
+        job_id = self.subir(self.csv([("J2", "Calle 2", "Macul", "")]), qs="?background=1").json()["job_id"]
+        for nombre in self.archivos(self.privado):
+            os.remove(os.path.join(self.privado, nombre))
+        job = importacion.ejecutar_job(importacion.tomar_siguiente_job())
+        self.assertEqual((job.id, job.estado), (job_id, "failed"))
+        self.assertIn("IMPORT_STORAGE_ROOT", job.error)
+
+
+@skipUnless(connection.vendor == "postgresql", "COPY solo existe en PostgreSQL")
+class CopiaPostgresTests(CargaBase):
+    """IMPORT_PG_COPY: el camino COPY deja la BD igual que el de bulk_create/bulk_update."""
+
+    def setUp(self):
+        super().setUp()
+        self.tec2 = Usuario.objects.create_user(
+            email="carga-tec2@test.local", password="x", rol="tecnico", first_name="Otro", last_name="Tec",
+        )
+
+    def cargar(self, pg_copy):
+        encabezados = ("id_vivienda", "direccion", "comuna", "fecha", "bloque", "asignado_email")
+        anio = timezone.localdate().year + 1
+        primera = [
+            (f"V{i}" if i % 3 else "", f"Calle {i}", "Macul", f"0{i % 9 + 1}/02/{anio}",
+             "10-13" if i % 4 == 0 else "", self.tec.email if i % 2 else "")
+            for i in range(250)
+        ]
+        # ediciones por id_vivienda y por direccion+comuna, reasignaciones, desasignaciones y altas
+        segunda = [
+            (viv, f"{dir_} B" if viv else dir_, com, fecha, "", self.tec2.email if i % 5 else "")
+            for i, (viv, dir_, com, fecha, _, _) in enumerate(primera[1::2])
+        ] + [(f"N{i}", f"Nueva {i}", "Providencia", "", "", "") for i in range(40)]
+        with override_settings(IMPORT_PG_COPY=pg_copy, IMPORT_CHUNK_SIZE=100), \
+                mock.patch.object(importacion.importacion_pg, "escribir_lote",
+                                  wraps=importacion.importacion_pg.escribir_lote) as copia:
+            respuestas = [self.subir(self.csv(filas, encabezados), qs="?force=1").json() for filas in (primera, segunda)]
+        self.assertEqual(copia.called, pg_copy)
+        filas = list(DireccionAsignada.objects.order_by("direccion").values_list(
+            "id_vivienda", "direccion", "comuna", "fecha", "reagendado_bloque", "asignado_a", "estado",
+            "prioridad", "import_fingerprint", "marca", "tecnologia", "encuesta", "zona",
+        ))
+        historial = sorted(HistorialAsignacion.objects.values_list(
+            "asignacion__direccion", "accion", "detalles", "usuario",
+        ))
+        bajas = sorted(BajaAsignacion.objects.values_list("asignacion_id", "tecnico", "motivo"))
+        ids = dict(DireccionAsignada.objects.values_list("id", "direccion"))
+        bajas = [(ids.get(a), t, m) for a, t, m in bajas]
+        return respuestas, filas, historial, sorted(bajas, key=repr)
+
+    def test_copy_igual_a_orm(self):
+        orm = self.cargar(False)
+        DireccionAsignada.objects.all().delete()
+        BajaAsignacion.objects.all().delete()
+        copia = self.cargar(True)
+        for a, b in zip(orm, copia):
+            self.assertEqual(a, b)
+        self.assertTrue(all(f[8] for f in copia[1]))  # huellas escritas
+        self.assertTrue(copia[3])
+
+
+class ImportBenchmarkTests(TestCase):
+    """
+    Benchmark de cargar_csv. Por defecto corre solo 1000 filas y verifica lo que no
+    depende del reloj (filas, queries por fila); para tamaños grandes:
+    IMPORT_BENCH_SIZES=1000,10000,100000,500000 python manage.py test asignaciones.
+    Los tiempos se ven con `python manage.py benchmark_importacion`.
+    """
+
+    def setUp(self):
+        self.admin = Usuario.objects.create_user(
+            email="bench-admin@test.local", password="x", rol="administrador",
+            first_name="Bench", last_name="Admin",
+        )
+        self.tecnicos = []
+        for i in range(5):
+            u = Usuario.objects.create_user(
+                email=f"bench-tec{i}@test.local", password="x", rol="tecnico",
+                first_name="Bench", last_name=f"Tec {i}",
+            )
+            self.tecnicos.append(u.email)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _sizes(self):
+        raw = os.environ.get("IMPORT_BENCH_SIZES", "1000")
+        return [int(s) for s in raw.split(",") if s.strip()]
+
+    def _bench(self, n, fmt):
+        nombre = f"bench_{n}.{fmt}"
+        path = os.path.join(self.tmp.name, nombre)
+        (escribir_xlsx if fmt == "xlsx" else escribir_csv)(path, generar_filas(n, self.tecnicos))
+        r = medir_carga(self.admin, path, nombre, trace_memoria=False)
+
+        s = r["summary"]
+        self.assertEqual(r["filas"], n, r)
+        self.assertEqual(s["created"] + s["updated"] + s["unchanged"] + s["errors"], n, r)
+        self.assertGreater(s["created"], 0, r)
+        # La carga va por lotes: muy por debajo de una query por fila
+        self.assertLess(r["queries_por_fila"], 0.1, r)
+        return r
+
+    def test_benchmark_csv(self):
+        for n in self._sizes():
+            with self.subTest(n=n):
+                self._bench(n, "csv")
+
+    def test_benchmark_xlsx(self):
+        for n in self._sizes():
+            with self.subTest(n=n):
+                self._bench(n, "xlsx")
+
+
+class ListadoRapidoBenchmarkTests(TestCase):
+    """
+    Camino rápido del listado (ListadoRapido): mismo JSON byte a byte que
+    DireccionAsignadaSerializer y benchmark por página. Tamaño de la tabla con
+    LIST_BENCH_ROWS (por defecto 2000); la mejora de tiempo solo se exige si se
+    define LIST_BENCH_ROWS (en una corrida normal depende de la carga de la máquina).
+    """
+
+    def setUp(self):
+        self.admin = Usuario.objects.create_user(
+            email="list-admin@test.local", password="x", rol="administrador",
+            first_name="List", last_name="Admin",
+        )
+        self.tec = Usuario.objects.create_user(
+            email="list-tec@test.local", password="x", rol="tecnico",
+            first_name="List", last_name="Tec",
+        )
+        rnd = random.Random(0)
+        n = int(os.environ.get("LIST_BENCH_ROWS", "2000"))
+        hoy = date.today()
+        DireccionAsignada.objects.bulk_create([
+            DireccionAsignada(
+                fecha=hoy + timedelta(days=rnd.randint(-5, 30)) if rnd.random() < 0.9 else None,
+                tecnologia=rnd.choice(["HFC", "FTTH", "NFTT"]),
+                marca=rnd.choice(["CLARO", "VTR"]),
+                rut_cliente=f"{rnd.randint(5_000_000, 25_000_000)}-{rnd.choice('0123456789K')}",
+                id_vivienda=f"L{i:06d}" if rnd.random() < 0.9 else "",
+                direccion=f"Calle {rnd.randint(1, 9999)} #{i} ñandú",
+                comuna=rnd.choice(COMUNAS_SANTIAGO),
+                zona=rnd.choice(["SUR", "Oriente", ""]),
+                encuesta=rnd.choice(["post_visita", "instalacion"]),
+                id_qualtrics=f"R_{rnd.getrandbits(48):012x}",
+                asignado_a=self.tec if rnd.random() < 0.5 else None,
+                estado=rnd.choice(EstadoAsignacion.values),
+                reagendado_fecha=hoy + timedelta(days=3) if rnd.random() < 0.1 else None,
+                reagendado_bloque=rnd.choice(["10-13", "14-18"]) if rnd.random() < 0.1 else None,
+            )
+            for i in range(n)
+        ], batch_size=1000)
+        self.client = APIClient()
+        self.client.force_login(self.admin)
+
+    def test_mismo_json_que_el_serializer(self):
+        urls = [
+            "/api/asignaciones/",
+            "/api/asignaciones/?page=3&page_size=20",
+            "/api/asignaciones/?order=prioridad&cursor=",
+            "/api/asignaciones/?cursor=&fields=direccion",
+            "/api/asignaciones/?order=prioridad&cursor=&fields=comuna",
+            "/api/asignaciones/?ordering=-created_at",
+            f"/api/asignaciones/?asignado_a={self.tec.id}&estado=ASIGNADA",
+            "/api/asignaciones/?search=calle%201",
+            "/api/asignaciones/?search=L00012",
+            "/api/asignaciones/?fields=id,direccion,comuna,fecha,estado,reagendado_bloque",
+            "/api/asignaciones/?omit=created_at,updated_at",
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                rapido = self.client.get(url)
+                with mock.patch("asignaciones.views.ListadoRapido.para", return_value=None):
+                    normal = self.client.get(url)
+                self.assertEqual(rapido.status_code, 200)
+                self.assertEqual(rapido.content, normal.content)
+        # el cursor sigue funcionando con filas de .values_list()
+        siguiente = self.client.get("/api/asignaciones/?order=prioridad&cursor=&page_size=7").json()["next"]
+        self.assertIsNotNone(siguiente)
+        self.assertEqual(self.client.get(siguiente).status_code, 200)
+
+    def test_cursor_recorre_todo_en_orden(self):
+        fecha = F("fecha").asc(nulls_last=True)
+        for params, orden in (("", (fecha, "id")), ("order=prioridad&", ("prioridad", fecha, "id"))):
+            with self.subTest(params=params):
+                vistos, url = [], f"/api/asignaciones/?{params}cursor=&fields=id"
+                while url:
+                    pagina = self.client.get(url).json()
+                    vistos += [r["id"] for r in pagina["results"]]
+                    url = pagina["next"]
+                esperado = list(DireccionAsignada.objects.order_by(*orden).values_list("id", flat=True))
+                self.assertEqual(vistos, esperado)
+
+    def test_benchmark_pagina(self):
+        qs = DireccionAsignada.objects.order_by("fecha", "id")
+        r = medir_listado(qs, page_size=50, repeticiones=int(os.environ.get("LIST_BENCH_REPS", "100")))
+        self.assertTrue(r["identico"])
+        if "LIST_BENCH_ROWS" in os.environ:
+            self.assertGreater(r["speedup"], 1.5, r)
+
+
+class CamposParcialesTests(TestCase):
+    """?fields= / ?omit= (core.serializers.CamposParcialesMixin): respuesta y SQL acotados en los tres listados."""
+
+    def setUp(self):
+        self.admin = Usuario.objects.create_user(
+            email="campos-admin@test.local", password="x", rol="administrador", first_name="C", last_name="A",
+        )
+        self.tec = Usuario.objects.create_user(
+            email="campos-tec@test.local", password="x", rol="tecnico", first_name="C", last_name="T",
+        )
+        base = dict(comuna=COMUNAS_SANTIAGO[0], marca="VTR", tecnologia="HFC", encuesta="post_visita")
+        for i in range(3):
+            a = DireccionAsignada.objects.create(
+                direccion=f"Calle {i}", rut_cliente=f"{i}-9", asignado_a=self.tec, fecha=date.today(), **base,
+            )
+            HistorialAsignacion.objects.create(asignacion=a, accion="CREADA", usuario=self.admin, detalles=f"d{i}")
+            AuditoriaVisita.objects.create(asignacion=a, tecnico=self.tec, customer_status="AUTORIZA")
+        self.client = APIClient()
+        self.client.force_login(self.admin)
+
+    def _select(self, url, tabla):
+        """(JSON, SELECT de la página sobre `tabla`) por el camino del serializer (sin ListadoRapido)."""
+        with mock.patch("asignaciones.views.ListadoRapido.para", return_value=None), \
+                CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200, resp.content)
+        selects = [q["sql"] for q in ctx.captured_queries
+                   if q["sql"].startswith("SELECT") and f'FROM "{tabla}"' in q["sql"]
+                   and "COUNT(" not in q["sql"] and "MAX(" not in q["sql"]]
+        self.assertEqual(len(selects), 1, selects)
+        return resp.json()["results"], selects[0]
+
+    def test_campo_desconocido_400(self):
+        for url in ("/api/asignaciones/", "/api/asignaciones/historial/", "/api/auditorias/"):
+            for param in ("fields=id,nope", "omit=nope"):
+                with self.subTest(url=url, param=param):
+                    resp = self.client.get(f"{url}?{param}")
+                    self.assertEqual(resp.status_code, 400)
+                    self.assertIn("nope", resp.json()["fields"])
+
+    def test_historial(self):
+        completos = {r["id"]: r for r in self.client.get("/api/asignaciones/historial/").json()["results"]}
+        filas, sql = self._select("/api/asignaciones/historial/?fields=id,accion,detalles", "historial_asignaciones")
+        self.assertEqual({frozenset(r) for r in filas}, {frozenset({"id", "accion", "detalles"})})
+        for r in filas:
+            self.assertEqual(r, {k: completos[r["id"]][k] for k in r})
+        self.assertNotIn("JOIN", sql)
+
+        # solo la relación que se recorre, y de ella solo la columna leída
+        filas, sql = self._select("/api/asignaciones/historial/?fields=id,direccion", "historial_asignaciones")
+        self.assertEqual({frozenset(r) for r in filas}, {frozenset({"id", "direccion"})})
+        self.assertIn('"asignaciones"."direccion"', sql)
+        self.assertNotIn('"asignaciones"."rut_cliente"', sql)
+        self.assertNotIn('"usuarios"', sql)
+
+        filas, _ = self._select("/api/asignaciones/historial/?omit=asignacion_info,detalles", "historial_asignaciones")
+        self.assertTrue(all("asignacion_info" not in r and "detalles" not in r and "usuario_email" in r for r in filas))
+
+    def test_auditorias(self):
+        tabla = AuditoriaVisita._meta.db_table
+        completos = {r["id"]: r for r in self.client.get("/api/auditorias/").json()["results"]}
+        filas, sql = self._select("/api/auditorias/?fields=id,customer_status", tabla)
+        self.assertEqual({frozenset(r) for r in filas}, {frozenset({"id", "customer_status"})})
+        for r in filas:
+            self.assertEqual(r, {k: completos[r["id"]][k] for k in r})
+        self.assertNotIn("JOIN", sql)
+        self.assertNotIn(f'"{tabla}"."desc_hfc"', sql)
+
+        filas, sql = self._select("/api/auditorias/?fields=id,tecnico_nombre", tabla)
+        self.assertEqual([r["tecnico_nombre"] for r in filas], [completos[r["id"]]["tecnico_nombre"] for r in filas])
+        self.assertIn("JOIN", sql)
+        self.assertNotIn('"asignaciones"."rut_cliente"', sql)
+
+        filas, _ = self._select("/api/auditorias/?omit=photo1,photo2,photo3", tabla)
+        self.assertTrue(all("photo1" not in r and "customer_status" in r for r in filas))
+
+    def test_asignaciones(self):
+        filas, sql = self._select("/api/asignaciones/?fields=id,direccion", "asignaciones")
+        self.assertEqual({frozenset(r) for r in filas}, {frozenset({"id", "direccion"})})
+        self.assertNotIn("JOIN", sql)
+        self.assertNotIn('"asignaciones"."rut_cliente"', sql)
+
+
+class BusquedaTests(TestCase):
+    """?search= de la API y caja de búsqueda del admin: campos de siempre y orden pedido."""
+
+    def setUp(self):
+        self.admin = Usuario.objects.create_user(
+            email="busq-admin@test.local", password="x", rol="administrador",
+            first_name="Busq", last_name="Admin",
+        )
+        self.tec = Usuario.objects.create_user(
+            email="busq-tec@test.local", password="x", rol="tecnico",
+            first_name="Busq", last_name="Tec",
+        )
+        hoy = date.today()
+        base = dict(tecnologia="HFC", marca="CLARO", rut_cliente="11111111-1", comuna="Maipú")
+        # la fecha más próxima es la de menor prioridad: el orden por fecha y el por prioridad difieren
+        self.sin_asignar = DireccionAsignada.objects.create(
+            **base, direccion="Los Aromos 10", fecha=hoy + timedelta(days=1),
+            encuesta="post_visita", id_qualtrics="R_soloqualtrics",
+        )
+        self.asignada = DireccionAsignada.objects.create(
+            **base, direccion="Los Aromos 20", fecha=hoy + timedelta(days=2),
+            encuesta="instalacion", asignado_a=self.tec,
+        )
+        self.reagendada = DireccionAsignada.objects.create(
+            **base, direccion="Los Aromos 30", fecha=hoy + timedelta(days=3),
+            encuesta="operaciones", asignado_a=self.tec, reagendado_fecha=hoy + timedelta(days=4),
+        )
+        self.client = APIClient()
+        self.client.force_login(self.admin)
+
+    def _ids(self, url):
+        return [r["id"] for r in self.client.get(url).json()["results"]]
+
+    def _admin(self, termino):
+        from django.contrib import admin as djadmin
+        ma = djadmin.site._registry[DireccionAsignada]
+        qs, _ = ma.get_search_results(None, DireccionAsignada.objects.all(), termino)
+        return set(qs.values_list("id", flat=True))
+
+    def test_api_busca_en_sus_campos(self):
+        self.assertEqual(self._ids("/api/asignaciones/?search=soloqualtrics"), [])
+        self.assertEqual(len(self._ids("/api/asignaciones/?search=aromos%2020")), 1)
+
+    def test_admin_busca_qualtrics_y_encuesta(self):
+        self.assertEqual(self._admin("soloqualtrics"), {self.sin_asignar.id})
+        self.assertEqual(self._admin("instala"), {self.asignada.id})
+        self.assertEqual(self._admin("aromos operac"), {self.reagendada.id})
+
+    def test_orden_pedido_sobre_relevancia(self):
+        por_prioridad = list(
+            DireccionAsignada.objects.order_by("prioridad", F("fecha").asc(nulls_last=True), "id")
+            .values_list("id", flat=True)
+        )
+        self.assertNotEqual(por_prioridad, [self.sin_asignar.id, self.asignada.id, self.reagendada.id])
+        self.assertEqual(self._ids("/api/asignaciones/?search=aromos&order=prioridad"), por_prioridad)
+        self.assertEqual(
+            self._ids("/api/asignaciones/?search=aromos&ordering=-fecha"),
+            [self.reagendada.id, self.asignada.id, self.sin_asignar.id],
+        )
+
+
+class CambiosTests(CargaBase):
+    """GET /api/asignaciones/changes/ (asignaciones/sincronizacion.py): cambios, tombstones y cursor."""
+
+    def setUp(self):
+        super().setUp()
+        self.tec2 = Usuario.objects.create_user(
+            email="carga-tec2@test.local", password="x", rol="tecnico", first_name="Carga", last_name="Tec2",
+        )
+        r = self.subir(self.csv([
+            (f"V{i}", f"Calle {i}", "Macul", self.tec.email) for i in range(4)
+        ]), qs="?force=1")
+        self.assertEqual(r.status_code, 200, r.content[:300])
+        self.filas = list(DireccionAsignada.objects.order_by("id_vivienda"))
+        self.assertEqual([f.asignado_a_id for f in self.filas], [self.tec.id] * 4)
+
+    def cambios(self, user, since=None, estado=200):
+        client = APIClient()
+        client.force_login(user)
+        resp = client.get("/api/asignaciones/changes/", {"since": since} if since is not None else {})
+        self.assertEqual(resp.status_code, estado, resp.content[:300])
+        return resp.json()
+
+    def envejecer(self, segundos=3600):
+        # fuera del MARGEN: el cursor puede llegar hasta ellas
+        DireccionAsignada.objects.update(updated_at=timezone.now() - timedelta(seconds=segundos))
+
+    def envejecer_bajas(self):
+        # las bajas dentro del MARGEN se vuelven a informar en la llamada siguiente
+        BajaAsignacion.objects.update(created_at=timezone.now() - timedelta(hours=1))
+
+    def test_bajas_del_tecnico_anterior(self):
+        admin = APIClient()
+        admin.force_login(self.admin)
+        tec = APIClient()
+        tec.force_login(self.tec)
+        a, b, c, d = self.filas
+        casos = (
+            ("desasignar", lambda: admin.patch(f"/api/asignaciones/{a.id}/desasignar/"), a, "DESASIGNADA"),
+            ("desasignarme", lambda: tec.post(f"/api/asignaciones/{b.id}/desasignarme/", {}, format="json"),
+             b, "DESASIGNADA"),
+            ("importacion", lambda: self.subir(self.csv([("V2", "Calle 2", "Macul", self.tec2.email)]),
+                                              qs="?force=1"), c, "REASIGNADA"),
+            ("eliminar", lambda: admin.delete(f"/api/asignaciones/{d.id}/"), d, "ELIMINADA"),
+        )
+        for nombre, accion, fila, motivo in casos:
+            with self.subTest(accion=nombre):
+                self.envejecer_bajas()
+                since = self.cambios(self.tec)["cursor"]
+                self.assertLess(accion().status_code, 300)
+                datos = self.cambios(self.tec, since)
+                self.assertEqual(datos["deleted"], [{"id": fila.id, "motivo": motivo}])
+                self.assertNotIn(fila.id, [x["id"] for x in datos["changes"]])
+        # la reasignada llega como cambio al técnico nuevo; el administrador solo ve las eliminadas
+        self.assertEqual([x["id"] for x in self.cambios(self.tec2)["changes"]], [c.id])
+        self.assertEqual(self.cambios(self.admin, since="")["deleted"], [])
+        self.envejecer_bajas()
+        inicial = self.cambios(self.admin)["cursor"]
+        e = DireccionAsignada.objects.create(direccion="Otra", comuna="Macul", asignado_a=self.tec)
+        e_id = e.id
+        e.delete()
+        self.assertEqual(self.cambios(self.admin, inicial)["deleted"], [{"id": e_id, "motivo": "ELIMINADA"}])
+
+    def test_vuelve_al_alcance(self):
+        a = self.filas[0]
+        since = self.cambios(self.tec)["cursor"]
+        a.asignado_a = None
+        a.save()
+        a.asignado_a = self.tec
+        a.save()
+        datos = self.cambios(self.tec, since)
+        self.assertEqual(datos["deleted"], [])
+        self.assertIn(a.id, [x["id"] for x in datos["changes"]])
+        self.assertEqual(BajaAsignacion.objects.filter(asignacion_id=a.id).count(), 1)
+
+    def test_since_y_margen(self):
+        self.envejecer()
+        since = self.cambios(self.tec)["cursor"]
+        self.assertEqual(self.cambios(self.tec, since)["changes"], [])
+
+        # solo lo posterior al cursor
+        a, b = self.filas[:2]
+        a.direccion = "Calle 0 B"
+        a.save()
+        datos = self.cambios(self.tec, since)
+        self.assertEqual([(x["id"], x["direccion"]) for x in datos["changes"]], [(a.id, "Calle 0 B")])
+
+        # dentro del MARGEN el cursor no avanza: se vuelve a entregar
+        DireccionAsignada.objects.filter(id=b.id).update(updated_at=timezone.now() - timedelta(seconds=2))
+        datos = self.cambios(self.tec, datos["cursor"])
+        self.assertEqual({x["id"] for x in datos["changes"]}, {a.id, b.id})
+        self.assertEqual({x["id"] for x in self.cambios(self.tec, datos["cursor"])["changes"]}, {a.id, b.id})
+
+        # fuera del margen, se entregan una vez
+        self.envejecer(60)
+        datos = self.cambios(self.tec, since)
+        self.assertEqual(len(datos["changes"]), 4)
+        self.assertEqual(self.cambios(self.tec, datos["cursor"])["changes"], [])
+
+    def test_has_more(self):
+        self.envejecer()
+        with mock.patch("asignaciones.sincronizacion.LIMITE", 3):
+            primera = self.cambios(self.tec)
+            self.assertTrue(primera["has_more"])
+            segunda = self.cambios(self.tec, primera["cursor"])
+        self.assertFalse(segunda["has_more"])
+        vistos = [x["id"] for x in primera["changes"] + segunda["changes"]]
+        self.assertEqual(vistos, sorted(f.id for f in self.filas))
+
+        # dentro del margen no hay has_more: el cursor no puede avanzar hasta ellas
+        DireccionAsignada.objects.update(updated_at=timezone.now())
+        with mock.patch("asignaciones.sincronizacion.LIMITE", 3):
+            datos = self.cambios(self.tec, segunda["cursor"])
+        self.assertEqual(len(datos["changes"]), 3)
+        self.assertFalse(datos["has_more"])
+
+    def test_cursor_invalido(self):
+        # no es base64/JSON, otra forma, id que no es entero
+        for since in ("no-es-un-cursor", b'["x", 1]', b'[["2025-01-01T00:00:00", "1"], null]'):
+            if isinstance(since, bytes):
+                since = base64.urlsafe_b64encode(since).decode()
+            with self.subTest(since=since):
+                datos = self.cambios(self.tec, since, estado=400)
+                self.assertIn("since", datos)
+
+
+class PaqueteOfflineTests(TestCase):
+    """GET /bundle/: consultas fijas, caché por técnico y versión (ETag)."""
+
+    def setUp(self):
+        paquete._cache().clear()
+        self.tec = Usuario.objects.create_user(
+            email="bundle-tec@test.local", password="x", rol="tecnico", first_name="B", last_name="T",
+        )
+        self.client = APIClient()
+        self.client.force_login(self.tec)
+        self.hoy = timezone.localdate()
+
+    def _crear(self, n, **extra):
+        return DireccionAsignada.objects.bulk_create([
+            DireccionAsignada(direccion=f"Calle {i}", comuna=COMUNAS_SANTIAGO[0], marca="VTR", tecnologia="HFC",
+                              rut_cliente=f"{i}-9", id_vivienda=f"B{i}-{extra.get('fecha')}", encuesta="post_visita",
+                              asignado_a=self.tec, **extra)
+            for i in range(n)
+        ])
+
+    def _bundle(self, **headers):
+        resp = self.client.get("/api/asignaciones/bundle/", HTTP_ACCEPT_ENCODING="gzip", **headers)
+        if resp.status_code == 200:
+            self.assertEqual(resp["Content-Encoding"], "gzip")
+            resp.datos = json.loads(gzip.decompress(resp.content))
+        return resp
+
+    def _consultas(self, **headers):
+        # sin las de sesión/usuario (las hace el middleware de autenticación)
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self._bundle(**headers)
+        return resp, [q for q in ctx.captured_queries
+                      if '"asignaciones"' in q["sql"] or '"historial_asignaciones"' in q["sql"]]
+
+    def test_contenido(self):
+        visitas = self._crear(3, fecha=self.hoy)
+        self._crear(2, fecha=self.hoy + timedelta(days=1))
+        HistorialAsignacion.objects.create(asignacion=visitas[0], accion="CREADA", usuario=self.tec)
+        d = self._bundle().datos
+        self.assertEqual(sorted(v["id"] for v in d["visitas"]), sorted(a.id for a in visitas))
+        self.assertEqual(len(d["historial"]), 1)
+        ref = d["referencia"]
+        self.assertEqual([e["value"] for e in ref["estados"]], list(EstadoAsignacion.values))
+        self.assertEqual(ref["comunas"], list(COMUNAS_SANTIAGO))
+        self.assertEqual(len(ref["estados_q5"]), 6)
+        sin_gzip = self.client.get("/api/asignaciones/bundle/")
+        self.assertNotIn("Content-Encoding", sin_gzip)
+        self.assertEqual(json.loads(sin_gzip.content), d)
+
+    def test_etag_por_codificacion(self):
+        self._crear(1, fecha=self.hoy)
+        con_gzip, sin_gzip = self._bundle(), self.client.get("/api/asignaciones/bundle/")
+        self.assertTrue(con_gzip["ETag"].endswith('-gzip"'))
+        self.assertEqual(con_gzip["ETag"], sin_gzip["ETag"][:-1] + '-gzip"')
+        for resp in (con_gzip, sin_gzip):
+            self.assertIn("Accept-Encoding", resp["Vary"])
+        # cada ETag valida solo su representación
+        r304 = self._bundle(HTTP_IF_NONE_MATCH=con_gzip["ETag"])
+        self.assertEqual(r304.status_code, 304)
+        self.assertIn("Accept-Encoding", r304["Vary"])
+        self.assertEqual(self.client.get("/api/asignaciones/bundle/", HTTP_IF_NONE_MATCH=con_gzip["ETag"]).status_code, 200)
+        self.assertEqual(self._bundle(HTTP_IF_NONE_MATCH=sin_gzip["ETag"]).status_code, 200)
+
+    def test_accept_encoding(self):
+        casos = {
+            "gzip": True, "GZIP": True, "deflate, gzip;q=0.5": True, "x-gzip": True, "br, *": True,
+            "": False, "gzip;q=0": False, "gzip; q=0.0": False, "x-gzip-foo": False, "deflate, br": False,
+            "*;q=0": False, "*, gzip;q=0": False, "gzip;q=abc": False,
+        }
+        for encabezado, esperado in casos.items():
+            with self.subTest(encabezado=encabezado):
+                self.assertEqual(paquete.acepta_gzip(encabezado), esperado)
+        self._crear(1, fecha=self.hoy)
+        for encabezado in ("gzip;q=0", "x-gzip-foo"):
+            with self.subTest(encabezado=encabezado):
+                resp = self.client.get("/api/asignaciones/bundle/", HTTP_ACCEPT_ENCODING=encabezado)
+                self.assertNotIn("Content-Encoding", resp)
+                self.assertFalse(resp["ETag"].endswith('-gzip"'))
+                self.assertEqual(len(json.loads(resp.content)["visitas"]), 1)
+
+    def test_cache_compartida(self):
+        # el paquete va al caché compartido entre procesos, no a la LocMem por defecto
+        self._crear(1, fecha=self.hoy)
+        self._bundle()
+        self.assertIsNotNone(caches[settings.BUNDLE_CACHE].get(f"asignaciones:bundle:{self.tec.id}"))
+        self.assertNotEqual(type(caches[settings.BUNDLE_CACHE]), type(caches["default"]))
+
+    def test_consultas_fijas_y_cache(self):
+        self._crear(2, fecha=self.hoy)
+        _, pocas = self._consultas()
+        paquete._cache().clear()
+        self._crear(40, reagendado_fecha=self.hoy)
+        resp, muchas = self._consultas()
+        self.assertEqual(len(resp.datos["visitas"]), 42)
+        self.assertEqual(len(pocas), len(muchas))
+        self.assertEqual(len(muchas), 3)  # versión, visitas, historial
+
+        # en caché: solo la consulta de versión
+        resp2, cacheadas = self._consultas()
+        self.assertEqual(len(cacheadas), 1)
+        self.assertEqual(resp2.content, resp.content)
+
+        # 304 con la ETag vigente
+        self.assertEqual(self._bundle(HTTP_IF_NONE_MATCH=resp["ETag"]).status_code, 304)
+
+        # cambia una de sus asignaciones: se rearma
+        a = DireccionAsignada.objects.filter(asignado_a=self.tec).first()
+        a.direccion = "Otra"
+        a.save(update_fields=["direccion", "updated_at"])
+        resp3, _ = self._consultas(HTTP_IF_NONE_MATCH=resp["ETag"])
+        self.assertEqual(resp3.status_code, 200)
+        self.assertNotEqual(resp3["ETag"], resp["ETag"])
+        self.assertIn("Otra", [v["direccion"] for v in resp3.datos["visitas"]])
+
+
+class VersionListadoTests(TestCase):
+    """ETag de los listados (core/condicional.py): sin COUNT(*) y sensible a bajas y a filas que salen del filtro."""
+
+    def setUp(self):
+        self.admin = Usuario.objects.create_user(
+            email="ver-admin@test.local", password="x", rol="administrador", first_name="V", last_name="A",
+        )
+        base = dict(comuna=COMUNAS_SANTIAGO[0], marca="VTR", tecnologia="HFC", encuesta="post_visita")
+        self.filas = [
+            DireccionAsignada.objects.create(direccion=f"Calle {i}", rut_cliente=f"{i}-9", **base)
+            for i in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_login(self.admin)
+
+    def _etag(self, url):
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return resp["ETag"]
+
+    def test_304_sin_contar(self):
+        etag = self._etag("/api/asignaciones/")
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get("/api/asignaciones/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertFalse([q["sql"] for q in ctx.captured_queries if "COUNT(" in q["sql"].upper()])
+
+    def test_cambia_con_bajas_y_filtros(self):
+        url = "/api/asignaciones/?estado=PENDIENTE"
+        etag = self._etag(url)
+        self.filas[0].delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # una fila que sale del filtro no mueve el MAX del listado filtrado, sí el de la tabla
+        etag = self._etag(url)
+        self.filas[1].estado = EstadoAsignacion.VISITADA
+        self.filas[1].save(update_fields=["estado", "updated_at"])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_last_modified_con_bajas(self):
+        # solo If-Modified-Since: el borrado (tombstone) también mueve Last-Modified
+        for url in ("/api/asignaciones/", "/api/asignaciones/historial/", "/api/auditorias/"):
+            with self.subTest(url=url):
+                hace_una_hora = timezone.now() - timedelta(hours=1)
+                DireccionAsignada.objects.update(updated_at=hace_una_hora)
+                HistorialAsignacion.objects.update(created_at=hace_una_hora)
+                BajaAsignacion.objects.update(created_at=hace_una_hora)
+                resp = self.client.get(url)
+                self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=resp["Last-Modified"]).status_code, 304)
+                self.filas.pop().delete()
+                resp2 = self.client.get(url, HTTP_IF_MODIFIED_SINCE=resp["Last-Modified"])
+                self.assertEqual(resp2.status_code, 200)
+                self.assertNotEqual(resp2["Last-Modified"], resp["Last-Modified"])
+
+    def test_auditoria_borrada(self):
+        # se borra la más antigua: el MAX(updated_at) de auditorías no cambia
+        auditoria = AuditoriaVisita.objects.create(asignacion=self.filas[2])
+        AuditoriaVisita.objects.create(asignacion=self.filas[1])
+        url = "/api/auditorias/"
+        etag = self._etag(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.delete(f"/api/auditorias/{auditoria.id}/").status_code, 204)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ConteoEstimadoTests(TestCase):
+    """count de los listados paginados (ConteoEstimadoPagination): exacto hasta el umbral, estimado sobre él."""
+    URLS = ("/api/asignaciones/", "/api/asignaciones/historial/", "/api/auditorias/")
+
+    def setUp(self):
+        self.admin = Usuario.objects.create_user(
+            email="conteo-admin@test.local", password="x", rol="administrador", first_name="C", last_name="A",
+        )
+        base = dict(comuna=COMUNAS_SANTIAGO[0], marca="VTR", tecnologia="HFC", encuesta="post_visita")
+        filas = DireccionAsignada.objects.bulk_create([
+            DireccionAsignada(direccion=f"Calle {i}", rut_cliente=f"{i}-9", **base) for i in range(60)
+        ])
+        HistorialAsignacion.objects.bulk_create([HistorialAsignacion(asignacion=a, accion="CREADA") for a in filas])
+        AuditoriaVisita.objects.bulk_create([AuditoriaVisita(asignacion=a) for a in filas])
+        self.client = APIClient()
+        self.client.force_login(self.admin)
+
+    def _pagina(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return resp.json(), [q["sql"] for q in ctx.captured_queries if "COUNT(" in q["sql"].upper()]
+
+    @override_settings(PAGINATION_EXACT_COUNT_THRESHOLD=100)
+    def test_exacto_bajo_el_umbral(self):
+        for url in self.URLS:
+            with self.subTest(url=url):
+                d, _ = self._pagina(url)
+                self.assertEqual(d["count"], 60)
+                self.assertFalse(d["count_approximate"])
+
+    @skipUnless(connection.vendor == "postgresql", "la estimación del planner es de PostgreSQL")
+    @override_settings(PAGINATION_EXACT_COUNT_THRESHOLD=20)
+    def test_estimado_sobre_el_umbral(self):
+        with mock.patch("core.pagination._PaginadorEstimado._estimacion", return_value=12345) as estimacion:
+            for url in self.URLS:
+                with self.subTest(url=url):
+                    d, conteos = self._pagina(url)
+                    self.assertEqual(d["count"], 12345)
+                    self.assertTrue(d["count_approximate"])
+                    self.assertIsNotNone(d["next"])
+                    # solo el COUNT acotado (LIMIT umbral + 1), ninguno sobre el listado entero
+                    self.assertEqual(len(conteos), 1)
+                    self.assertIn("LIMIT 21", conteos[0])
+        self.assertEqual(estimacion.call_count, len(self.URLS))
+
+
+@skipUnless(connection.vendor == "postgresql", "EXPLAIN de regresión solo en PostgreSQL")
+class ExplainPlanTests(TestCase):
+    """
+    Regresión de planes: cada SELECT que emiten los listados/métricas sobre un
+    dataset sembrado debe poder resolverse con índices. Se hace EXPLAIN con
+    enable_seqscan=off y falla si el plan aún recorre la tabla entera (ver
+    _recorridos_completos), es decir, si falta (o se rompió) un índice.
+    """
+    N = 3000
+    TABLAS = ("asignaciones", "historial_asignaciones", AuditoriaVisita._meta.db_table, "bajas_asignaciones")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user(
+            email="explain-admin@test.local", password="x", rol="administrador",
+            first_name="Explain", last_name="Admin",
+        )
+        cls.tecnicos = [
+            Usuario.objects.create_user(
+                email=f"explain-tec{i}@test.local", password="x", rol="tecnico",
+                first_name="Explain", last_name=f"Tec {i}",
+            )
+            for i in range(10)
+        ]
+        rnd = random.Random(0)
+        estados = [e for e, _ in EstadoAsignacion.choices]
+        hoy = date(2025, 1, 1)
+        asignaciones = []
+        for i in range(cls.N):
+            reag = rnd.random() < 0.1
+            asignaciones.append(DireccionAsignada(
+                fecha=None if i % 50 == 0 else hoy + timedelta(days=rnd.randrange(365)),
+                tecnologia=rnd.choice(["HFC", "NFTT", "FTTH"]),
+                marca=rnd.choice(["CLARO", "VTR"]),
+                rut_cliente=f"{10000000 + i}-{i % 10}",
+                id_vivienda=f"V{i}",
+                direccion=f"Calle {i}",
+                comuna=rnd.choice(COMUNAS_SANTIAGO),
+                zona=rnd.choice(["NORTE", "SUR", "ORIENTE", "PONIENTE", "CENTRO"]),
+                encuesta=rnd.choice(["post_visita", "instalacion", "operaciones"]),
+                asignado_a=rnd.choice(cls.tecnicos) if rnd.random() < 0.7 else None,
+                estado=rnd.choice(estados),
+                reagendado_fecha=hoy + timedelta(days=rnd.randrange(365)) if reag else None,
+                reagendado_bloque="10-13" if reag else None,
+            ))
+        asignaciones = DireccionAsignada.objects.bulk_create(asignaciones)
+        HistorialAsignacion.objects.bulk_create([
+            HistorialAsignacion(asignacion=a, accion="CREADA", usuario=rnd.choice(cls.tecnicos + [cls.admin]))
+            for a in asignaciones for _ in range(2)
+        ])
+        AuditoriaVisita.objects.bulk_create([
+            AuditoriaVisita(asignacion=a, tecnico=a.asignado_a, customer_status="AUTORIZA")
+            for a in asignaciones
+        ])
+        with connection.cursor() as cur:
+            # historial y auditorías repartidos en un año, como en producción (no todo "de hoy")
+            cur.execute("UPDATE historial_asignaciones SET created_at = created_at - (id % 365) * interval '1 day'")
+            cur.execute(f"UPDATE {connection.ops.quote_name(AuditoriaVisita._meta.db_table)} "
+                        f"SET created_at = created_at - (id * 7 % 365) * interval '1 day'")
+        BajaAsignacion.objects.bulk_create([
+            BajaAsignacion(asignacion_id=a.id, tecnico=rnd.choice(cls.tecnicos),
+                           motivo=rnd.choice(BajaAsignacion.Motivo.values))
+            for a in asignaciones
+        ])
+        with connection.cursor() as cur:
+            for t in cls.TABLAS:
+                cur.execute(f"ANALYZE {connection.ops.quote_name(t)}")
+
+    def _planes(self, user, method, url, **kwargs):
+        client = APIClient()
+        client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            resp = getattr(client, method)(url, **kwargs)
+        self.assertLess(resp.status_code, 400, resp.content[:300])
+        planes = []
+        with connection.cursor() as cur:
+            cur.execute("SET enable_seqscan = off")
+            try:
+                for q in ctx.captured_queries:
+                    # .iterator() en PostgreSQL va por cursor con nombre: DECLARE ... CURSOR FOR SELECT
+                    sql = re.sub(r"^DECLARE .*? CURSOR FOR ", "", q["sql"].lstrip())
+                    if not sql.upper().startswith("SELECT"):
+                        continue
+                    if not any(f'"{t}"' in sql for t in self.TABLAS):
+                        continue
+                    cur.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+                    plan = cur.fetchone()[0]
+                    plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+                    cur.execute(f"EXPLAIN {sql}")
+                    planes.append((sql, plan, "\n".join(r[0] for r in cur.fetchall())))
+            finally:
+                cur.execute("RESET enable_seqscan")
+        return planes
+
+    def _recorridos_completos(self, node, bajo_sort=False):
+        """
+        Nodos que recorren una tabla entera: Seq Scan, o (con enable_seqscan=off,
+        que es lo que el planner usa en su lugar) un Index Scan sin Index Cond
+        que además filtra filas o cuyo resultado hay que volver a ordenar.
+        Los recorridos por la PK se toleran: son el lado interno de un merge join
+        por id, que con datos reales el planner resuelve con búsquedas por índice.
+        """
+        tipo = node.get("Node Type")
+        if node.get("Relation Name") in self.TABLAS:
+            if tipo == "Seq Scan":
+                yield node
+            elif (tipo in ("Index Scan", "Index Only Scan") and "Index Cond" not in node
+                  and not node.get("Index Name", "").endswith("_pkey")
+                  and ("Filter" in node or bajo_sort)):
+                yield node
+        bajo_sort = bajo_sort or tipo == "Sort"
+        for hijo in node.get("Plans", []):
+            yield from self._recorridos_completos(hijo, bajo_sort)
+
+    def _usa_indices(self, user, url, method="get", **kwargs):
+        planes = self._planes(user, method, url, **kwargs)
+        self.assertTrue(planes, f"{url}: no se capturaron consultas")
+        for sql, plan, texto in planes:
+            malos = [n["Relation Name"] for n in self._recorridos_completos(plan)]
+            self.assertFalse(malos, f"Recorrido completo en {url}\nSQL: {sql}\n{texto}")
+
+    def test_listado_asignaciones(self):
+        tec = self.tecnicos[0]
+        for url in (
+            "/api/asignaciones/",
+            "/api/asignaciones/?page=3",
+            "/api/asignaciones/?estado=VISITADA",
+            f"/api/asignaciones/?asignado_a={tec.id}",
+            f"/api/asignaciones/?asignado_a={tec.id}&estado=ASIGNADA",
+            "/api/asignaciones/?fecha__gte=2025-03-01&fecha__lte=2025-03-31",
+            "/api/asignaciones/?cursor=",
+            "/api/asignaciones/?order=prioridad",
+            "/api/asignaciones/?order=prioridad&cursor=",
+        ):
+            with self.subTest(url=url):
+                self._usa_indices(self.admin, url)
+        # páginas de cursor no vacías: a mitad de la tabla, en la cola de fecha NULL y la siguiente real
+        hondo = DireccionAsignada.objects.filter(fecha__isnull=False).order_by("fecha", "id")[self.N // 2]
+        nulo = DireccionAsignada.objects.filter(fecha__isnull=True).order_by("id").first()
+        client = APIClient()
+        client.force_login(self.admin)
+        for url in (
+            f"/api/asignaciones/?cursor={CursorOptInPagination._encode([hondo.fecha, hondo.id])}",
+            f"/api/asignaciones/?cursor={CursorOptInPagination._encode([None, nulo.id])}",
+            f"/api/asignaciones/?order=prioridad&cursor="
+            f"{CursorOptInPagination._encode([hondo.prioridad, hondo.fecha, hondo.id])}",
+            client.get("/api/asignaciones/?cursor=").json()["next"],
+            client.get("/api/asignaciones/?order=prioridad&cursor=").json()["next"],
+        ):
+            with self.subTest(url=url):
+                self._usa_indices(self.admin, url)
+        with self.subTest(url="?mine=1"):
+            self._usa_indices(tec, "/api/asignaciones/?mine=1")
+        with self.subTest(url="bundle"):
+            paquete._cache().clear()
+            self._usa_indices(tec, "/api/asignaciones/bundle/")
+
+    def test_metricas(self):
+        rango = "fecha__gte=2025-02-01&fecha__lte=2025-04-30"
+        for url in (
+            f"/api/asignaciones/metrics/resumen/?{rango}",
+            f"/api/asignaciones/metrics/resumen/?{rango}&zona=NORTE",
+            f"/api/asignaciones/metrics/resumen/?{rango}&comuna={quote(COMUNAS_SANTIAGO[0])}",
+            f"/api/asignaciones/metrics/resumen/?{rango}&marca=VTR&tecnologia=HFC",
+            f"/api/asignaciones/metrics/resumen/?{rango}&tecnico_id={self.tecnicos[1].id}",
+            f"/api/asignaciones/metrics/serie/?{rango}",
+            f"/api/asignaciones/metrics/serie/?{rango}&zona=SUR",
+        ):
+            with self.subTest(url=url):
+                self._usa_indices(self.admin, url)
+
+    def test_historial(self):
+        tec = self.tecnicos[2]
+        self._usa_indices(self.admin, "/api/asignaciones/historial/")
+        self._usa_indices(self.admin, f"/api/asignaciones/historial/?tecnico_id={tec.id}")
+        self._usa_indices(tec, "/api/asignaciones/historial/")
+
+    def test_auditorias(self):
+        tec = self.tecnicos[3]
+        a = DireccionAsignada.objects.filter(auditorias__isnull=False).order_by("id").first()
+        for user, url in (
+            (self.admin, "/api/auditorias/"),
+            (self.admin, f"/api/auditorias/?tecnico={tec.id}"),
+            (self.admin, f"/api/auditorias/?asignacion={a.id}"),
+            (tec, "/api/auditorias/"),
+        ):
+            with self.subTest(url=url, rol=user.rol):
+                self._usa_indices(user, url)
+
+    def test_cambios(self):
+        tec = self.tecnicos[4]
+        for user in (tec, self.admin):
+            with self.subTest(rol=user.rol):
+                self._usa_indices(user, "/api/asignaciones/changes/")
+                client = APIClient()
+                client.force_login(user)
+                cursor = client.get("/api/asignaciones/changes/").json()["cursor"]
+                self._usa_indices(user, f"/api/asignaciones/changes/?since={cursor}")
@@ -1,36 +1,48 @@
-from datetime import datetime
 import csv
+import gzip
 import io
+import json
 import re
 import unicodedata
-from typing import List, Dict, Any
+from typing import Dict, Any
 import threading  # <-- agregado: para lanzar notificaciones en background
 
 from django.db import transaction
-from django.db.models import Case, When, Value, IntegerField, Q, Count
+from django.db.models import Q, Count, F
 from django.db.models.functions import TruncDate
-from django.http import HttpResponse
+from django.http import HttpResponse, FileResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
 from django.conf import settings
 
-from openpyxl import load_workbook, Workbook
+from openpyxl import Workbook
 from rest_framework import viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 
+from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema
 
+from core.condicional import VersionHTTP
+from core.pagination import CursorOptInPagination
+from core.serializers import ListadoRapido
 from core.permissions import AdminFull_TechReadOnlyPlusActions
 from usuarios.models import Usuario
 
-from .models import DireccionAsignada, HistorialAsignacion
+from .filters import BusquedaAsignacionesFilter
+from .models import BajaAsignacion, DireccionAsignada, HistorialAsignacion, ImportJob
+from . import paquete
+from .sincronizacion import cambios_desde
 from .serializers import (
     DireccionAsignadaSerializer,
     HistorialAsignacionSerializer,
     CsvRowResult,
     CargaCSVSerializer,
+    ImportJobSerializer,
     AsignarmeActionSerializer,
     EstadoClienteActionSerializer,   # se usa con 'motivo' opcional
     ReagendarActionSerializer,
@@ -40,134 +52,19 @@ from .serializers import (
 from core.models import Notificacion, LogSistema
 from core.notify import enviar_notificacion_real, enviar_notificacion_whatsapp
 
-
-# =================== Helpers de normalización / parsing ===================
-
-_HEADER_ALIASES = {
-    "rut_cliente": ["rut_cliente", "rut", "rut cliente"],
-    "id_vivienda": [
-        "id_vivienda_cliente", "id_vivienda", "pcs_cliente",
-        "customer_id", "customerid"
-    ],
-    "direccion": [
-        "direccion_cliente", "direccion", "direccion del cliente",
-        "dirección del cliente", "direccion_del_cliente",
-        "direccion_destinatario", "direccion_cliente_del_destinatario"
-    ],
-    "comuna": [
-        "comuna_cliente", "comuna", "comuna del cliente", "comuna_del_cliente"
-    ],
-    "zona": [
-        "zona_cliente", "customer_zone", "zona"
-    ],
-    "marca": ["marca", "brand"],
-    "tecnologia": ["tecnologia", "customer_network_type"],
-    "encuesta": ["encuesta", "encuesta de origen", "survey_type"],
-    "id_qualtrics": ["id_qualtrics", "id_de_respuesta", "record_id"],
-    "fecha": ["fecha", "fecha_programada", "fecha_registrada", "transactiondate"],
-    "bloque": ["bloque", "bloque_horario", "bloque horario reagendamiento"],
-    "asignado_email": ["asignado_email", "correo_tecnico", "tecnico_email", "email_tecnico"],
-}
-
-_DATE_FORMATS = (
-    "%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%Y/%m/%d",
-    "%Y-%m-%d %H:%M:%S", "%d-%m-%Y %H:%M:%S", "%d/%m/%Y %H:%M:%S", "%Y/%m/%d %H:%M:%S",
+# Carga masiva CSV/XLSX
+from .importacion import (
+    _s, rows_from_upload, hash_archivo, carga_previa, resumen_previo, checkpoint_para,
+    carga_en_curso, CargaEnCurso, ArchivoIlegible,
+    CargaMasiva, resumen_vacio, sumar_resultado, completar_resumen,
+    reporte_errores_csv, registrar_log_carga, ERRORES_COMPACTO,
 )
 
-def _norm(s: str) -> str:
-    if s is None: return ""
-    s = str(s).strip().lower()
-    for a, b in {"á":"a","é":"e","í":"i","ó":"o","ú":"u","ñ":"n"}.items():
-        s = s.replace(a, b)
-    s = re.sub(r"\s+", " ", s).replace(" ", "_")
-    return s
+# ?respuesta= de cargar_csv
+_RESPUESTAS_CARGA = {"completa", "compacta", "ndjson", "errores_csv"}
 
-def _s(val) -> str:
-    if val is None: return ""
-    try:
-        return str(val).strip()
-    except Exception:
-        return ""
-
-def _build_header_map(raw_headers: List[str]) -> Dict[str, str]:
-    norm_headers = { _norm(h): h for h in raw_headers }
-    mapping = {}
-    for canon, aliases in _HEADER_ALIASES.items():
-        for alias in aliases:
-            k = _norm(alias)
-            if k in norm_headers:
-                mapping[canon] = norm_headers[k]
-                break
-    return mapping
-
-def _parse_date(val):
-    if not val: return None
-    if hasattr(val, "year"):
-        try:
-            return val.date() if hasattr(val, "date") else val
-        except Exception:
-            pass
-    s = _s(val)
-    for fmt in _DATE_FORMATS:
-        try:
-            return datetime.strptime(s, fmt).date()
-        except Exception:
-            pass
-    try:
-        only_date = s.split()[0]
-        for fmt in ("%Y-%m-%d","%d-%m-%Y","%d/%m/%Y","%Y/%m/%d"):
-            try:
-                return datetime.strptime(only_date, fmt).date()
-            except Exception:
-                pass
-    except Exception:
-        pass
-    return None
-
-def _normalize_bloque(val: str) -> str | None:
-    v = _s(val).lower()
-    if not v: return None
-    if "10" in v and "13" in v: return "10-13"
-    if "14" in v and "18" in v: return "14-18"
-    if v in {"10-13", "14-18"}: return v
-    return None
-
-def _header_score(names_norm: List[str]) -> int:
-    score, have = 0, set(names_norm)
-    def any_alias(key): return any(_norm(a) in have for a in _HEADER_ALIASES[key])
-    for key in ("direccion", "comuna", "id_vivienda", "rut_cliente", "fecha"):
-        if any_alias(key): score += 1
-    return score
-
-def _rows_from_csv(f) -> List[Dict[str, Any]]:
-    data = f.read().decode("utf-8", errors="ignore")
-    reader = csv.DictReader(io.StringIO(data))
-    headers = list(reader.fieldnames or [])
-    header_map = _build_header_map(headers)
-    return [(header_map, r) for r in reader]
-
-def _rows_from_xlsx(f) -> List[Dict[str, Any]]:
-    wb = load_workbook(filename=io.BytesIO(f.read()), data_only=True)
-    ws = wb.worksheets[0]
-    all_rows = list(ws.iter_rows(values_only=True))
-    if not all_rows: return []
-    header_idx = 0
-    for i in range(min(10, len(all_rows))):
-        names = [ _s(x) for x in (all_rows[i] or []) ]
-        if _header_score([_norm(n) for n in names]) >= 2:
-            header_idx = i; break
-    headers = [ _s(x) for x in (all_rows[header_idx] or []) ]
-    header_map = _build_header_map(headers)
-    rows = []
-    for raw in all_rows[header_idx+1:]:
-        if not any(raw): continue
-        r = { headers[i]: (raw[i] if i < len(raw) else None) for i in range(len(headers)) }
-        rows.append((header_map, r))
-    return rows
-
-def _canon_get(row: Dict[str, Any], header_map: Dict[str, str], key: str) -> Any:
-    src = header_map.get(key)
-    return row.get(src) if src else None
+
+# =================== Helpers de estado cliente ===================
 
 def _norm_ec(s: str) -> str:
     s = (str(s) if s is not None else "").strip().lower()
@@ -192,71 +89,6 @@ def _parse_estado_cliente_from_request(data: Dict[str, Any]) -> str | None:
     }
     return synonyms.get(key)
 
-# ---------- Normalizadores de zona / comuna ----------
-def _norm_zona(v: str) -> str | None:
-    v = _s(v).upper()
-    if not v: return None
-    v = v.replace("ZONA METROPOLITANA", "").replace("ZONA", "").strip()
-    if v.startswith("NORTE"):   return "NORTE"
-    if v.startswith("SUR"):     return "SUR"
-    if v.startswith("ORIENTE") or v.startswith("CENTRO"):
-        return "ORIENTE"
-    return None
-
-_COMUNA_ALIASES = {
-    "MACU": "Macul",
-    "QNOR": "Quinta Normal",
-    "MAIP": "Maipú",
-    "PROV": "Providencia",
-    "LREI": "La Reina",
-    "PENA": "Peñalolén",
-    "LFLO": "La Florida",
-    "PALT": "Puente Alto",
-    "RECO": "Recoleta",
-    "CERR": "Cerrillos",
-    "SBER": "San Bernardo",
-    "NUNO": "Ñuñoa",
-    "LCON": "Las Condes",
-    "RENC": "Renca",
-    "ECEN": "Estación Central",
-    "LACI": "La Cisterna",
-    "INDE": "Independencia",
-    "PACE": "Pedro Aguirre Cerda",
-    "LGRA": "La Granja",
-    "CNAV": "Cerro Navia",
-    "LBAR": "Lo Barnechea",
-    "HUEC": "Huechuraba",
-    "PUDA": "Pudahuel",
-    "LAMP": "Lampa",
-    "SJOA": "San Joaquín",
-    "SJOS": "San José de Maipo",
-    "PHUR": "Padre Hurtado",
-    "IMAI": "Isla de Maipo",
-    "CTAN": "Calera de Tango",
-}
-
-_COMUNA_CANON = {
-    "NUNOA": "Ñuñoa",
-    "PENALOLEN": "Peñalolén",
-    "LAS CONDES": "Las Condes",
-    "ESTACION CENTRAL": "Estación Central",
-    "SAN MIGUEL": "San Miguel",
-}
-
-def _norm_comuna(v: str) -> str:
-    raw = _s(v)
-    if not raw:
-        return ""
-    u = raw.strip().upper()
-    if u in _COMUNA_ALIASES:
-        return _COMUNA_ALIASES[u]
-    if u in _COMUNA_CANON:
-        return _COMUNA_CANON[u]
-    try:
-        return raw.strip().title()
-    except Exception:
-        return raw.strip()
-
 
 # ========================= Núcleo de reagendamiento =========================
 
@@ -428,9 +260,13 @@ class DireccionAsignadaViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, AdminFull_TechReadOnlyPlusActions]
     tech_allowed_actions = {"asignarme", "desasignarme", "estado_cliente", "reagendar"}
 
+    filter_backends = [DjangoFilterBackend, BusquedaAsignacionesFilter, OrderingFilter]
     filterset_fields = ["estado", "comuna", "zona", "marca", "tecnologia", "encuesta", "asignado_a"]
+    # ?search= va por índice trigram (PostgreSQL) / FTS5 (SQLite) y se ordena por relevancia
     search_fields = ["direccion", "comuna", "rut_cliente", "id_vivienda"]
     ordering_fields = ["fecha", "created_at"]
+    # ?page= como siempre; ?cursor= (opt-in) pagina por keyset sin COUNT(*) ni OFFSET
+    pagination_class = CursorOptInPagination
 
     def get_queryset(self):
         u = self.request.user
@@ -441,22 +277,124 @@ class DireccionAsignadaViewSet(viewsets.ModelViewSet):
 
         order = self.request.query_params.get("order", "").lower()
         if order == "prioridad":
-            prioridad = Case(
-                When(reagendado_fecha__isnull=False, then=Value(1)),
-                When(asignado_a__isnull=False, then=Value(2)),
-                default=Value(3),
-                output_field=IntegerField(),
-            )
-            qs = qs.annotate(prioridad=prioridad).order_by("prioridad", "fecha", "id")
+            # columna guardada + índice (prioridad, fecha, id): sin CASE ni sort en memoria
+            qs = qs.order_by("prioridad", F("fecha").asc(nulls_last=True), "id")
         else:
-            qs = qs.order_by("fecha", "id")
+            # NULLS LAST explícito: igual en SQLite y PostgreSQL (y el cursor depende de ello)
+            qs = qs.order_by(F("fecha").asc(nulls_last=True), "id")
 
         fgte = self.request.query_params.get("fecha__gte")
         flte = self.request.query_params.get("fecha__lte")
         if fgte: qs = qs.filter(fecha__gte=fgte)
         if flte: qs = qs.filter(fecha__lte=flte)
+
+        if self.action == "list":
+            # solo las columnas que se serializan (?fields=/?omit=) más las del cursor;
+            # el serializer no usa el join con asignado_a (solo su id)
+            qs = DireccionAsignadaSerializer.proyectar(qs, self.request, extra=("fecha", "prioridad"))
         return qs
 
+    def get_cursor_keys(self):
+        """Claves del cursor (CursorOptInPagination) según el orden de get_queryset."""
+        if self.action != "list":
+            return None
+        if "cursor" in self.request.query_params and self.request.query_params.get("ordering"):
+            raise ValidationError({"cursor": "No se puede combinar ?cursor= con ?ordering=."})
+        keys = [("fecha", True), ("id", False)]
+        if self.request.query_params.get("order", "").lower() == "prioridad":
+            keys.insert(0, ("prioridad", False))
+        return keys
+
+    def list(self, request, *args, **kwargs):
+        qs = self.filter_queryset(self.get_queryset())
+        # ETag / Last-Modified por índice (sin recorrer qs); si el cliente ya tiene la versión, 304 sin serializar
+        version = VersionHTTP.de_tablas(
+            request, (DireccionAsignada.objects, "updated_at"), (BajaAsignacion.ultima(), "id", "created_at"),
+        )
+        if (no_modificado := version.no_modificado()) is not None:
+            return no_modificado
+
+        # Camino rápido: tuplas de .values_list() formateadas directo, mismo JSON
+        # que DireccionAsignadaSerializer (ver ListadoRapido); si no aplica, el de siempre.
+        rapido = ListadoRapido.para(self.get_serializer_class(), request)
+        if rapido is None:
+            page = self.paginate_queryset(qs)
+            if page is not None:
+                return version.marcar(self.get_paginated_response(self.get_serializer(page, many=True).data))
+            return version.marcar(Response(self.get_serializer(qs, many=True).data))
+        # las claves del cursor (fecha, prioridad, id) van en la fila aunque ?fields= no las pida
+        qs = rapido.consulta(qs, extra=("fecha", "prioridad", "id"))
+        page = self.paginate_queryset(qs)
+        if page is not None:
+            return version.marcar(self.get_paginated_response(rapido.filas(page)))
+        return version.marcar(Response(rapido.filas(qs)))
+
+    def retrieve(self, request, *args, **kwargs):
+        obj = self.get_object()
+        version = VersionHTTP.de_objeto(request, obj, "updated_at")
+        if (no_modificado := version.no_modificado()) is not None:
+            return no_modificado
+        return version.marcar(Response(self.get_serializer(obj).data))
+
+    # ---------- SINCRONIZACIÓN INCREMENTAL ----------
+    @action(detail=False, methods=["get"], url_path="changes")
+    def changes(self, request):
+        """
+        ?since=<cursor> (vacío/ausente = carga inicial): asignaciones creadas o
+        modificadas en el alcance del usuario desde el cursor, ids que salieron de
+        él (tombstones) y el cursor siguiente. Ver asignaciones/sincronizacion.py.
+        """
+        rapido = ListadoRapido.para(DireccionAsignadaSerializer, request)
+
+        def consulta(qs):
+            if rapido is not None:
+                return rapido.consulta(qs, extra=("updated_at", "id"))
+            return DireccionAsignadaSerializer.proyectar(qs, request, extra=("updated_at",))
+
+        filas, bajas, cursor, has_more = cambios_desde(request.user, request.query_params.get("since"), consulta)
+        if rapido is not None:
+            data = rapido.filas(filas)
+        else:
+            data = DireccionAsignadaSerializer(filas, many=True, context={"request": request}).data
+        return Response({"changes": data, "deleted": bajas, "cursor": cursor, "has_more": has_more})
+
+    # ---------- PAQUETE OFFLINE (técnico) ----------
+    @action(detail=False, methods=["get"], url_path="bundle")
+    def bundle(self, request):
+        """
+        Visitas de hoy, historial reciente y datos de referencia del técnico en un
+        solo JSON gzip, con ETag. El administrador indica ?tecnico_id=.
+        Ver asignaciones/paquete.py.
+        """
+        u = request.user
+        if getattr(u, "rol", None) == "tecnico":
+            tecnico_id = u.id
+        elif getattr(u, "rol", None) == "administrador":
+            tecnico_id = request.query_params.get("tecnico_id")
+            if not str(tecnico_id or "").isdigit():
+                raise ValidationError({"tecnico_id": "Requerido (id numérico del técnico)."})
+            tecnico_id = int(tecnico_id)
+        else:
+            return Response({"detail": "Solo técnicos o administrador."}, status=403)
+
+        con_gzip = paquete.acepta_gzip(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        version, estado = paquete.version(request, tecnico_id)
+        if con_gzip:
+            # otra representación, otra ETag fuerte (RFC 9110 §8.8.3)
+            version.variante("gzip")
+        if (no_modificado := version.no_modificado()) is not None:
+            patch_vary_headers(no_modificado, ("Accept-Encoding",))
+            return no_modificado
+
+        cuerpo = paquete.cuerpo(tecnico_id, estado)
+        if con_gzip:
+            resp = HttpResponse(cuerpo, content_type="application/json")
+            resp["Content-Encoding"] = "gzip"
+        else:
+            resp = HttpResponse(gzip.decompress(cuerpo), content_type="application/json")
+        patch_vary_headers(resp, ("Accept-Encoding",))
+        return version.marcar(resp)
+
     # ---------- ASIGNARME (técnico) ----------
     @extend_schema(request=AsignarmeActionSerializer, responses=DireccionAsignadaSerializer)
     @action(detail=True, methods=["get", "post"], url_path="asignarme", serializer_class=AsignarmeActionSerializer)
@@ -582,10 +520,18 @@ class DireccionAsignadaViewSet(viewsets.ModelViewSet):
         if desde: qs = qs.filter(asignacion__fecha__gte=desde)
         if hasta: qs = qs.filter(asignacion__fecha__lte=hasta)
 
-        qs = qs.order_by("-created_at", "-id")
+        # el historial muestra datos de la asignación: su updated_at también versiona
+        version = VersionHTTP.de_tablas(
+            request, (HistorialAsignacion.objects, "created_at"),
+            (DireccionAsignada.objects, "updated_at"), (BajaAsignacion.ultima(), "id", "created_at"),
+        )
+        if (no_modificado := version.no_modificado()) is not None:
+            return no_modificado
+
+        qs = HistorialAsignacionSerializer.proyectar(qs.order_by("-created_at", "-id"), request)
         page = self.paginate_queryset(qs)
-        s = HistorialAsignacionSerializer(page or qs, many=True)
-        return self.get_paginated_response(s.data) if page is not None else Response(s.data)
+        s = HistorialAsignacionSerializer(page or qs, many=True, context={"request": request})
+        return version.marcar(self.get_paginated_response(s.data) if page is not None else Response(s.data))
 
     @action(detail=False, methods=["post"], url_path="historial/export")
     def historial_export(self, request):
@@ -666,135 +612,180 @@ class DireccionAsignadaViewSet(viewsets.ModelViewSet):
         if not f:
             return Response({"detail": "Sube un archivo en el campo 'file'."}, status=400)
 
-        name = (_s(f.name)).lower()
+        # ?parallel=1|0 fuerza el modo de parseo (por defecto settings.IMPORT_PARALLEL)
+        parallel = request.query_params.get("parallel")
+        if parallel is not None:
+            parallel = _s(parallel).lower() in {"1", "true", "yes"}
+
+        # ?respuesta=completa (filas + resumen) | compacta (resumen + filas con error, acotadas)
+        #            | ndjson (streaming por lote) | errores_csv (reporte descargable)
+        respuesta = _s(request.query_params.get("respuesta")).lower() or "completa"
+        if respuesta not in _RESPUESTAS_CARGA:
+            return Response({"detail": f"respuesta debe ser una de: {', '.join(sorted(_RESPUESTAS_CARGA))}."},
+                            status=400)
+
+        # ?dry_run=1 -> vista previa: clasifica cada fila sin escribir nada (ni checkpoint ni log)
+        if _s(request.query_params.get("dry_run")).lower() in {"1", "true", "yes"}:
+            try:
+                rows = rows_from_upload(f, parallel=parallel)
+            except Exception as e:
+                return Response({"detail": f"No se pudo leer el archivo: {e}"}, status=400)
+            carga = CargaMasiva(request.user, parallel=parallel, dry_run=True,
+                                guardar_errores=respuesta == "errores_csv")
+            return self._respuesta_carga(request, respuesta, carga, rows, _s(f.name), dry_run=True)
+
+        # Archivo idéntico (mismo SHA-256) ya cargado -> se devuelve el resumen anterior
+        # sin reprocesar; ?force=1 lo vuelve a cargar. El hash se calcula antes de abrir
+        # el lector (ambos recorren f.chunks()).
+        archivo_hash = hash_archivo(f)
+        if carga_en_curso(archivo_hash):
+            return self._carga_en_curso()
+        if _s(request.query_params.get("force")).lower() not in {"1", "true", "yes"}:
+            previa = carga_previa(archivo_hash)
+            if previa is not None:
+                return Response({
+                    "ok": True,
+                    "duplicado": True,
+                    "detail": (f"Este archivo ya se cargó el {timezone.localtime(previa.updated_at):%d/%m/%Y %H:%M}; "
+                               f"usa ?force=1 para procesarlo de nuevo."),
+                    "rows": [],
+                    "summary": resumen_previo(previa),
+                })
+
+        # ?background=1 -> se guarda el archivo y lo procesa el worker (procesar_importaciones)
+        if _s(request.query_params.get("background")).lower() in {"1", "true", "yes"}:
+            job = ImportJob(nombre=_s(f.name), usuario=request.user)
+            job.archivo.save(_s(f.name) or "carga.csv", f, save=False)
+            job.save()
+            return Response({
+                "ok": True,
+                "job_id": job.id,
+                "estado": job.estado,
+                "status_url": f"/api/asignaciones/import_jobs/{job.id}/",
+            }, status=202)
+
+        # Cada lote se confirma con su checkpoint: si el mismo archivo se vuelve a subir
+        # tras un corte, se reanuda desde la última fila confirmada (?resume=0 reinicia)
+        reanudar = _s(request.query_params.get("resume", "1")).lower() not in {"0", "false", "no"}
         try:
-            rows = _rows_from_xlsx(f) if name.endswith(".xlsx") else _rows_from_csv(f)
+            rows = rows_from_upload(f, parallel=parallel)
         except Exception as e:
             return Response({"detail": f"No se pudo leer el archivo: {e}"}, status=400)
-
-        results = []
-        today = timezone.localdate()
-
-        for idx, (header_map, row) in enumerate(rows, start=2):
-            errors, created, updated = [], False, False
-
-            rut_cliente   = _s(_canon_get(row, header_map, "rut_cliente"))
-            id_vivienda   = _s(_canon_get(row, header_map, "id_vivienda"))
-            direccion     = _s(_canon_get(row, header_map, "direccion"))
-            comuna_raw    = _s(_canon_get(row, header_map, "comuna"))
-            comuna        = _norm_comuna(comuna_raw)
-            zona          = _norm_zona(_canon_get(row, header_map, "zona"))
-
-            marca      = (_s(_canon_get(row, header_map, "marca")) or "CLARO").upper()
-            tecnologia = (_s(_canon_get(row, header_map, "tecnologia")) or "HFC").upper()
-            encuesta   = (_s(_canon_get(row, header_map, "encuesta")) or "post_visita").lower()
-            id_qual    = _s(_canon_get(row, header_map, "id_qualtrics"))
-
-            fecha_val  = _parse_date(_canon_get(row, header_map, "fecha"))
-            bloque     = _normalize_bloque(_canon_get(row, header_map, "bloque"))
-            asignado_email = _s(_canon_get(row, header_map, "asignado_email"))
-
-            if fecha_val and fecha_val < today:
-                fecha_val = None
-
-            if not direccion or not comuna:
-                errors.append("Faltan campos obligatorios: direccion/comuna.")
-
-            asignado = None
-            if asignado_email:
-                asignado = Usuario.objects.filter(email__iexact=asignado_email, rol="tecnico").first()
-                if not asignado:
-                    errors.append("asignado_email no existe o no es técnico.")
-
-            if errors:
-                results.append({"rownum": idx, "created": False, "updated": False, "errors": errors})
-                continue
-
-            defaults = {
-                "rut_cliente": rut_cliente,
-                "direccion": direccion,
-                "comuna": comuna,
-                "marca": marca or "CLARO",
-                "tecnologia": tecnologia or "HFC",
-                "encuesta": encuesta or "post_visita",
-                "id_qualtrics": id_qual,
-            }
-            if fecha_val:
-                defaults["fecha"] = fecha_val
-            if zona:
-                defaults["zona"] = zona
-
-            if id_vivienda:
-                obj, was_created = DireccionAsignada.objects.get_or_create(
-                    id_vivienda=id_vivienda,
-                    defaults={**defaults, "estado": "PENDIENTE"},
-                )
-            else:
-                obj, was_created = DireccionAsignada.objects.get_or_create(
-                    direccion=direccion,
-                    comuna=comuna,
-                    defaults={**defaults, "estado": "PENDIENTE"},
-                )
-
-            for k, v in defaults.items():
-                setattr(obj, k, v)
-
-            # Si viene bloque en archivo, guárdalo como reagendado_bloque (mantiene contrato de UI)
-            if bloque:
-                obj.reagendado_bloque = bloque
-
-            if asignado:
-                obj.asignado_a = asignado
-                if not obj.fecha and fecha_val:
-                    obj.fecha = fecha_val
-                obj.estado = "ASIGNADA"
-            else:
-                obj.asignado_a = None
-                obj.estado = "PENDIENTE"
-
-            obj.save()
-
-            if was_created:
-                HistorialAsignacion.objects.create(
-                    asignacion=obj,
-                    accion=getattr(HistorialAsignacion.Accion, "CREADA", "CREADA"),
-                    detalles=f"Creada por carga XLS/CSV. {'Asignada a ' + asignado.email if asignado else 'Sin técnico'}",
-                    usuario=request.user,
-                )
-                created = True
-            else:
-                HistorialAsignacion.objects.create(
-                    asignacion=obj,
-                    accion=getattr(HistorialAsignacion.Accion, "EDITADA", "EDITADA"),
-                    detalles="Actualizada por carga XLS/CSV.",
-                    usuario=request.user,
-                )
-                updated = True
-
-            results.append({"rownum": idx, "created": created, "updated": updated})
-
+        # El checkpoint se toma en exclusiva (después de abrir el archivo: un 400 no lo deja tomado)
         try:
-            LogSistema.objects.create(
-                usuario=request.user if getattr(request.user, "is_authenticated", False) else None,
-                accion=getattr(LogSistema.Accion, "ASSIGN_BULK_LOAD", "ASSIGN_BULK_LOAD"),
-                detalle=f"Carga {('XLSX' if name.endswith('.xlsx') else 'CSV')} '{_s(getattr(f, 'name', 'desconocido'))}': "
-                        f"creados={sum(1 for r in results if r['created'])}, "
-                        f"actualizados={sum(1 for r in results if r['updated'])}, "
-                        f"errores={sum(1 for r in results if r.get('errors'))}",
-            )
-        except Exception:
-            pass
-
+            checkpoint = checkpoint_para(archivo_hash, request.user, _s(f.name), reanudar=reanudar)
+        except CargaEnCurso:
+            return self._carga_en_curso()
+
+        carga = CargaMasiva(request.user, parallel=parallel, checkpoint=checkpoint,
+                            guardar_errores=respuesta == "errores_csv")
+        return self._respuesta_carga(request, respuesta, carga, rows, _s(f.name))
+
+    @staticmethod
+    def _carga_en_curso():
+        return Response({"detail": "Este archivo ya se está cargando; espera a que termine e intenta de nuevo."},
+                        status=409)
+
+    def _respuesta_carga(self, request, respuesta, carga, rows, nombre, dry_run=False):
+        extra = {"dry_run": True} if dry_run else {}
+
+        def _cerrar(summary):
+            summary = completar_resumen(summary, carga)
+            if not dry_run:
+                registrar_log_carga(request.user, nombre, summary)
+            return summary
+
+        if respuesta == "ndjson":
+            return StreamingHttpResponse(self._ndjson_carga(carga, rows, _cerrar, extra),
+                                         content_type="application/x-ndjson")
+
+        summary = resumen_vacio()
+        results, errores = [], []
+        max_errores = self._max_errores(request)
+        try:
+            for r in carga.procesar(rows):
+                sumar_resultado(summary, r)
+                if respuesta == "completa":
+                    results.append(r)
+                elif respuesta == "compacta" and r.get("errors") and len(errores) < max_errores:
+                    errores.append(r)
+        except ArchivoIlegible as e:
+            # los lotes anteriores a la fila dañada ya quedaron confirmados (checkpoint)
+            return Response({"detail": f"No se pudo leer el archivo ({e})", "rownum": e.rownum,
+                             "fuente": e.fuente, "summary": summary}, status=400)
+        summary = _cerrar(summary)
+
+        if respuesta == "errores_csv":
+            resp = HttpResponse(reporte_errores_csv(carga.filas_error, carga.fuente_de if carga.fuentes else None).encode("utf-8-sig"),
+                                content_type="text/csv; charset=utf-8")
+            base = nombre.rsplit(".", 1)[0] or "carga"
+            resp["Content-Disposition"] = f'attachment; filename="errores_{base}.csv"'
+            resp["X-Import-Summary"] = json.dumps(summary)
+            return resp
+        if respuesta == "compacta":
+            return Response({
+                "ok": True, **extra,
+                "summary": summary,
+                "errors": errores,
+                "errors_truncated": summary["errors"] > len(errores),
+            })
         return Response({
-            "ok": True,
+            "ok": True, **extra,
             "rows": results,
-            "summary": {
-                "created": sum(1 for r in results if r["created"]),
-                "updated": sum(1 for r in results if r["updated"]),
-                "errors":  sum(1 for r in results if r.get("errors")),
-            }
+            "summary": summary,
         })
 
+    def _max_errores(self, request) -> int:
+        try:
+            return max(0, int(request.query_params.get("max_errores", ERRORES_COMPACTO)))
+        except (TypeError, ValueError):
+            return ERRORES_COMPACTO
+
+    def _ndjson_carga(self, carga, rows, cerrar, extra):
+        """Una línea JSON por fila, enviadas al terminar cada lote; la última trae el resumen."""
+        summary = resumen_vacio()
+        lote = []
+        try:
+            for r in carga.procesar(rows):
+                sumar_resultado(summary, r)
+                lote.append(json.dumps(r, ensure_ascii=False))
+                if len(lote) >= carga.chunk_size:
+                    yield "\n".join(lote) + "\n"
+                    lote = []
+        except ArchivoIlegible as e:
+            lote.append(json.dumps({"ok": False, "detail": f"No se pudo leer el archivo ({e})", "rownum": e.rownum,
+                                    "fuente": e.fuente, "summary": summary}, ensure_ascii=False))
+            yield "\n".join(lote) + "\n"
+            return
+        lote.append(json.dumps({"ok": True, **extra, "summary": cerrar(summary)}, ensure_ascii=False))
+        yield "\n".join(lote) + "\n"
+
+    # ---------- TRABAJOS DE IMPORTACIÓN (background) ----------
+    @extend_schema(responses=ImportJobSerializer)
+    @action(detail=False, methods=["get"], url_path=r"import_jobs/(?P<job_id>[0-9]+)")
+    def import_job(self, request, job_id=None):
+        if getattr(request.user, "rol", None) != "administrador":
+            return Response({"detail": "Solo administrador puede consultar cargas."}, status=403)
+        job = ImportJob.objects.filter(pk=job_id).first()
+        if not job:
+            return Response({"detail": "No encontrado."}, status=404)
+        return Response(ImportJobSerializer(job, context={"request": request}).data)
+
+    @action(detail=False, methods=["get"], url_path=r"import_jobs/(?P<job_id>[0-9]+)/resultados")
+    def import_job_resultados(self, request, job_id=None):
+        if getattr(request.user, "rol", None) != "administrador":
+            return Response({"detail": "Solo administrador puede consultar cargas."}, status=403)
+        job = ImportJob.objects.filter(pk=job_id).first()
+        if not job:
+            return Response({"detail": "No encontrado."}, status=404)
+        if job.estado != ImportJob.Estado.DONE:
+            return Response({"detail": "La carga aún no termina.", "estado": job.estado}, status=409)
+        if not job.resultados:
+            return Response({"detail": "Los resultados de esta carga ya expiraron."}, status=410)
+        resp = FileResponse(job.resultados.open("rb"), content_type="application/json")
+        resp["Content-Disposition"] = f'attachment; filename="import_{job.id}_resultados.json"'
+        return resp
+
     # ---------- DESASIGNAR (ADMIN) ----------
     @action(detail=True, methods=["patch"], url_path="desasignar")
     def desasignar(self, request, pk=None):
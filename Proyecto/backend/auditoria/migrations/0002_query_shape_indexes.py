@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asignaciones', '0013_query_shape_indexes'),
+        ('auditoria', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditoriavisita',
+            index=models.Index(fields=['created_at', 'id'], name='auditoria_a_created_285996_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditoriavisita',
+            index=models.Index(fields=['tecnico', 'created_at', 'id'], name='auditoria_a_tecnico_8fe2cc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditoriavisita',
+            index=models.Index(fields=['asignacion', 'created_at', 'id'], name='auditoria_a_asignac_40f299_idx'),
+        ),
+    ]
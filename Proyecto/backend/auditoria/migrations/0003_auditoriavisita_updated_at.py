@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:10
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def desde_created_at(apps, schema_editor):
+    AuditoriaVisita = apps.get_model("auditoria", "AuditoriaVisita")
+    AuditoriaVisita.objects.update(updated_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0002_query_shape_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditoriavisita',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(desde_created_at, migrations.RunPython.noop),
+    ]
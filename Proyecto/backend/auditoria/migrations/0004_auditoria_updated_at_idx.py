@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0003_auditoriavisita_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditoriavisita',
+            index=models.Index(fields=['updated_at', 'id'], name='auditoria_a_updated_1e03a3_idx'),
+        ),
+    ]
@@ -213,11 +213,22 @@ class AuditoriaVisita(models.Model):
     descripcion_problema = models.TextField(blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    # versión del listado para ETag / Last-Modified (core/condicional.py); no se expone
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at", "-id"]
         verbose_name = "Auditoría de visita"
         verbose_name_plural = "Auditorías de visitas"
+        indexes = [
+            # listado: orden -created_at, -id (+ created_at__gte/lte)
+            models.Index(fields=["created_at", "id"]),
+            # ?tecnico= / alcance del técnico, y ?asignacion= (mismo orden)
+            models.Index(fields=["tecnico", "created_at", "id"]),
+            models.Index(fields=["asignacion", "created_at", "id"]),
+            # versión del listado (ETag: MAX(updated_at), core/condicional.py) desde el extremo del índice
+            models.Index(fields=["updated_at", "id"]),
+        ]
 
     def __str__(self):
         a = getattr(self, "asignacion", None)
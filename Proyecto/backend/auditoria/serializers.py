@@ -1,6 +1,7 @@
 # auditoria/serializers.py
 from django.utils import timezone
 from rest_framework import serializers
+from core.serializers import CamposParcialesMixin
 from .models import AuditoriaVisita
 
 
@@ -25,7 +26,11 @@ def _display_name(user) -> str:
     return f"Tec#{uid}" if uid else ""
 
 
-class AuditoriaVisitaSerializer(serializers.ModelSerializer):
+_NOMBRE_USUARIO = ("id", "first_name", "last_name", "email")
+
+
+class AuditoriaVisitaSerializer(CamposParcialesMixin, serializers.ModelSerializer):
+    """Admite ?fields= / ?omit= (ver CamposParcialesMixin)."""
     # ---- Derivados de la asignación (solo lectura, no rompen el contrato) ----
     marca = serializers.CharField(source="asignacion.marca", read_only=True)
     tecnologia = serializers.CharField(source="asignacion.tecnologia", read_only=True)
@@ -39,6 +44,13 @@ class AuditoriaVisitaSerializer(serializers.ModelSerializer):
     tecnico_nombre = serializers.SerializerMethodField(read_only=True)
     asignacion_tecnico_nombre = serializers.SerializerMethodField(read_only=True)
 
+    # columnas que leen los getters de abajo (para proyectar la consulta)
+    fuentes_metodo = {
+        "tecnico_nombre": [f"tecnico.{c}" for c in _NOMBRE_USUARIO]
+                          + [f"asignacion.asignado_a.{c}" for c in _NOMBRE_USUARIO],
+        "asignacion_tecnico_nombre": [f"asignacion.asignado_a.{c}" for c in _NOMBRE_USUARIO],
+    }
+
     class Meta:
         model = AuditoriaVisita
         fields = [
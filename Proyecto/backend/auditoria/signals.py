@@ -3,7 +3,8 @@ from __future__ import annotations
 
 from django.conf import settings
 from django.db import transaction
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
 from django.dispatch import receiver
 
 from .models import AuditoriaVisita, EstadoCliente
@@ -114,11 +115,11 @@ def auditoria_side_effects(sender, instance: AuditoriaVisita, created, **kwargs)
                 asign.reagendado_fecha = instance.reschedule_date
                 asign.reagendado_bloque = instance.reschedule_slot
                 asign.estado = "REAGENDADA"
-                asign.save(update_fields=["reagendado_fecha", "reagendado_bloque", "estado"])
+                asign.save(update_fields=["reagendado_fecha", "reagendado_bloque", "estado", "updated_at"])
             else:
                 asign.reagendado_fecha = instance.reschedule_date
                 asign.reagendado_bloque = instance.reschedule_slot
-                asign.save(update_fields=["reagendado_fecha", "reagendado_bloque"])
+                asign.save(update_fields=["reagendado_fecha", "reagendado_bloque", "updated_at"])
 
             HistorialAsignacion.objects.create(
                 asignacion=asign,
@@ -148,3 +149,15 @@ def auditoria_side_effects(sender, instance: AuditoriaVisita, created, **kwargs)
             detalles=f"Auditoría: estado_cliente={instance.customer_status}.",
             usuario=user,
         )
+
+
+@receiver(post_delete, sender=AuditoriaVisita)
+def auditoria_borrada(sender, instance: AuditoriaVisita, origin=None, **kwargs):
+    """
+    Borrar una auditoría (API / admin) toca updated_at de su asignación: la versión
+    del listado de auditorías (core/condicional.py) ve así la baja sin un COUNT(*).
+    Si se borra la asignación, la cascada ya deja su BajaAsignacion.
+    """
+    if getattr(origin, "model", type(origin)) is DireccionAsignada:
+        return
+    DireccionAsignada.objects.filter(pk=instance.asignacion_id).update(updated_at=timezone.now())
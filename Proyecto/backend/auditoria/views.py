@@ -8,6 +8,9 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.parsers import MultiPartParser, FormParser
 
+from asignaciones.models import BajaAsignacion, DireccionAsignada
+from core.condicional import VersionHTTP
+from core.pagination import ConteoEstimadoPagination
 from .models import AuditoriaVisita
 from .serializers import AuditoriaVisitaSerializer
 
@@ -59,6 +62,8 @@ class AuditoriaVisitaViewSet(viewsets.ModelViewSet):
     serializer_class = AuditoriaVisitaSerializer
     permission_classes = [IsAuthenticated, IsAdminOrTechOwner]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    # total exacto hasta el umbral; sobre él, estimado (ver core/pagination.py)
+    pagination_class = ConteoEstimadoPagination
 
     # Incluimos claves estándar y compatibilidad con *_id
     filterset_fields = {
@@ -98,8 +103,25 @@ class AuditoriaVisitaViewSet(viewsets.ModelViewSet):
         if tecnico_id:
             qs = qs.filter(tecnico_id=tecnico_id)
 
+        if self.action == "list":
+            # columnas y joins según ?fields=/?omit= (sin ellos, los de siempre)
+            qs = AuditoriaVisitaSerializer.proyectar(qs, self.request)
         return qs
 
+    def list(self, request, *args, **kwargs):
+        qs = self.filter_queryset(self.get_queryset())
+        # ETag / Last-Modified; los derivados vienen de la asignación (y sus bajas se llevan las auditorías)
+        version = VersionHTTP.de_tablas(
+            request, (AuditoriaVisita.objects, "updated_at"),
+            (DireccionAsignada.objects, "updated_at"), (BajaAsignacion.ultima(), "id", "created_at"),
+        )
+        if (no_modificado := version.no_modificado()) is not None:
+            return no_modificado
+        page = self.paginate_queryset(qs)
+        if page is not None:
+            return version.marcar(self.get_paginated_response(self.get_serializer(page, many=True).data))
+        return version.marcar(Response(self.get_serializer(qs, many=True).data))
+
     # Endpoint ADITIVO (no rompe APIs): lista de técnicos con nombre/email para combos
     @action(detail=False, methods=["get"], url_path="tecnicos")
     def tecnicos(self, request):
@@ -139,6 +139,21 @@ def db_from_url(url: str):
 
 DATABASES = {"default": db_from_url(env("DATABASE_URL"))}
 
+# ——— Caché ———
+# "default" sigue siendo la LocMem de Django (por proceso: throttling de DRF).
+# "compartida" la ven todos los procesos (workers de gunicorn, web y worker): ahí va el paquete
+# offline (asignaciones/paquete.py, BUNDLE_CACHE), que así se arma una vez por técnico y no una vez
+# por worker. Vive en la misma base: `python manage.py createcachetable` (idempotente) crea la
+# tabla; lo corren el Procfile y entrypoint.sh después de migrate.
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "compartida": {
+        "BACKEND": env("CACHE_COMPARTIDA_BACKEND", "django.core.cache.backends.db.DatabaseCache"),
+        "LOCATION": env("CACHE_COMPARTIDA_LOCATION", "django_cache"),
+    },
+}
+BUNDLE_CACHE = "compartida"
+
 # ——— Passwords ———
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
@@ -197,6 +212,8 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 50,
 }
+# Listados con ConteoEstimadoPagination: total exacto hasta este número de filas; sobre él, estimado
+PAGINATION_EXACT_COUNT_THRESHOLD = int(env("PAGINATION_EXACT_COUNT_THRESHOLD", "10000"))
 
 # —— JWT (SimpleJWT) —— 
 SIMPLE_JWT = {
@@ -274,6 +291,25 @@ WHATSAPP_TOKEN     = env("WHATSAPP_TOKEN", "")
 WHATSAPP_PHONE_ID  = env("WHATSAPP_PHONE_ID", "")
 WHATSAPP_TEST_TO   = env("WHATSAPP_TEST_TO", "")
 
+# ——— Carga masiva CSV/XLSX ———
+# IMPORT_CHUNK_SIZE: filas por lote; cada lote se confirma en su propia transacción (checkpoint)
+IMPORT_CHUNK_SIZE = int(env("IMPORT_CHUNK_SIZE", "2000"))
+# IMPORT_PARALLEL: normaliza los lotes en un pool de procesos (IMPORT_WORKERS, por defecto nº de CPUs)
+IMPORT_PARALLEL = env_bool("IMPORT_PARALLEL", False)
+IMPORT_WORKERS  = int(env("IMPORT_WORKERS", "0")) or None
+# IMPORT_PG_COPY: en PostgreSQL escribe cada lote con COPY + INSERT ... ON CONFLICT.
+# Apagado por defecto hasta validarlo en producción (CopiaPostgresTests compara ambos caminos)
+IMPORT_PG_COPY  = env_bool("IMPORT_PG_COPY", False)
+# IMPORT_STORAGE_ROOT: archivos de cargas en background (subidos + resultados por fila). Fuera de
+# MEDIA_ROOT a propósito: /media/ se sirve sin autenticación y estos archivos traen datos de clientes;
+# los resultados solo se entregan por /api/asignaciones/import_jobs/<id>/resultados/.
+# El proceso web y el worker (Procfile) deben ver el MISMO directorio: en despliegues con
+# contenedores separados tiene que ser un volumen compartido.
+IMPORT_STORAGE_ROOT = Path(env("IMPORT_STORAGE_ROOT", str(BASE_DIR / "private" / "imports")))
+# IMPORT_RESULTADOS_DIAS: días que se guardan los resultados de un job terminado (el archivo subido
+# se borra apenas termina); el worker purga los vencidos
+IMPORT_RESULTADOS_DIAS = int(env("IMPORT_RESULTADOS_DIAS", "7"))
+
 BOOTSTRAP_ADMIN_EMAIL = os.getenv("BOOTSTRAP_ADMIN_EMAIL")
 BOOTSTRAP_ADMIN_PASSWORD = os.getenv("BOOTSTRAP_ADMIN_PASSWORD")
 BOOTSTRAP_ADMIN_FIRST_NAME = os.getenv("BOOTSTRAP_ADMIN_FIRST_NAME", "Admin")
@@ -0,0 +1,108 @@
+# core/condicional.py
+"""
+GET condicional (ETag / Last-Modified) para listados y detalles.
+
+La versión de un listado no recorre el listado: es el MAX() de las columnas
+que cambian con sus filas sobre las tablas enteras (updated_at, created_at),
+más el último tombstone para las bajas (BajaAsignacion, leído por pk). Con un
+índice que empiece por esa columna cada MAX() es la lectura de un extremo del
+índice, así que cuesta lo mismo con mil filas que con millones, y no hay
+COUNT(*): la paginación cuenta (o estima) por su cuenta, solo donde lo necesita.
+
+Cualquier cambio en la tabla mueve la versión de todos sus listados (de más,
+pero nunca de menos: también cuando una fila sale de un filtro). La ETag
+combina eso con la ruta, la query string (filtros, página, ?fields=...), el
+usuario (el alcance depende del rol) y el formato de salida. Si el cliente ya
+tiene esa versión (If-None-Match o, sin él, If-Modified-Since) se responde 304
+sin paginar ni serializar.
+
+Last-Modified es la mayor de las fechas, incluida la del último tombstone: un
+borrado también invalida If-Modified-Since (borrar una auditoría toca el
+updated_at de su asignación, ver auditoria/signals.py). Tiene resolución de un
+segundo, así que los clientes deben preferir If-None-Match.
+"""
+import hashlib
+from datetime import datetime
+
+from django.db.models import Max
+from django.http import HttpResponseNotModified
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+class VersionHTTP:
+    """
+    Versión de una respuesta GET:
+        version = VersionHTTP.de_tablas(
+            request, (DireccionAsignada.objects, "updated_at"), (BajaAsignacion.ultima(), "id", "created_at"),
+        )
+        if (r := version.no_modificado()) is not None:
+            return r
+        return version.marcar(Response(...))
+    """
+
+    def __init__(self, request, marcas, fechas):
+        fechas = [f for f in fechas if f is not None]
+        self.request = request
+        self.ultima = max(fechas) if fechas else None
+
+        user = getattr(request, "user", None)
+        h = hashlib.sha1()
+        for parte in (
+            request.path,
+            sorted(request.query_params.lists()),
+            getattr(user, "pk", None), getattr(user, "rol", None),
+            getattr(request, "accepted_media_type", ""),
+            marcas, [f.isoformat() for f in fechas],
+        ):
+            h.update(repr(parte).encode())
+            h.update(b"\0")
+        self.etag = f'"{h.hexdigest()}"'
+
+    @classmethod
+    def de_tablas(cls, request, *fuentes):
+        """
+        Una consulta por (queryset, campo, ...): MAX() de cada campo, sin filtros de la request.
+        Un queryset ya recortado ([:1]) se respeta con su orden: MAX() sobre esa fila.
+        Las fechas van a Last-Modified; lo demás (p. ej. el id del último tombstone) solo a la ETag.
+        """
+        valores = []
+        for qs, *campos in fuentes:
+            qs = qs.all()
+            if not qs.query.is_sliced:
+                qs = qs.order_by()
+            fila = qs.aggregate(**{f"_max{i}": Max(c) for i, c in enumerate(campos)})
+            valores += [fila[f"_max{i}"] for i in range(len(campos))]
+        return cls(
+            request,
+            [v for v in valores if not isinstance(v, datetime)],
+            [v for v in valores if isinstance(v, datetime)],
+        )
+
+    @classmethod
+    def de_objeto(cls, request, obj, *campos):
+        # el pk ya va en la ruta
+        return cls(request, [], [getattr(obj, c, None) for c in campos])
+
+    def variante(self, sufijo):
+        """ETag propia de otra representación del mismo contenido (p. ej. "-gzip" con Content-Encoding)."""
+        self.etag = f'{self.etag[:-1]}-{sufijo}"'
+        return self
+
+    def no_modificado(self):
+        """304 si el cliente ya tiene esta versión; None si hay que responder."""
+        if self.request.method not in ("GET", "HEAD"):
+            return None
+        ultima = int(self.ultima.timestamp()) if self.ultima else None
+        r = get_conditional_response(self.request, etag=self.etag, last_modified=ultima)
+        if isinstance(r, HttpResponseNotModified):
+            return self.marcar(HttpResponseNotModified())
+        return None
+
+    def marcar(self, response):
+        response["ETag"] = self.etag
+        if self.ultima:
+            response["Last-Modified"] = http_date(self.ultima.timestamp())
+        # respuestas por usuario: solo caché del navegador, revalidando siempre
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -0,0 +1,244 @@
+# core/pagination.py
+import base64
+import json
+from collections import OrderedDict
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+# Hasta cuántas filas el total de un listado es exacto (ver ConteoEstimadoPagination)
+PAGINATION_EXACT_COUNT_THRESHOLD = 10000
+
+
+class _PaginaEstimada(Page):
+    def __init__(self, object_list, number, paginator, hay_mas):
+        super().__init__(object_list, number, paginator)
+        self.hay_mas = hay_mas
+
+    def has_next(self):
+        return self.hay_mas
+
+
+class _PaginadorEstimado(Paginator):
+    """
+    Paginator cuyo total se calcula con un COUNT acotado (LIMIT umbral+1) y, si
+    lo supera, con la estimación del planner de PostgreSQL. Con total aproximado
+    las páginas no se validan contra num_pages: se lee una fila de más para
+    saber si hay siguiente.
+    """
+
+    def __init__(self, object_list, per_page, umbral, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.umbral = umbral
+        self.aproximado = False
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if not hasattr(qs, "query"):
+            return super().count
+        acotado = qs.order_by()[:self.umbral + 1].count()
+        if acotado <= self.umbral or connections[qs.db].vendor != "postgresql":
+            # fuera de PostgreSQL no hay estimación: exacto (bases chicas de desarrollo)
+            return acotado if acotado <= self.umbral else super().count
+        self.aproximado = True
+        return max(self._estimacion(qs.order_by()), acotado)
+
+    @staticmethod
+    def _estimacion(qs) -> int:
+        """Filas que el planner de PostgreSQL espera para `qs` (sin ejecutarla)."""
+        sql, params = qs.query.sql_with_params()
+        with connections[qs.db].cursor() as cur:
+            cur.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cur.fetchone()[0]
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def validate_number(self, number):
+        if not self.aproximado:
+            return super().validate_number(number)
+        # sin tope: el total es solo una estimación
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages["invalid_page"])
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+        return number
+
+    def page(self, number):
+        self.count  # decide si el total es aproximado antes de validar
+        if not self.aproximado:
+            return super().page(number)
+        number = self.validate_number(number)
+        desde = (number - 1) * self.per_page
+        filas = list(self.object_list[desde:desde + self.per_page + 1])
+        hay_mas = len(filas) > self.per_page
+        filas = filas[:self.per_page]
+        if not filas and number > 1:
+            raise EmptyPage(self.error_messages["no_results"])
+        if filas and not hay_mas:
+            # última página: ahí el total se conoce
+            self.aproximado = False
+            self.__dict__["count"] = desde + len(filas)
+        else:
+            # la estimación nunca contradice lo que ya se leyó
+            self.__dict__["count"] = max(self.count, desde + len(filas) + hay_mas)
+        self.__dict__.pop("num_pages", None)
+        return _PaginaEstimada(filas, number, self, hay_mas)
+
+
+class ConteoEstimadoPagination(PageNumberPagination):
+    """
+    PageNumberPagination sin el COUNT(*) exacto de listados grandes.
+
+    El total es exacto hasta `exact_count_threshold` filas (por defecto
+    settings.PAGINATION_EXACT_COUNT_THRESHOLD): se cuenta sobre LIMIT umbral+1,
+    así que nunca se recorren más filas que esas. Por sobre el umbral, en
+    PostgreSQL se usa la estimación del planner (EXPLAIN) y la respuesta trae
+    "count_approximate": true; next/previous siguen siendo exactos.
+    """
+    exact_count_threshold = None
+
+    def get_exact_count_threshold(self):
+        if self.exact_count_threshold is not None:
+            return self.exact_count_threshold
+        return int(getattr(settings, "PAGINATION_EXACT_COUNT_THRESHOLD", 0) or PAGINATION_EXACT_COUNT_THRESHOLD)
+
+    def django_paginator_class(self, object_list, per_page, **kwargs):
+        return _PaginadorEstimado(object_list, per_page, self.get_exact_count_threshold(), **kwargs)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("count", self.page.paginator.count),
+            ("count_approximate", self.page.paginator.aproximado),
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema["properties"]["count_approximate"] = {
+            "type": "boolean",
+            "description": "true si count es la estimación del planner (listados sobre el umbral de conteo exacto).",
+        }
+        schema["required"] = list(schema.get("required", [])) + ["count_approximate"]
+        return schema
+
+
+class CursorOptInPagination(ConteoEstimadoPagination):
+    """
+    PageNumberPagination de siempre, más paginación por cursor (keyset) opt-in con ?cursor=.
+
+    Con ?cursor= (vacío = primera página) la página se obtiene con
+    WHERE (k1, k2, ..., id) > (último visto) ORDER BY k1, k2, ..., id LIMIT n+1:
+    sin COUNT(*) ni OFFSET, así que cada página cuesta lo mismo que la primera.
+
+    La vista declara las claves con get_cursor_keys() -> [(campo, nullable), ...]
+    (la última debe ser única, normalmente "id"); si devuelve None se usa la
+    paginación por número de página. Las claves nullable se ordenan con NULL al final.
+    """
+    cursor_query_param = "cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        keys = view.get_cursor_keys() if view is not None and hasattr(view, "get_cursor_keys") else None
+        self.keys = keys
+        if keys is None or self.cursor_query_param not in request.query_params:
+            self.keys = None
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        size = self.get_page_size(request)
+        raw = request.query_params.get(self.cursor_query_param) or ""
+        if raw:
+            # tramos en orden; el siguiente solo se consulta si el anterior no llenó la página
+            rows = []
+            for tramo in self._tramos(keys, self._decode(raw, keys)):
+                rows += queryset.filter(tramo)[:size + 1 - len(rows)]
+                if len(rows) > size:
+                    break
+        else:
+            rows = list(queryset[:size + 1])
+        self.has_next = len(rows) > size
+        rows = rows[:size]
+        self.next_values = [getattr(rows[-1], k) for k, _ in keys] if rows else None
+        return rows
+
+    def get_paginated_response(self, data):
+        if self.keys is None:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", None),
+            ("results", data),
+        ]))
+
+    def get_next_link(self):
+        if self.keys is None:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self._encode(self.next_values))
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema["properties"]["count"]["description"] = "Solo en paginación por número de página (sin ?cursor=)."
+        return schema
+
+    # ---------- cursor ----------
+    @staticmethod
+    def _encode(values) -> str:
+        payload = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+        return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+    @staticmethod
+    def _decode(raw: str, keys):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(raw + "=" * (-len(raw) % 4)))
+            if not isinstance(values, list) or len(values) != len(keys):
+                raise ValueError
+        except (ValueError, TypeError):
+            raise ValidationError({"cursor": "Cursor inválido."})
+        return values
+
+    def _tramos(self, keys, values) -> list:
+        """
+        Filas posteriores a `values` como tramos consecutivos del orden, cada uno con una
+        cota sobre la primera clave que sirve de rango en el índice (k1, ..., id):
+        - k1 >= v AND (k1 > v OR (k1 = v AND resto > ...)): los no NULL;
+        - k1 IS NULL: la cola de NULL (clave nullable), en un tramo aparte porque
+          "k1 >= v OR k1 IS NULL" ya no es un rango.
+        """
+        (field, nullable), v = keys[0], values[0]
+        if v is None or len(keys) == 1:
+            return [self._after(keys, values)]
+        tramos = [Q(**{f"{field}__gte": v}) & (Q(**{f"{field}__gt": v}) | (Q(**{field: v}) & self._after(keys[1:], values[1:])))]
+        if nullable:
+            tramos.append(Q(**{f"{field}__isnull": True}))
+        return tramos
+
+    def _after(self, keys, values) -> Q:
+        """Filas estrictamente posteriores a `values` en el orden de `keys` (NULL al final)."""
+        (field, nullable), v = keys[0], values[0]
+        if len(keys) == 1:
+            return Q(**{f"{field}__gt": v})
+        rest = self._after(keys[1:], values[1:])
+        if v is None:
+            return Q(**{f"{field}__isnull": True}) & rest
+        # cota >= al frente (como sincronizacion._despues): rango en el índice, no un OR suelto
+        q = Q(**{f"{field}__gte": v}) & (Q(**{f"{field}__gt": v}) | (Q(**{field: v}) & rest))
+        if nullable:
+            q |= Q(**{f"{field}__isnull": True})
+        return q
@@ -1,7 +1,196 @@
 # core/serializers.py
-from rest_framework import serializers
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
 from .models import Configuracion, LogSistema, Notificacion
 
+
+# ---------- ?fields= / ?omit= ----------
+def _lista_param(request, nombre):
+    raw = request.query_params.get(nombre)
+    return [c.strip() for c in raw.split(",") if c.strip()] if raw else None
+
+
+class CamposParcialesMixin:
+    """
+    Sparse fieldsets en las lecturas (GET/HEAD): ?fields=id,fecha,estado devuelve
+    solo esos campos (en el orden del serializer) y ?omit=detalles los quita.
+    Un campo desconocido responde 400.
+
+    proyectar(qs, request) acota además la consulta a lo que se va a serializar:
+    .only() de las columnas leídas y select_related() solo de las relaciones
+    recorridas. Los SerializerMethodField (source "*") declaran lo que leen en
+    `fuentes_metodo` ({campo: ["relacion.columna", ...]}); si falta alguno, la
+    consulta queda como venía.
+    """
+    fuentes_metodo = {}
+
+    @classmethod
+    def campos_pedidos(cls, request, disponibles):
+        """Nombres a serializar según ?fields=/?omit=, o None si no se pidió nada."""
+        if request is None or request.method not in ("GET", "HEAD"):
+            return None
+        fields, omit = _lista_param(request, "fields"), _lista_param(request, "omit")
+        if fields is None and omit is None:
+            return None
+        desconocidos = [c for c in (fields or []) + (omit or []) if c not in disponibles]
+        if desconocidos:
+            raise ValidationError({"fields": f"Campos desconocidos: {', '.join(desconocidos)}."})
+        return [c for c in disponibles if (fields is None or c in fields) and c not in (omit or ())]
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # solo el serializer de la respuesta (o el hijo de su ListSerializer), no los anidados
+        parent = self.parent
+        if parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None):
+            elegidos = self.campos_pedidos(self.context.get("request"), fields)
+            if elegidos is not None:
+                fields = {c: fields[c] for c in elegidos}
+        return fields
+
+    @classmethod
+    def _fuentes(cls):
+        # {campo: source}, cacheado por clase
+        if "_fuentes_cache" not in cls.__dict__:
+            cls._fuentes_cache = {n: f.source for n, f in cls().fields.items()}
+        return cls._fuentes_cache
+
+    @classmethod
+    def proyectar(cls, qs, request, extra=()):
+        """
+        qs con .only()/select_related() ajustados a los campos pedidos (todos, sin
+        ?fields=/?omit=). `extra`: columnas propias que la vista lee aparte (p. ej. el cursor).
+        """
+        fuentes = cls._fuentes()
+        elegidos = cls.campos_pedidos(request, fuentes)
+        if elegidos is None:
+            elegidos = list(fuentes)
+
+        rutas = list(extra)
+        for nombre in elegidos:
+            if fuentes[nombre] == "*":
+                if nombre not in cls.fuentes_metodo:
+                    return qs
+                rutas += cls.fuentes_metodo[nombre]
+            else:
+                rutas.append(fuentes[nombre])
+
+        only, joins = {qs.model._meta.pk.name}, set()
+        for ruta in rutas:
+            modelo, partes = qs.model, ruta.split(".")
+            nombres = []
+            for i, attr in enumerate(partes):
+                try:
+                    f = modelo._meta.get_field(attr)
+                except FieldDoesNotExist:
+                    return qs  # property u otro atributo calculado: no se puede proyectar
+                nombres.append(f.name)
+                only.add("__".join(nombres))
+                if i < len(partes) - 1:
+                    if not (f.many_to_one or f.one_to_one):
+                        return qs
+                    joins.add("__".join(nombres))
+                    modelo = f.related_model
+        qs = qs.select_related(None)
+        if joins:
+            qs = qs.select_related(*sorted(joins))
+        return qs.only(*sorted(only))
+
+
+# ---------- listados desde .values_list() ----------
+_SIN_FORMATO = object()
+
+
+def _formato_datetime(tz):
+    # DateTimeField.to_representation con formato ISO 8601 (enforce_timezone incluido)
+    def fmt(v):
+        if tz is None:
+            return (timezone.make_naive(v, dt_timezone.utc) if timezone.is_aware(v) else v).isoformat()
+        v = v.astimezone(tz) if timezone.is_aware(v) else timezone.make_aware(v, tz)
+        v = v.isoformat()
+        return v[:-6] + "Z" if v.endswith("+00:00") else v
+    return fmt
+
+
+def _formato(campo, tz):
+    """Equivalente directo de campo.to_representation para valores de la BD, o _SIN_FORMATO."""
+    if isinstance(campo, serializers.DateTimeField):
+        if hasattr(campo, "timezone") or str(getattr(campo, "format", api_settings.DATETIME_FORMAT)).lower() != ISO_8601:
+            return _SIN_FORMATO
+        return _formato_datetime(tz)
+    if isinstance(campo, serializers.DateField):
+        if str(getattr(campo, "format", api_settings.DATE_FORMAT)).lower() != ISO_8601:
+            return _SIN_FORMATO
+        return lambda v: v.isoformat()
+    if isinstance(campo, serializers.ChoiceField):
+        m = campo.choice_strings_to_values
+        return lambda v: v if v == "" else m.get(str(v), v)
+    if isinstance(campo, serializers.CharField):
+        return str
+    if isinstance(campo, serializers.IntegerField):
+        return int
+    if isinstance(campo, serializers.PrimaryKeyRelatedField) and campo.pk_field is None:
+        return None  # .values_list() ya trae el id
+    return _SIN_FORMATO
+
+
+class ListadoRapido:
+    """
+    Serializa un listado desde .values_list() (sin instanciar modelos ni recorrer
+    el serializer campo a campo) con la misma salida que el serializer: cada campo
+    se formatea con el equivalente directo de su to_representation (fechas ISO,
+    fechas-hora en la zona actual, FK como id).
+
+    Solo para columnas propias del modelo; si el serializer tiene sources con
+    relaciones, SerializerMethodField, formatos propios u otros tipos de campo,
+    para() devuelve None y la vista usa el camino normal. Respeta ?fields=/?omit=
+    (CamposParcialesMixin).
+    """
+
+    def __init__(self, campos):
+        self.campos = campos  # [(nombre, columna, formato)]
+
+    @classmethod
+    def para(cls, serializer_class, request=None):
+        todos = serializer_class().fields
+        nombres = list(todos)
+        if issubclass(serializer_class, CamposParcialesMixin):
+            nombres = serializer_class.campos_pedidos(request, todos) or nombres
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        campos = []
+        for nombre in nombres:
+            campo = todos[nombre]
+            if campo.write_only:
+                continue
+            fmt = _formato(campo, tz)
+            if fmt is _SIN_FORMATO or campo.source == "*" or "." in campo.source:
+                return None
+            campos.append((nombre, campo.source, fmt))
+        return cls(campos)
+
+    def consulta(self, qs, extra=()):
+        """qs.values_list(named=True) con las columnas a serializar (+ `extra`, p. ej. las del cursor)."""
+        columnas = list(dict.fromkeys([c for _, c, _ in self.campos] + list(extra)))
+        self._pos = {c: i for i, c in enumerate(columnas)}
+        return qs.values_list(*columnas, named=True)
+
+    def filas(self, rows):
+        campos = [(nombre, self._pos[col], fmt) for nombre, col, fmt in self.campos]
+        out = []
+        for r in rows:
+            d = {}
+            for nombre, i, fmt in campos:
+                v = r[i]
+                d[nombre] = v if v is None or fmt is None else fmt(v)
+            out.append(d)
+        return out
+
+
 class ConfiguracionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Configuracion
@@ -3,6 +3,7 @@ from django.http import HttpResponse
 from django.utils.html import escape
 from rest_framework import viewsets, permissions
 from core.models import Notificacion, LogSistema
+from core.pagination import ConteoEstimadoPagination
 from core.serializers import NotificacionSerializer, LogSistemaSerializer
 from django.shortcuts import render, redirect
 from auditoria.models import AuditoriaVisita
@@ -26,6 +27,8 @@ class LogSistemaViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = LogSistema.objects.all().order_by("-id")
     serializer_class = LogSistemaSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # logs crece sin tope: total exacto solo hasta el umbral (ver core/pagination.py)
+    pagination_class = ConteoEstimadoPagination
 
 ESTADOS_LABEL = {
     "autoriza": "Autoriza a ingresar",
@@ -5,6 +5,7 @@ from rest_framework.filters import SearchFilter, OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.response import Response
 
+from core.pagination import ConteoEstimadoPagination
 from core.permissions import AdminOnly
 from .models import Configuracion, LogSistema
 from .serializers import ConfiguracionSerializer, LogSistemaSerializer
@@ -59,6 +60,8 @@ class LogsAdminViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticated, AdminOnly]
     queryset = LogSistema.objects.select_related("usuario").all()
     serializer_class = LogSistemaSerializer
+    # logs crece sin tope: total exacto solo hasta el umbral (ver core/pagination.py)
+    pagination_class = ConteoEstimadoPagination
 
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = {
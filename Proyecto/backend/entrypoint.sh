@@ -5,4 +5,6 @@ set -e
 # python manage.py collectstatic --noinput || true
 
 python manage.py migrate --noinput
+# caché compartida (CACHES en settings)
+python manage.py createcachetable
 exec "$@"